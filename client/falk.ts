@@ -2,6 +2,9 @@ import {
   patchNode,
   patchNodeAttributes,
   iterFalkComponents,
+  getComponentHashes,
+  getKnownAssets,
+  restoreKeptNodes,
   nodeHasFalkNodeId,
   getFalkNodeId,
   nodeIsUiNode,
@@ -21,9 +24,11 @@ class Falk {
   public initialCallbacks: Array<any>;
 
   private requestId: number;
+  private initialized: boolean;
 
   public init = async () => {
     this.requestId = 1;
+    this.initialized = false;
 
     // setup transports
     this.httpTransport = new HTTPTransport();
@@ -55,6 +60,8 @@ class Falk {
 
       // run initial callbacks
       this.runCallbacks(this.initialCallbacks);
+
+      this.initialized = true;
     };
 
     if (document.readyState === "complete") {
@@ -66,6 +73,58 @@ class Falk {
     }
   };
 
+  // deferred components
+  // Deferred components get streamed after the document, as a template
+  // that replaces their placeholder.
+  public renderDeferred = (
+    nodeId: string,
+    tokens: Object,
+    callbacks: Array<any>,
+  ) => {
+    const placeholder = document.querySelector(`div[fx-deferred="${nodeId}"]`);
+
+    const template = document.querySelector(
+      `template[fx-deferred="${nodeId}"]`,
+    ) as HTMLTemplateElement;
+
+    if (!placeholder || !template) {
+      return;
+    }
+
+    const nodes = Array.from(template.content.children) as Array<HTMLElement>;
+
+    for (const [key, value] of Object.entries(tokens)) {
+      this.tokens[key] = value;
+    }
+
+    placeholder.replaceWith(template.content);
+    template.remove();
+
+    // Before the initialization, initial render events and callbacks get
+    // handled by `init`.
+    if (!this.initialized) {
+      this.initialCallbacks.push(...callbacks);
+
+      return;
+    }
+
+    for (const node of nodes) {
+      iterFalkComponents({
+        rootNode: node,
+        callback: (node: HTMLElement) => {
+          if (!nodeIsUiNode(node)) {
+            return;
+          }
+
+          this.dispatchEvent("initialrender", node);
+          this.dispatchEvent("render", node);
+        },
+      });
+    }
+
+    this.runCallbacks(callbacks);
+  };
+
   // helper
   private getRequestId = () => {
     const requestId: number = this.requestId;
@@ -189,6 +248,8 @@ class Falk {
       const token = this.tokens[nodeId];
       const callbackName = options.callbackName || "";
       const callbackArgs = options.callbackArgs || {};
+      const componentHashes = getComponentHashes(node);
+      const knownAssets = getKnownAssets();
 
       // The event is `undefined` when handling non-standard event handler
       // like `onRender`.
@@ -215,6 +276,8 @@ class Falk {
                 token: token,
                 callbackName: callbackName,
                 callbackArgs: callbackArgs,
+                componentHashes: componentHashes,
+                knownAssets: knownAssets,
                 eventData: eventData,
               });
 
@@ -228,6 +291,8 @@ class Falk {
                 token: token,
                 callbackName: callbackName,
                 callbackArgs: callbackArgs,
+                componentHashes: componentHashes,
+                knownAssets: knownAssets,
                 eventData: eventData,
               });
 
@@ -238,6 +303,8 @@ class Falk {
                 token: token,
                 callbackName: callbackName,
                 callbackArgs: callbackArgs,
+                componentHashes: componentHashes,
+                knownAssets: knownAssets,
                 eventData: eventData,
               });
             }
@@ -275,6 +342,8 @@ class Falk {
                 "text/html",
               );
 
+              const keptNodes = restoreKeptNodes(newDocument.body);
+
               // load linked styles
               const linkNodes = newDocument.head.querySelectorAll(
                 "link[rel=stylesheet]",
@@ -385,6 +454,7 @@ class Falk {
                   fromNode: document.body,
                   toNode: newDocument.body,
                   eventType: eventType,
+                  keptNodes: keptNodes,
 
                   onInitialRender: (node: HTMLElement) => {
                     this.dispatchEvent("initialrender", node);
@@ -412,6 +482,7 @@ class Falk {
                   fromNode: node,
                   toNode: newDocument.body.firstChild as HTMLElement,
                   eventType: eventType,
+                  keptNodes: keptNodes,
 
                   onInitialRender: (node: HTMLElement) => {
                     this.dispatchEvent("initialrender", node);
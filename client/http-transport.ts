@@ -15,6 +15,8 @@ export class HTTPTransport {
     token: string;
     callbackName: string;
     callbackArgs: object;
+    componentHashes: Record<string, Array<string>>;
+    knownAssets: Array<string>;
     eventData: any;
   }): Promise<MutationRequestResponse> => {
     return new Promise(async (resolve, reject) => {
@@ -23,6 +25,8 @@ export class HTTPTransport {
         token: args.token,
         callbackName: args.callbackName,
         callbackArgs: args.callbackArgs,
+        componentHashes: args.componentHashes,
+        knownAssets: args.knownAssets,
         event: args.eventData.eventData,
       };
 
@@ -58,6 +62,8 @@ export class HTTPTransport {
     token: string;
     callbackName: string;
     callbackArgs: object;
+    componentHashes: Record<string, Array<string>>;
+    knownAssets: Array<string>;
     eventData: any;
   }): Promise<MutationRequestResponse> => {
     return new Promise(async (resolve, reject) => {
@@ -69,6 +75,8 @@ export class HTTPTransport {
         token: args.token,
         callbackName: args.callbackName,
         callbackArgs: args.callbackArgs,
+        componentHashes: args.componentHashes,
+        knownAssets: args.knownAssets,
         event: args.eventData.eventData,
       };
 
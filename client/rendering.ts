@@ -2,6 +2,8 @@ import morphdom from "morphdom";
 
 const FALK_NODE_ID_ATTRIBUTE_NAME = "fx-id";
 const FALK_RENDER_ATTRIMUTE_NAME = "fx-render";
+const FALK_HASH_ATTRIBUTE_NAME = "fx-hash";
+const FALK_KEEP_ATTRIBUTE_NAME = "fx-keep";
 
 // basic checks
 export function nodeIsElement(node: Node) {
@@ -69,11 +71,80 @@ export function iterFalkComponents(options: {
   options.callback(options.rootNode);
 }
 
+// partial rendering
+// Components that were rendered with the same props as before get sent as
+// placeholders (`<template fx-keep="NODE_ID">`). We replace them with
+// shallow copies of the nodes we already have, so morphdom keeps the
+// original nodes in place.
+export function getComponentHashes(rootNode: HTMLElement) {
+  const componentHashes: Record<string, Array<string>> = {};
+
+  rootNode
+    .querySelectorAll(`[${FALK_HASH_ATTRIBUTE_NAME}]`)
+    .forEach((node: HTMLElement) => {
+      const hash = node.getAttribute(FALK_HASH_ATTRIBUTE_NAME);
+
+      if (!(hash in componentHashes)) {
+        componentHashes[hash] = [];
+      }
+
+      componentHashes[hash].push(getFalkNodeId(node));
+    });
+
+  return componentHashes;
+}
+
+export function restoreKeptNodes(rootNode: HTMLElement) {
+  const keptNodes: Array<HTMLElement> = new Array();
+
+  rootNode
+    .querySelectorAll(`template[${FALK_KEEP_ATTRIBUTE_NAME}]`)
+    .forEach((placeholder: HTMLElement) => {
+      const nodeId = placeholder.getAttribute(FALK_KEEP_ATTRIBUTE_NAME);
+
+      const node = document.querySelector(
+        `[${FALK_NODE_ID_ATTRIBUTE_NAME}="${nodeId}"]`,
+      ) as HTMLElement;
+
+      if (!node) {
+        placeholder.remove();
+
+        return;
+      }
+
+      placeholder.replaceWith(node.cloneNode(false));
+      keptNodes.push(node);
+    });
+
+  return keptNodes;
+}
+
+// assets
+// Mutation requests contain the keys of all styles and scripts that are
+// already loaded, so the server does not send them again.
+export function getKnownAssets() {
+  const knownAssets: Set<string> = new Set();
+
+  document.querySelectorAll("link,style,script").forEach((node: Element) => {
+    const assetKey =
+      node.getAttribute("href") ||
+      node.getAttribute("src") ||
+      getFalkNodeId(node as HTMLElement);
+
+    if (assetKey) {
+      knownAssets.add(assetKey);
+    }
+  });
+
+  return Array.from(knownAssets);
+}
+
 // node patching
 export function patchNode(options: {
   fromNode: HTMLElement;
   toNode: HTMLElement;
   eventType: string;
+  keptNodes?: Array<HTMLElement>;
   onInitialRender: (node: HTMLElement) => any;
   onRender: (node: HTMLElement) => any;
   onBeforeUnmount: (node: HTMLElement) => any;
@@ -81,8 +152,12 @@ export function patchNode(options: {
   // TODO: add tests for render modes
   // TODO: add tests for preserving form input
 
+  const keptNodes: Array<HTMLElement> = options.keptNodes || new Array();
+
   // patch nodes
-  const skipNodes: Array<HTMLElement> = new Array();
+  // Kept nodes did not change, so we neither patch them nor dispatch
+  // render events on them.
+  const skipNodes: Array<HTMLElement> = Array.from(keptNodes);
 
   morphdom(options.fromNode, options.toNode, {
     getNodeKey: (node: HTMLElement) => {
@@ -106,6 +181,10 @@ export function patchNode(options: {
     },
 
     onBeforeElUpdated: (fromEl: HTMLElement, toEl: HTMLElement) => {
+      if (keptNodes.includes(fromEl)) {
+        return false;
+      }
+
       // Preserve values of input elements if the original event is no
       // `submit` event.
       // Normally, we don't want to override user input from the backend
@@ -19,10 +19,24 @@ export class WebsocketTransport {
   };
 
   private handleMessage = (event: MessageEvent) => {
-    const [messageId, messageData] = JSON.parse(event.data);
-    const responseData = messageData.json;
+    const data = JSON.parse(event.data);
+
+    // Batched frames contain a list of messages
+    // (`[[messageId, responseData], ...]`).
+    const messages = Array.isArray(data[0]) ? data : [data];
+
+    for (const [messageId, responseData] of messages) {
+      this.handleResponse(messageId, responseData);
+    }
+  };
+
+  private handleResponse = (messageId: number, responseData: any) => {
     const promiseCallbacks = this.pendingRequests.get(messageId);
 
+    if (!promiseCallbacks) {
+      return;
+    }
+
     const mutationRequestResponse: MutationRequestResponse = {
       valid: true,
       httpResponse: null,
@@ -40,7 +54,7 @@ export class WebsocketTransport {
     // HTML responses
     promiseCallbacks["resolve"](mutationRequestResponse);
 
-    this.pendingRequests.delete(messageData);
+    this.pendingRequests.delete(messageId);
   };
 
   private connect = (): Promise<boolean> => {
@@ -75,6 +89,8 @@ export class WebsocketTransport {
     token: string;
     callbackName: string;
     callbackArgs: object;
+    componentHashes: Record<string, Array<string>>;
+    knownAssets: Array<string>;
     eventData: any;
   }): Promise<MutationRequestResponse> => {
     return new Promise(async (resolve, reject) => {
@@ -89,6 +105,8 @@ export class WebsocketTransport {
         token: args.token,
         callbackName: args.callbackName,
         callbackArgs: args.callbackArgs,
+        componentHashes: args.componentHashes,
+        knownAssets: args.knownAssets,
         event: args.eventData.eventData,
       };
 
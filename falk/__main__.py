@@ -0,0 +1,3 @@
+from falk.cli import main
+
+main()
@@ -1,18 +1,25 @@
+import weakref
 import os
 
 from falk.providers.routing import add_route_provider, get_url_provider
+from falk.utils.environment import get_boolean, get_integer, get_string
 from falk.dependency_injection import run_callback, run_coroutine_sync
+from falk.providers.scheduling import get_scheduler_stats_provider
 from falk.providers.dependencies import add_dependency_provider
 from falk.middlewares.static_files import serve_static_files
-from falk.utils.environment import get_boolean, get_integer
+from falk.rendering import precompile_component_templates
 from falk.file_uploads import default_file_upload_handler
 from falk.providers.flags import disable_state_provider
 from falk.immutable_proxy import get_immutable_proxy
+from falk.templating import get_jinja2_environment
 from falk.tokens import encode_token, decode_token
-from falk.static_files import get_falk_static_dir
+from falk.compression import compress_response
 from falk.secrets import get_random_secret
+from falk.scheduling import get_scheduler
+from falk.utils.lru_cache import LRUCache
 from falk.node_ids import get_node_id
 from falk.hashing import get_md5_hash
+from falk.routing import get_router
 
 from falk.providers.settings import (
     get_setting_provider,
@@ -29,11 +36,18 @@ from falk.providers.static_files import (
     get_static_url_provider,
 )
 
+from falk.static_files import (
+    get_static_file_cache,
+    get_falk_static_dir,
+    get_static_manifest,
+)
+
 from falk.components import (
     InternalServerError,
     BadRequest,
     Forbidden,
     NotFound,
+    ItWorks,
 )
 
 from falk.component_registry import (
@@ -71,6 +85,7 @@ from falk.providers.responses import (
     set_response_redirect_provider,
     set_response_body_provider,
     set_response_file_provider,
+    set_response_stream_provider,
     set_response_json_provider,
 )
 
@@ -88,17 +103,50 @@ def get_default_app():
             "run_coroutine_sync": run_coroutine_sync,
             "hash_string": get_md5_hash,
             "websockets": get_boolean("FALK_WEBSOCKETS", True),
+
+            # milliseconds
+            "websocket_batch_window": get_integer(
+                "FALK_WEBSOCKET_BATCH_WINDOW",
+                0,
+            ),
+
             "default_file_upload_handler": default_file_upload_handler,
+
+            "async_request_handling": get_boolean(
+                "FALK_ASYNC_REQUEST_HANDLING",
+                False,
+            ),
+
+            # Streamed responses send the status, the headers, and the
+            # cookies along with the first chunk. Post component and post
+            # request middlewares run after that, so their changes to these
+            # don't get sent (a warning gets logged).
+            "stream_responses": get_boolean("FALK_STREAM_RESPONSES", False),
+
+            "max_pending_requests": get_integer(
+                "FALK_MAX_PENDING_REQUESTS",
+                0,
+            ),
         },
         "entry_points": {
             "on_startup": [],
             "on_shutdown": [],
         },
         "executor": None,
+        "scheduler": get_scheduler(),
+        "signer": None,
+        "template_cache": None,
+        "jinja2_environment": None,
         "components": {},
+        "component_ids": weakref.WeakKeyDictionary(),
+        "component_templates": {},
         "file_upload_settings": {},
         "file_upload_handler": {},
         "routes": [],
+        "route_names": {},
+        "router": None,
+        "static_manifest": None,
+        "static_file_cache": None,
 
         # user defined
         "state": {},
@@ -114,14 +162,64 @@ def get_default_app():
         "post_component_middlewares": [],
     })
 
+    # settings: routing
+    mutable_app["settings"].update({
+        "check_urls": get_boolean("FALK_CHECK_URLS", True),
+    })
+
     # settings: static files
     mutable_app["settings"].update({
         "static_url_prefix": "/static/",
+
+        "fingerprint_static_urls": get_boolean(
+            "FALK_FINGERPRINT_STATIC_URLS",
+            False,
+        ),
+
+        "file_chunk_size": get_integer(
+            "FALK_FILE_CHUNK_SIZE",
+            256 * 1024,
+        ),
+
+        # The static file cache is disabled by default. Servers that
+        # support the pathsend or the zerocopysend extension send files
+        # without copying them through Python.
+        "static_file_cache_size": get_integer(
+            "FALK_STATIC_FILE_CACHE_SIZE",
+            0,
+        ),
+
+        "static_file_cache_max_file_size": get_integer(
+            "FALK_STATIC_FILE_CACHE_MAX_FILE_SIZE",
+            256 * 1024,
+        ),
+
         "static_dirs": [
             get_falk_static_dir(),
         ],
     })
 
+    # settings: compression
+    compression_encodings = [
+        name.strip()
+        for name in get_string(
+            "FALK_COMPRESSION_ENCODINGS",
+            "zstd,br,gzip",
+        ).split(",")
+        if name.strip()
+    ]
+
+    mutable_app["settings"].update({
+        "compress_responses": get_boolean("FALK_COMPRESS_RESPONSES", False),
+        "compress_response": compress_response,
+        "compression_encodings": compression_encodings,
+
+        "compression_threshold": get_integer(
+            "FALK_COMPRESSION_THRESHOLD",
+            1024,
+        ),
+    })
+
     # settings: tokens
     if "FALK_TOKEN_SECRET" in os.environ:
         token_secret = os.environ["FALK_TOKEN_SECRET"]
@@ -129,16 +227,31 @@ def get_default_app():
     else:
         token_secret = get_random_secret()
 
+    token_fallback_secrets = [
+        secret.strip()
+        for secret in get_string("FALK_TOKEN_FALLBACK_SECRETS", "").split(",")
+        if secret.strip()
+    ]
+
     mutable_app["settings"].update({
         "token_secret": token_secret,
+        "token_fallback_secrets": token_fallback_secrets,
         "encode_token": encode_token,
         "decode_token": decode_token,
+        "token_serializer": get_string("FALK_TOKEN_SERIALIZER", "json"),
+        "token_compression": get_string("FALK_TOKEN_COMPRESSION", ""),
+
+        "token_compression_threshold": get_integer(
+            "FALK_TOKEN_COMPRESSION_THRESHOLD",
+            512,
+        ),
     })
 
     # settings: components
     mutable_app["settings"].update({
         "node_id_random_bytes": 8,
         "get_node_id": get_node_id,
+        "partial_rendering": get_boolean("FALK_PARTIAL_RENDERING", False),
     })
 
     # settings: error components
@@ -180,17 +293,36 @@ def get_default_app():
             "set_response_redirect": set_response_redirect_provider,
             "set_response_body": set_response_body_provider,
             "set_response_file": set_response_file_provider,
+            "set_response_stream": set_response_stream_provider,
             "set_response_json": set_response_json_provider,
             "add_callback": add_callback_provider,
             "run_callback": run_callback_provider,
             "get_url": get_url_provider,
             "get_static_url": get_static_url_provider,
+            "get_scheduler_stats": get_scheduler_stats_provider,
         },
+        "request_scoped_dependencies": [],
     })
 
+    # The built-in providers only create closures, so they are cheap enough
+    # to run on the event loop in async request handling.
+    mutable_app["settings"]["inline_dependencies"] = list(
+        mutable_app["settings"]["dependencies"].keys(),
+    )
+
     # settings: templating
     mutable_app["settings"].update({
         "extra_template_context": {},
+        "template_cache_size": get_integer("FALK_TEMPLATE_CACHE_SIZE", 1024),
+        "precompile_templates": get_boolean(
+            "FALK_PRECOMPILE_TEMPLATES",
+            False,
+        ),
+
+        "jinja2_bytecode_cache_dir": get_string(
+            "FALK_JINJA2_BYTECODE_CACHE_DIR",
+            "",
+        ),
     })
 
     return mutable_app
@@ -248,9 +380,46 @@ def run_configure_app(configure_app):
     )
 
     # setup component registry
+    # All components, that falk might render, get registered upfront so
+    # their ids don't have to be computed while rendering.
+    components = [
+        ItWorks,
+        mutable_app["settings"]["bad_request_error_component"],
+        mutable_app["settings"]["forbidden_error_component"],
+        mutable_app["settings"]["not_found_error_component"],
+        mutable_app["settings"]["internal_server_error_component"],
+    ]
+
     for route in mutable_app["routes"]:
+        components.append(route[2])
+
+    for component in components:
         mutable_app["settings"]["register_component"](
-            component=route[2],
+            component=component,
+            mutable_app=mutable_app,
+        )
+
+    # setup routing
+    get_router(mutable_app)
+
+    # setup static files
+    get_static_manifest(mutable_app)
+
+    mutable_app["static_file_cache"] = get_static_file_cache(
+        max_size=mutable_app["settings"]["static_file_cache_size"],
+    )
+
+    # setup templating
+    mutable_app["template_cache"] = LRUCache(
+        max_size=mutable_app["settings"]["template_cache_size"],
+    )
+
+    mutable_app["jinja2_environment"] = get_jinja2_environment(
+        mutable_app=mutable_app,
+    )
+
+    if mutable_app["settings"]["precompile_templates"]:
+        precompile_component_templates(
             mutable_app=mutable_app,
         )
 
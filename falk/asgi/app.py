@@ -5,8 +5,8 @@ import logging
 from falk.asgi.request_handling import handle_http_request
 from falk.asgi.websockets import handle_websocket
 from falk.asgi.lifespans import handle_lifespan
+from falk.routing import get_router, match_path
 from falk.apps import run_configure_app
-from falk.routing import get_component
 
 logger = logging.getLogger("falk")
 
@@ -63,13 +63,12 @@ def get_asgi_app(configure_app=None, mutable_app=None):
             return
 
         # mounted ASGI apps
-        asgi_component, _ = await loop.run_in_executor(
-            mutable_app["executor"],
-            lambda: get_component(
-                routes=mutable_app["routes"],
-                path=scope["path"],
-                asgi_interface=True,
-            )
+        # Routes are compiled into a router, so matching is cheap enough to
+        # run directly on the event loop.
+        asgi_component, _ = match_path(
+            router=get_router(mutable_app),
+            path=scope["path"],
+            asgi_interface=True,
         )
 
         if asgi_component:
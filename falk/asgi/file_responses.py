@@ -1,48 +1,403 @@
+from email.utils import formatdate, parsedate_to_datetime
 import mimetypes
 import os
 
-import aiofiles
+from falk.static_files import get_file_stat
+from falk.scheduling import run_in_executor
+from falk.asgi.helper import get_headers
+from falk.http import get_header
 
-CHUNK_SIZE = 64 * 1024  # 64 KiB
+PATHSEND_EXTENSION = "http.response.pathsend"
+ZEROCOPYSEND_EXTENSION = "http.response.zerocopysend"
 
 
-async def handle_file_response(response, send):
-    # TODO: set statuscode, headers, and cookies correctly
+def _strip_weak_etag_prefix(etag):
+    if etag.startswith("W/"):
+        return etag[2:]
 
+    return etag
+
+
+def is_not_modified(request, etag, last_modified, mtime):
+    if_none_match = get_header(request["headers"], "If-None-Match", "")
+
+    # If-None-Match takes precedence over If-Modified-Since and uses the weak
+    # comparison.
+    if if_none_match:
+        etags = [
+            _strip_weak_etag_prefix(value.strip())
+            for value in if_none_match.split(",")
+        ]
+
+        return "*" in etags or _strip_weak_etag_prefix(etag) in etags
+
+    if_modified_since = get_header(request["headers"], "If-Modified-Since", "")
+
+    if if_modified_since:
+        if if_modified_since == last_modified:
+            return True
+
+        try:
+            timestamp = parsedate_to_datetime(if_modified_since).timestamp()
+
+        except (TypeError, ValueError):
+            return False
+
+        return int(mtime) <= timestamp
+
+    return False
+
+
+def get_byte_range(request, etag, last_modified, file_size):
+    # Returns `None` if the whole file should be sent, `(start, end)` for
+    # satisfiable ranges, and `False` for unsatisfiable ranges.
+    # Only single ranges are supported. Requests for multiple ranges get the
+    # whole file.
+    range_header = get_header(request["headers"], "Range", "")
+
+    if not range_header.startswith("bytes="):
+        return None
+
+    # If-Range uses the strong comparison, so weak ETags never match.
+    if_range = get_header(request["headers"], "If-Range", "")
+
+    if (if_range and
+            (if_range.startswith("W/") or if_range != etag) and
+            if_range != last_modified):
+
+        return None
+
+    ranges = range_header[len("bytes="):].split(",")
+
+    if len(ranges) != 1:
+        return None
+
+    start, _, end = ranges[0].strip().partition("-")
+
+    try:
+        # suffix ranges: `bytes=-500` (the last 500 bytes)
+        if not start:
+            length = int(end)
+
+            if length <= 0:
+                return False
+
+            start = max(file_size - length, 0)
+            end = file_size - 1
+
+        else:
+            start = int(start)
+            end = int(end) if end else file_size - 1
+
+    except ValueError:
+        return None
+
+    if start >= file_size or start > end:
+        return False
+
+    return start, min(end, file_size - 1)
+
+
+def _read_file(abs_path):
+    with open(abs_path, "rb") as f:
+        return f.read()
+
+
+async def _get_cached_file_body(mutable_app, abs_path, file_size, mtime):
+    # Cache entries are checked against the file stat of the static
+    # manifest, which gets revalidated in debug mode, so changed files get
+    # read again.
+    file_cache = mutable_app["static_file_cache"]
+    cache_entry = file_cache.get(abs_path)
+
+    if (cache_entry and
+            cache_entry["size"] == file_size and
+            cache_entry["mtime"] == mtime):
+
+        return cache_entry["body"]
+
+    body = await run_in_executor(
+        mutable_app=mutable_app,
+        function=lambda: _read_file(abs_path),
+    )
+
+    # The file changed since it was indexed. The body doesn't match the
+    # headers, that were sent already.
+    if len(body) != file_size:
+        return None
+
+    file_cache.set(abs_path, {
+        "size": file_size,
+        "mtime": mtime,
+        "body": body,
+    })
+
+    return body
+
+
+async def _send_file_chunks(mutable_app, abs_path, start, length, send):
+    # Chunks are read with `os.pread` in the executor. Every read is one
+    # thread hop, so big chunks keep the overhead low for big files.
+    chunk_size = mutable_app["settings"]["file_chunk_size"]
+    bytes_sent = 0
+
+    fd = await run_in_executor(
+        mutable_app=mutable_app,
+        function=lambda: os.open(abs_path, os.O_RDONLY),
+    )
+
+    try:
+        while bytes_sent < length:
+            chunk = await run_in_executor(
+                mutable_app=mutable_app,
+                function=lambda: os.pread(
+                    fd,
+                    min(chunk_size, length - bytes_sent),
+                    start + bytes_sent,
+                ),
+            )
+
+            if not chunk:
+                break
+
+            bytes_sent += len(chunk)
+
+            await send({
+                "type": "http.response.body",
+                "body": chunk,
+                "more_body": bytes_sent < length,
+            })
+
+    finally:
+        os.close(fd)
+
+    # The file got shorter while we were sending it.
+    if bytes_sent < length:
+        await send({
+            "type": "http.response.body",
+            "body": b"",
+        })
+
+
+async def _send_file_zerocopy(mutable_app, abs_path, start, length, send):
+    # The server sends the file using `os.sendfile` and closes the file
+    # descriptor when it is done.
+    fd = await run_in_executor(
+        mutable_app=mutable_app,
+        function=lambda: os.open(abs_path, os.O_RDONLY),
+    )
+
+    try:
+        await send({
+            "type": "http.response.zerocopysend",
+            "file": fd,
+            "offset": start,
+            "count": length,
+        })
+
+    except BaseException:
+        os.close(fd)
+
+        raise
+
+
+async def handle_file_response(
+        mutable_app,
+        request,
+        response,
+        send,
+        extensions=None,
+):
+
+    settings = mutable_app["settings"]
     abs_path = response["file_path"]
     rel_path = os.path.basename(abs_path)
-    file_size = os.path.getsize(abs_path)
     mime = mimetypes.guess_type(abs_path)[0] or "application/octet-stream"
+    file_stat = response["file_stat"]
+
+    # Files, that are not part of the static manifest, get stated in the
+    # executor.
+    if not file_stat:
+        file_stat = await run_in_executor(
+            mutable_app=mutable_app,
+            function=lambda: get_file_stat(abs_path),
+        )
+    file_encoding = response["file_encoding"]
+    file_size = file_stat["size"]
+    file_mtime = file_stat["mtime"]
+    etag = file_stat["etag"]
+    last_modified = formatdate(file_stat["mtime"], usegmt=True)
+
+    # compressed siblings
+    # The name and the content type are still the ones of the original file.
+    # Every encoding is its own representation, so it needs its own ETag.
+    if file_encoding:
+        compressed_file_stat = file_stat["compressed_files"][file_encoding]
+        abs_path = compressed_file_stat["abs_path"]
+        file_size = compressed_file_stat["size"]
+        file_mtime = compressed_file_stat["mtime"]
+        etag = f'{etag[:-1]}-{file_encoding}"'
 
     headers = [
+        (b"etag", etag.encode()),
+        (b"last-modified", last_modified.encode()),
+    ]
+
+    if response["status"] != 200:
+        byte_range = None
+
+    # conditional requests
+    elif is_not_modified(
+            request=request,
+            etag=etag,
+            last_modified=last_modified,
+            mtime=file_stat["mtime"]):
+
+        await send({
+            "type": "http.response.start",
+            "status": 304,
+            "headers": headers + get_headers(response),
+        })
+
+        await send({
+            "type": "http.response.body",
+            "body": b"",
+        })
+
+        return
+
+    else:
+        byte_range = get_byte_range(
+            request=request,
+            etag=etag,
+            last_modified=last_modified,
+            file_size=file_size,
+        )
+
+    # unsatisfiable range requests
+    if byte_range is False:
+        await send({
+            "type": "http.response.start",
+            "status": 416,
+            "headers": [
+                *headers,
+                (b"content-range", f"bytes */{file_size}".encode()),
+                (b"content-length", b"0"),
+                *get_headers(response),
+            ],
+        })
+
+        await send({
+            "type": "http.response.body",
+            "body": b"",
+        })
+
+        return
+
+    # headers
+    status = response["status"]
+    start = 0
+    length = file_size
+
+    headers.extend([
         (b"content-type", mime.encode()),
+        (b"accept-ranges", b"bytes"),
+    ])
 
-        (b"content-disposition",
-         f'attachment; filename="{rel_path}"'.encode()),
+    if response["file_attachment"]:
+        headers.append(
+            (b"content-disposition",
+             f'attachment; filename="{rel_path}"'.encode()),
+        )
 
-        (b"content-length", str(file_size).encode()),
-    ]
+    if file_encoding:
+        headers.append((b"content-encoding", file_encoding.encode()))
+
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        status = 206
+
+        headers.append(
+            (b"content-range", f"bytes {start}-{end}/{file_size}".encode()),
+        )
+
+    headers.append((b"content-length", str(length).encode()))
+    headers.extend(get_headers(response))
 
     await send({
         "type": "http.response.start",
-        "status": 200,
+        "status": status,
         "headers": headers,
     })
 
-    bytes_sent = 0
+    # body
+    if request["method"] == "HEAD" or length == 0:
+        await send({
+            "type": "http.response.body",
+            "body": b"",
+        })
 
-    async with aiofiles.open(abs_path, "rb") as f:
-        while True:
-            chunk = await f.read(CHUNK_SIZE)
+        return
 
-            if not chunk:
-                break
+    # cached static files
+    if (mutable_app["static_file_cache"] is not None and
+            response["file_stat"] and
+            file_size <= settings["static_file_cache_max_file_size"]):
 
-            bytes_sent += len(chunk)
-            more_body = bytes_sent < file_size
+        body = await _get_cached_file_body(
+            mutable_app=mutable_app,
+            abs_path=abs_path,
+            file_size=file_size,
+            mtime=file_mtime,
+        )
+
+        # Changed files get sent in chunks, which only sends as many bytes
+        # as were announced in the headers.
+        if body is None:
+            await _send_file_chunks(
+                mutable_app=mutable_app,
+                abs_path=abs_path,
+                start=start,
+                length=length,
+                send=send,
+            )
 
+        else:
             await send({
                 "type": "http.response.body",
-                "body": chunk,
-                "more_body": more_body,
+                "body": body[start:start + length],
             })
+
+        return
+
+    # Servers that support the pathsend or the zerocopysend extension send
+    # the file themselves, without copying it through Python.
+    extensions = extensions or {}
+
+    if PATHSEND_EXTENSION in extensions and not byte_range:
+        await send({
+            "type": "http.response.pathsend",
+            "path": abs_path,
+        })
+
+        return
+
+    if ZEROCOPYSEND_EXTENSION in extensions:
+        await _send_file_zerocopy(
+            mutable_app=mutable_app,
+            abs_path=abs_path,
+            start=start,
+            length=length,
+            send=send,
+        )
+
+        return
+
+    await _send_file_chunks(
+        mutable_app=mutable_app,
+        abs_path=abs_path,
+        start=start,
+        length=length,
+        send=send,
+    )
@@ -22,3 +22,17 @@ async def get_body(event, receive):
         body += chunk
 
     return body
+
+
+def get_headers(response):
+    headers = [
+        (str(name).encode("utf-8"), str(value).encode("utf-8"))
+        for name, value in response["headers"].items()
+    ]
+
+    for morsel in response["cookie"].values():
+        headers.append(
+            (b"Set-Cookie", morsel.OutputString().encode()),
+        )
+
+    return headers
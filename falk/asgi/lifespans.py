@@ -1,12 +1,12 @@
 import asyncio
 import logging
 
+from falk.scheduling import run_in_executor
+
 logger = logging.getLogger("falk")
 
 
 async def run_entry_point(mutable_app, entry_point_name):
-    loop = asyncio.get_event_loop()
-
     def _func():
         for entry_point in mutable_app["entry_points"][entry_point_name]:
             try:
@@ -18,9 +18,9 @@ async def run_entry_point(mutable_app, entry_point_name):
                     entry_point,
                 )
 
-    return loop.run_in_executor(
-        executor=mutable_app["executor"],
-        func=_func,
+    return await run_in_executor(
+        mutable_app=mutable_app,
+        function=_func,
     )
 
 
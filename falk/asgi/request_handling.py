@@ -2,15 +2,23 @@ from urllib.parse import parse_qs
 import asyncio
 import json
 
-from falk.request_handling import get_request, handle_request
+from falk.scheduling import run_scheduled, run_in_executor
+from falk.asgi.stream_responses import handle_stream_response
 from falk.asgi.file_responses import handle_file_response
 from falk.asgi.multipart import handle_multipart_body
+from falk.errors import ServiceUnavailableError
 from falk.http import set_header, get_header
-from falk.asgi.helper import get_body
+from falk.asgi.helper import get_body, get_headers
+
+from falk.request_handling import (
+    get_service_unavailable_response,
+    handle_request_async,
+    handle_request,
+    get_request,
+)
 
 
 async def handle_http_request(mutable_app, event, scope, receive, send):
-    loop = asyncio.get_event_loop()
 
     # setup request
     request = get_request()
@@ -112,20 +120,121 @@ async def handle_http_request(mutable_app, event, scope, receive, send):
         request["valid"] = False
         request["exception"] = exception
 
+    # streaming
+    # Initial renders can be streamed. The chunks get written by the thread
+    # that renders the response, so they get passed to the event loop
+    # through a queue.
+    loop = asyncio.get_running_loop()
+    stream_queue = None
+    stream_writer = None
+
+    if (mutable_app["settings"]["stream_responses"] and
+            not request["is_mutation_request"]):
+
+        stream_queue = asyncio.Queue()
+
+        def stream_writer(response, chunk):
+            messages = []
+
+            if not response["is_streaming"]:
+                messages.append({
+                    "type": "http.response.start",
+                    "status": response["status"],
+                    "headers": get_headers(response),
+                })
+
+            messages.append({
+                "type": "http.response.body",
+                "body": chunk.encode(),
+                "more_body": True,
+            })
+
+            for message in messages:
+                loop.call_soon_threadsafe(stream_queue.put_nowait, message)
+
     # handle falk request
-    response = await loop.run_in_executor(
-        mutable_app["executor"],
-        lambda: handle_request(
+    async def _handle_request():
+        if mutable_app["settings"]["async_request_handling"]:
+            return await handle_request_async(
+                mutable_app=mutable_app,
+                request=request,
+                stream_writer=stream_writer,
+            )
+
+        return await run_in_executor(
             mutable_app=mutable_app,
-            request=request,
-        ),
-    )
+            function=lambda: handle_request(
+                mutable_app=mutable_app,
+                request=request,
+                stream_writer=stream_writer,
+            ),
+        )
+
+    async def _get_response():
+        try:
+            return await run_scheduled(
+                mutable_app=mutable_app,
+                path=request["path"],
+                callback=_handle_request,
+            )
+
+        except ServiceUnavailableError:
+            return get_service_unavailable_response()
+
+        # Chunks get added to the queue by loop callbacks, so the end of the
+        # stream has to be scheduled the same way to keep the order.
+        finally:
+            if stream_queue:
+                loop.call_soon(stream_queue.put_nowait, None)
+
+    if not stream_queue:
+        response = await _get_response()
+
+    else:
+        response_task = loop.create_task(_get_response())
+
+        while True:
+            message = await stream_queue.get()
+
+            if message is None:
+                break
+
+            await send(message)
+
+        response = await response_task
+
+        if response["is_streaming"]:
+
+            # Responses, that failed after the first chunk was sent, don't
+            # get ended, so the server closes the connection and the client
+            # sees a failed transfer instead of a truncated page.
+            if response["is_aborted"]:
+                return
+
+            await send({
+                "type": "http.response.body",
+                "body": b"",
+            })
+
+            return
 
     # send response
     # file responses
     if response["file_path"]:
         await handle_file_response(
+            mutable_app=mutable_app,
+            request=request,
+            response=response,
+            send=send,
+            extensions=scope.get("extensions"),
+        )
+
+    # stream responses
+    elif response["body_stream"] is not None:
+        await handle_stream_response(
+            mutable_app=mutable_app,
             response=response,
+            receive=receive,
             send=send,
         )
 
@@ -133,15 +242,7 @@ async def handle_http_request(mutable_app, event, scope, receive, send):
     else:
 
         # headers
-        headers = [
-            (str(name).encode("utf-8"), str(value).encode("utf-8"))
-            for name, value in response["headers"].items()
-        ]
-
-        for morsel in response["cookie"].values():
-            headers.append(
-                (b"Set-Cookie", morsel.OutputString().encode()),
-            )
+        headers = get_headers(response)
 
         # body
         if response["json"]:
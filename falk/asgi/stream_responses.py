@@ -0,0 +1,107 @@
+import asyncio
+import logging
+
+from falk.scheduling import run_in_executor
+from falk.asgi.helper import get_headers
+
+logger = logging.getLogger("falk")
+
+# Response streams get sent chunk by chunk. `send` returns when the server
+# is ready for more data, so slow clients slow down the iterator instead of
+# buffering the whole response in memory.
+# Async iterators run on the event loop. Sync iterators may block, so every
+# chunk gets pulled in the executor.
+
+_END_OF_STREAM = object()
+
+
+def _get_next_chunk(iterator):
+    return next(iterator, _END_OF_STREAM)
+
+
+async def _get_chunks(mutable_app, body_stream):
+    if hasattr(body_stream, "__aiter__"):
+        async for chunk in body_stream:
+            yield chunk
+
+        return
+
+    iterator = iter(body_stream)
+
+    while True:
+        chunk = await run_in_executor(
+            mutable_app=mutable_app,
+            function=lambda: _get_next_chunk(iterator),
+        )
+
+        if chunk is _END_OF_STREAM:
+            return
+
+        yield chunk
+
+
+async def _close_body_stream(mutable_app, body_stream):
+    # Generators get closed so their `finally` blocks run, even if the
+    # client disconnected before the stream was exhausted.
+    if hasattr(body_stream, "aclose"):
+        await body_stream.aclose()
+
+    elif hasattr(body_stream, "close"):
+        await run_in_executor(
+            mutable_app=mutable_app,
+            function=body_stream.close,
+        )
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def handle_stream_response(mutable_app, response, receive, send):
+    body_stream = response["body_stream"]
+    disconnect_task = asyncio.create_task(_wait_for_disconnect(receive))
+
+    await send({
+        "type": "http.response.start",
+        "status": response["status"],
+        "headers": get_headers(response),
+    })
+
+    try:
+        async for chunk in _get_chunks(mutable_app, body_stream):
+            if disconnect_task.done():
+                return
+
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+
+            if not chunk:
+                continue
+
+            await send({
+                "type": "http.response.body",
+                "body": chunk,
+                "more_body": True,
+            })
+
+    # The status and the headers were sent already, so the response doesn't
+    # get ended. The server closes the connection, and the client sees a
+    # failed transfer instead of a truncated body.
+    except Exception:
+        logger.exception("exception raised while streaming %r", body_stream)
+
+        return
+
+    finally:
+        disconnect_task.cancel()
+
+        await _close_body_stream(
+            mutable_app=mutable_app,
+            body_stream=body_stream,
+        )
+
+    await send({
+        "type": "http.response.body",
+        "body": b"",
+    })
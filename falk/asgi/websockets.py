@@ -2,11 +2,19 @@ from urllib.parse import parse_qs
 import asyncio
 import json
 
-from falk.request_handling import get_request, handle_request
+from falk.scheduling import run_scheduled, run_in_executor
+from falk.errors import ServiceUnavailableError
 from falk.http import set_header
 
+from falk.request_handling import (
+    get_service_unavailable_response,
+    handle_request_async,
+    handle_request,
+    get_request,
+)
 
-def _handle_websocket_request(mutable_app, scope, text):
+
+def _get_websocket_request(scope, text):
 
     # setup request
     request = get_request()
@@ -23,6 +31,8 @@ def _handle_websocket_request(mutable_app, scope, text):
 
     # we only accept mutation requests as websocket messages
     request["is_mutation_request"] = True
+    request["is_websocket_request"] = True
+    message_id = None
 
     try:
         message_id, message_data = json.loads(text)
@@ -33,33 +43,56 @@ def _handle_websocket_request(mutable_app, scope, text):
         request["valid"] = False
         request["exception"] = exception
 
+    return message_id, request
+
+
+def _get_websocket_message(message_id, response):
+    # The client only reads the JSON of mutation responses, so headers,
+    # cookies, and state don't get sent.
+    return [message_id, response["json"]]
+
+
+def _handle_websocket_request(mutable_app, scope, text):
+    message_id, request = _get_websocket_request(
+        scope=scope,
+        text=text,
+    )
+
     response = handle_request(
         mutable_app=mutable_app,
         request=request,
     )
 
-    return json.dumps([message_id, response])
+    return _get_websocket_message(
+        message_id=message_id,
+        response=response,
+    )
 
 
-async def _handle_websocket_message(loop, mutable_app, scope, event, send):
+async def _handle_websocket_request_async(mutable_app, scope, text):
+    message_id, request = _get_websocket_request(
+        scope=scope,
+        text=text,
+    )
 
-    # We need to run `_handle_websocket_request` in a thread because the
-    # called callback could be synchronous and block the event loop.
-    response_string = await loop.run_in_executor(
-        mutable_app["executor"],
-        lambda: _handle_websocket_request(
-            mutable_app=mutable_app,
-            scope=scope,
-            text=event["text"],
-        ),
+    response = await handle_request_async(
+        mutable_app=mutable_app,
+        request=request,
     )
 
+    return _get_websocket_message(
+        message_id=message_id,
+        response=response,
+    )
+
+
+async def _send_websocket_frame(send, data):
     try:
         # FIXME: check if "websocket.close" was already send
 
         await send({
             "type": "websocket.send",
-            "text": response_string,
+            "text": json.dumps(data, separators=(",", ":")),
         })
 
     except RuntimeError:
@@ -69,12 +102,106 @@ async def _handle_websocket_message(loop, mutable_app, scope, event, send):
         pass
 
 
+async def _send_websocket_message(mutable_app, connection, send, message):
+    batch_window = mutable_app["settings"]["websocket_batch_window"]
+
+    if not batch_window:
+        await _send_websocket_frame(send=send, data=message)
+
+        return
+
+    # batching
+    # Messages that are ready within the batch window get sent in one frame
+    # (`[[message_id, data], ...]`). The first message of a batch waits for
+    # the window to close and sends the whole batch. This reduces the
+    # per frame overhead, and permessage-deflate compresses larger frames
+    # better.
+    batch = connection["batch"]
+
+    batch.append(message)
+
+    if len(batch) > 1:
+        return
+
+    await asyncio.sleep(batch_window / 1000)
+
+    messages = batch.copy()
+
+    batch.clear()
+
+    if len(messages) == 1:
+        await _send_websocket_frame(send=send, data=messages[0])
+
+    else:
+        await _send_websocket_frame(send=send, data=messages)
+
+
+async def _handle_websocket_message(
+        mutable_app,
+        connection,
+        scope,
+        event,
+        send,
+):
+
+    async def _handle_request():
+        if mutable_app["settings"]["async_request_handling"]:
+            return await _handle_websocket_request_async(
+                mutable_app=mutable_app,
+                scope=scope,
+                text=event["text"],
+            )
+
+        # We need to run `_handle_websocket_request` in a thread because the
+        # called callback could be synchronous and block the event loop.
+        return await run_in_executor(
+            mutable_app=mutable_app,
+            function=lambda: _handle_websocket_request(
+                mutable_app=mutable_app,
+                scope=scope,
+                text=event["text"],
+            ),
+        )
+
+    # Websockets connect to the URL of the page, so messages are scheduled
+    # like mutation requests to the same page.
+    try:
+        message = await run_scheduled(
+            mutable_app=mutable_app,
+            path=scope["path"],
+            callback=_handle_request,
+        )
+
+    except ServiceUnavailableError:
+        message_id, _ = _get_websocket_request(
+            scope=scope,
+            text=event["text"],
+        )
+
+        message = _get_websocket_message(
+            message_id=message_id,
+            response=get_service_unavailable_response(),
+        )
+
+    await _send_websocket_message(
+        mutable_app=mutable_app,
+        connection=connection,
+        send=send,
+        message=message,
+    )
+
+
 async def handle_websocket(mutable_app, scope, receive, send):
     # TODO: We had problems with long running callbacks clogging the websocket
     # connection. It is fixed by introducing tasks but there is no test yet.
 
     loop = asyncio.get_event_loop()
 
+    connection = {
+        # messages that wait to be sent in one frame
+        "batch": [],
+    }
+
     while True:
         event = await receive()
 
@@ -98,8 +225,8 @@ async def handle_websocket(mutable_app, scope, receive, send):
             # callback can't clog the websocket for other callbacks.
             loop.create_task(
                 _handle_websocket_message(
-                    loop=loop,
                     mutable_app=mutable_app,
+                    connection=connection,
                     scope=scope,
                     event=event,
                     send=send,
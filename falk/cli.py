@@ -0,0 +1,97 @@
+import argparse
+import os
+
+from falk.rendering import precompile_component_templates
+from falk.compression import compress_static_files
+from falk.import_strings import import_attribute
+from falk.apps import run_configure_app
+
+
+def precompile(args):
+    if args.bytecode_cache_dir:
+        os.environ["FALK_JINJA2_BYTECODE_CACHE_DIR"] = args.bytecode_cache_dir
+
+    mutable_app = run_configure_app(
+        configure_app=import_attribute(args.configure_app),
+    )
+
+    if not mutable_app["settings"]["jinja2_bytecode_cache_dir"]:
+        print(
+            "WARNING: no bytecode cache dir is configured. The compiled "
+            "templates will be discarded",
+        )
+
+    template_count = precompile_component_templates(
+        mutable_app=mutable_app,
+    )
+
+    print(f"{template_count} component templates precompiled")
+
+
+def compress_static(args):
+    mutable_app = run_configure_app(
+        configure_app=import_attribute(args.configure_app),
+    )
+
+    file_count = compress_static_files(
+        mutable_app=mutable_app,
+        min_size=args.min_size,
+    )
+
+    print(f"{file_count} compressed static files written")
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog="falk")
+    sub_parsers = parser.add_subparsers(dest="command", required=True)
+
+    # precompile
+    precompile_parser = sub_parsers.add_parser(
+        "precompile",
+        help="precompile all component templates into the bytecode cache",
+    )
+
+    precompile_parser.add_argument(
+        "configure_app",
+        help="import string of the configure_app function (`module:function`)",  # NOQA
+    )
+
+    precompile_parser.add_argument(
+        "--bytecode-cache-dir",
+        default="",
+        help="overrides FALK_JINJA2_BYTECODE_CACHE_DIR",
+    )
+
+    precompile_parser.set_defaults(func=precompile)
+
+    # compress-static
+    compress_static_parser = sub_parsers.add_parser(
+        "compress-static",
+        help="write compressed siblings (.gz, .br, .zst) of all static files",
+    )
+
+    compress_static_parser.add_argument(
+        "configure_app",
+        help="import string of the configure_app function (`module:function`)",  # NOQA
+    )
+
+    compress_static_parser.add_argument(
+        "--min-size",
+        type=int,
+        default=0,
+        help="skip files smaller than this many bytes",
+    )
+
+    compress_static_parser.set_defaults(func=compress_static)
+
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,82 @@
-import hashlib
+import threading
 import base64
-import hmac
 
 from falk.dependency_injection import get_dependencies
 from falk.utils.iterables import add_unique_value
 from falk.import_strings import get_import_string
-from falk.errors import UnknownComponentIdError
 from falk.utils.path import get_abs_path
+from falk.signing import get_signer
+
+from falk.errors import (
+    UnknownComponentIdError,
+    InvalidComponentError,
+    HTMLError,
+)
+
+from falk.component_templates import (
+    get_constant_component_templates,
+    parse_component_template,
+)
+
+_lock = threading.Lock()
 
 
 def get_component_id(component, mutable_app):
     if component in mutable_app["components"]:
         return mutable_app["components"][component]
 
-    secret = mutable_app["settings"]["token_secret"]
+    # Components that are not registered, like components that are only
+    # used in `_get_upload_token` calls, get their ids memoized so we
+    # don't have to compute an HMAC on every render.
+    # The memo holds weak references, so components that were created at
+    # runtime can still get garbage collected. `get_signer` clears it when
+    # the secrets change.
+    signer = get_signer(mutable_app)
+    component_ids = mutable_app["component_ids"]
+
+    if component in component_ids:
+        return component_ids[component]
+
     import_string = get_import_string(component)
+    signature = signer.sign(import_string.encode())
+    component_id = base64.urlsafe_b64encode(signature).decode()
 
-    signature = hmac.new(
-        key=secret.encode(),
-        msg=import_string.encode(),
-        digestmod=hashlib.sha256,
-    )
+    with _lock:
+        try:
+            return component_ids.setdefault(component, component_id)
 
-    component_id = base64.urlsafe_b64encode(signature.digest()).decode()
+        # Some callables, like builtins, can't be weakly referenced.
+        except TypeError:
+            return component_id
 
-    return component_id
+
+def parse_constant_component_templates(component, mutable_app):
+    settings = mutable_app["settings"]
+
+    def _hash_string(string):
+        return settings["hash_string"](
+            mutable_app=mutable_app,
+            string=string,
+        )
+
+    for component_template in get_constant_component_templates(component):
+        try:
+            component_blocks = parse_component_template(
+                component_template=component_template,
+                component=component,
+                hash_string=_hash_string,
+            )
+
+        # Not every string constant is a component template. If the string
+        # is used as template anyway, the error gets raised when it gets
+        # parsed while rendering.
+        # `NotImplementedError` is raised for unsupported URLs.
+        except (HTMLError, InvalidComponentError, NotImplementedError):
+            continue
+
+        cache_key = (component, component_template)
+
+        mutable_app["component_templates"][cache_key] = component_blocks
 
 
 def register_component(component, mutable_app):
@@ -34,8 +86,33 @@ def register_component(component, mutable_app):
     )
 
     if component not in mutable_app["components"]:
-        mutable_app["components"][component_id] = component
-        mutable_app["components"][component] = component_id
+        with _lock:
+            mutable_app["components"][component_id] = component
+            mutable_app["components"][component] = component_id
+
+        # Component ids are derived from the token secret. To keep tokens,
+        # that were signed with a fallback secret, working we also register
+        # the component ids derived from the fallback secrets.
+        signer = get_signer(mutable_app)
+        import_string = get_import_string(component).encode()
+
+        for key_id in signer.key_ids:
+            if key_id == signer.key_id:
+                continue
+
+            fallback_component_id = base64.urlsafe_b64encode(
+                signer.sign(import_string, key_id=key_id),
+            ).decode()
+
+            mutable_app["components"].setdefault(
+                fallback_component_id,
+                component,
+            )
+
+        parse_constant_component_templates(
+            component=component,
+            mutable_app=mutable_app,
+        )
 
     _, dependencies = get_dependencies(
         callback=component,
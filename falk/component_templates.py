@@ -1,4 +1,5 @@
 from html.parser import HTMLParser
+import dis
 
 from falk.import_strings import get_import_string
 
@@ -37,7 +38,7 @@ class ComponentTemplateParser(HTMLParser):
     def get_index(self):
         line_number, offset = self.getpos()
 
-        return sum(self._line_lengths[:line_number-1]) + offset
+        return self._line_offsets[line_number-1] + offset
 
     def get_current_tag_name(self, normalized_tag_name):
         index = self.get_index()
@@ -134,6 +135,13 @@ class ComponentTemplateParser(HTMLParser):
                     f"{get_import_string(self._component)}: the underscore attribute is not available in component calls, only in HTML tags",  # NOQA
                 )
 
+            # deferred components: <Component fx-defer></Component>
+            if key == "fx-defer":
+                key = "_defer"
+
+                if value is None:
+                    value = "{{ True }}"
+
             # key only attributes: <Component foo></Component>
             if value is None:
                 function_args_parts.append(
@@ -258,6 +266,7 @@ class ComponentTemplateParser(HTMLParser):
                 overrides.update({
                     "_node_id": "{{ node_id }}",
                     "_token": "{{ _token }}",
+                    "_props_hash": "{{ _props_hash }}",
                 })
 
             self.write(
@@ -282,6 +291,7 @@ class ComponentTemplateParser(HTMLParser):
             if is_root_node:
                 self.write(
                     '{% if _token %} fx-id="{{ node_id }}"{% endif %}',
+                    '{% if _token and _props_hash %} fx-hash="{{ _props_hash }}"{% endif %}',  # NOQA
                 )
 
             self.write(">")
@@ -310,6 +320,7 @@ class ComponentTemplateParser(HTMLParser):
                 overrides.update({
                     "_node_id": "{{ node_id }}",
                     "_token": "{{ _token }}",
+                    "_props_hash": "{{ _props_hash }}",
                 })
 
             self.write(
@@ -405,10 +416,16 @@ class ComponentTemplateParser(HTMLParser):
 
         self._has_root_node = False
         self._stack = []
-        self._line_lengths = []
+        # `HTMLParser.getpos()` returns line numbers and offsets, so we
+        # precompute the index of the first character of every line.
+        # `HTMLParser` only counts "\n" as line breaks.
+        self._line_offsets = [0]
+        index = component_template.find("\n")
 
-        for line in component_template.splitlines(keepends=True):
-            self._line_lengths.append(len(line))
+        while index > -1:
+            self._line_offsets.append(index + 1)
+
+            index = component_template.find("\n", index + 1)
 
         self.feed(data=component_template)
 
@@ -561,3 +578,34 @@ def parse_component_template(
         component=component,
         hash_string=hash_string,
     )
+
+
+def get_constant_component_templates(component):
+    # Finds all strings that a component returns as constants. These are the
+    # only templates we can know before the component ran.
+    code = getattr(component, "__code__", None)
+
+    if code is None:
+        return []
+
+    component_templates = []
+    previous_instruction = None
+
+    for instruction in dis.get_instructions(code):
+        value = None
+
+        if instruction.opname == "RETURN_CONST":  # Python >= 3.12
+            value = instruction.argval
+
+        elif (instruction.opname == "RETURN_VALUE" and
+              previous_instruction is not None and
+              previous_instruction.opname == "LOAD_CONST"):
+
+            value = previous_instruction.argval
+
+        if isinstance(value, str) and value not in component_templates:
+            component_templates.append(value)
+
+        previous_instruction = instruction
+
+    return component_templates
@@ -0,0 +1,304 @@
+import logging
+import json
+import gzip
+import os
+
+from falk.http import set_header, get_header
+
+try:
+    import brotli
+
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    from compression import zstd  # Python >= 3.14
+
+except ImportError:  # pragma: no cover
+    try:
+        import zstandard as zstd
+
+    except ImportError:
+        zstd = None
+
+logger = logging.getLogger("falk")
+
+FALK_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Files that are compressed already don't get smaller when compressed again.
+INCOMPRESSIBLE_FILE_EXTENSIONS = (
+    ".gz", ".br", ".zst", ".zip", ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".avif", ".ico", ".woff", ".woff2", ".mp3", ".mp4", ".webm", ".pdf",
+)
+
+
+# Only text-like bodies get compressed. Binary formats are mostly
+# compressed already.
+COMPRESSIBLE_CONTENT_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def is_compressible_content_type(content_type):
+    content_type = content_type.split(";")[0].strip().lower()
+
+    return (
+        content_type.startswith("text/") or
+        content_type.endswith(("+json", "+xml")) or
+        content_type in COMPRESSIBLE_CONTENT_TYPES
+    )
+
+
+# compressors
+def _compress_gzip(data):
+    # `mtime=0` makes the output reproducible
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _compress_brotli(data):
+    return brotli.compress(data)
+
+
+def _compress_zstd(data):
+    if hasattr(zstd, "ZstdCompressor"):
+        return zstd.ZstdCompressor().compress(data)
+
+    return zstd.compress(data)  # pragma: no cover
+
+
+# name: (file extension, compress, available)
+ENCODINGS = {
+    "zstd": (".zst", _compress_zstd, zstd is not None),
+    "br": (".br", _compress_brotli, brotli is not None),
+    "gzip": (".gz", _compress_gzip, True),
+}
+
+
+def get_available_encodings(mutable_app):
+    return [
+        name for name in mutable_app["settings"]["compression_encodings"]
+        if name in ENCODINGS and ENCODINGS[name][2]
+    ]
+
+
+def parse_accept_encoding(accept_encoding):
+    # "gzip, br;q=0.8, *;q=0" -> {"gzip": 1.0, "br": 0.8, "*": 0.0}
+    encodings = {}
+
+    for part in accept_encoding.split(","):
+        name, _, parameters = part.partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+
+        if not name:
+            continue
+
+        for parameter in parameters.split(";"):
+            key, _, value = parameter.partition("=")
+
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+
+                except ValueError:
+                    quality = 0.0
+
+        encodings[name] = quality
+
+    return encodings
+
+
+def get_accepted_encodings(mutable_app, request):
+    # Returns all available encodings the client accepts, ordered by the
+    # quality the client gave them, and by the order of
+    # `settings["compression_encodings"]` for equal qualities.
+    accept_encoding = get_header(
+        headers=request["headers"],
+        name="Accept-Encoding",
+        default="",
+    )
+
+    accepted_encodings = parse_accept_encoding(accept_encoding)
+    encodings = []
+
+    for index, name in enumerate(get_available_encodings(mutable_app)):
+        quality = accepted_encodings.get(
+            name,
+            accepted_encodings.get("*", 0.0),
+        )
+
+        if quality > 0:
+            encodings.append((-quality, index, name))
+
+    return [name for _, _, name in sorted(encodings)]
+
+
+def compress_response(mutable_app, request, response):
+    settings = mutable_app["settings"]
+
+    # Websocket messages get compressed by the websocket protocol
+    # (permessage-deflate).
+    if (not settings["compress_responses"] or
+            request["is_websocket_request"]):
+
+        return
+
+    # Streamed responses were already sent, and responses that set their
+    # own encoding get sent as they are.
+    if (response["is_streaming"] or
+            response["body_stream"] is not None or
+            get_header(response["headers"], "Content-Encoding", "")):
+
+        return
+
+    # files
+    # Files don't get compressed on the fly. If a static file has a
+    # compressed sibling (`main.css.br`, `main.css.gz`), it gets sent
+    # instead. Siblings are looked up in the static manifest, so this needs
+    # no file system access.
+    if response["file_path"]:
+        file_stat = response["file_stat"]
+
+        if not file_stat:
+            return
+
+        set_header(response["headers"], "Vary", "Accept-Encoding")
+
+        for name in get_accepted_encodings(mutable_app, request):
+            if name in file_stat["compressed_files"]:
+                response["file_encoding"] = name
+
+                return
+
+        return
+
+    # bodies
+    if response["json"]:
+        body = json.dumps(response["json"])
+
+    else:
+        body = response["body"]
+
+    if isinstance(body, str):
+        body = body.encode()
+
+    if not isinstance(body, bytes):
+        return
+
+    if len(body) < settings["compression_threshold"]:
+        return
+
+    if not response["json"] and not is_compressible_content_type(
+            get_header(
+                response["headers"],
+                "Content-Type",
+                response["content_type"],
+            )):
+
+        return
+
+    set_header(response["headers"], "Vary", "Accept-Encoding")
+
+    accepted_encodings = get_accepted_encodings(mutable_app, request)
+
+    if not accepted_encodings:
+        return
+
+    name = accepted_encodings[0]
+    compressed_body = ENCODINGS[name][1](body)
+
+    if len(compressed_body) >= len(body):
+        return
+
+    set_header(response["headers"], "Content-Encoding", name)
+
+    response["json"] = None
+    response["body"] = compressed_body
+
+
+def _is_in_falk_package(path):
+    path = os.path.abspath(path)
+
+    return os.path.commonpath([path, FALK_PACKAGE_DIR]) == FALK_PACKAGE_DIR
+
+
+def _compress_static_file(abs_path, encodings, min_size):
+    file_count = 0
+
+    if os.path.getsize(abs_path) < min_size:
+        return file_count
+
+    with open(abs_path, "rb") as f:
+        data = None
+
+        for name in encodings:
+            extension, compress, _ = ENCODINGS[name]
+            compressed_path = abs_path + extension
+
+            if (os.path.exists(compressed_path) and
+                    os.path.getmtime(compressed_path) >=
+                    os.path.getmtime(abs_path)):
+
+                continue
+
+            if data is None:
+                data = f.read()
+
+            compressed_data = compress(data)
+
+            # Compressed files, that are not smaller than the original, would
+            # only waste bandwidth.
+            if len(compressed_data) >= len(data):
+                if os.path.exists(compressed_path):
+                    os.remove(compressed_path)
+
+                continue
+
+            with open(compressed_path, "wb") as compressed_file:
+                compressed_file.write(compressed_data)
+
+            file_count += 1
+
+    return file_count
+
+
+def compress_static_files(mutable_app, min_size=0):
+    # Writes compressed siblings for all files in the static dirs, using all
+    # available encodings. Siblings that are newer than their file are kept.
+    # falk's own static files are part of the installed package, which is
+    # often not writable, so they get skipped.
+    encodings = get_available_encodings(mutable_app)
+    file_count = 0
+
+    for static_dir in mutable_app["settings"]["static_dirs"]:
+        if _is_in_falk_package(static_dir):
+            continue
+
+        for root, _, file_names in os.walk(static_dir):
+            for file_name in file_names:
+                if file_name.lower().endswith(INCOMPRESSIBLE_FILE_EXTENSIONS):
+                    continue
+
+                abs_path = os.path.join(root, file_name)
+
+                # Files that can't be read or written get reported, and
+                # don't stop the other files from being compressed.
+                try:
+                    file_count += _compress_static_file(
+                        abs_path=abs_path,
+                        encodings=encodings,
+                        min_size=min_size,
+                    )
+
+                except OSError:
+                    logger.exception("compressing %s failed", abs_path)
+
+    # The static manifest gets rebuilt on the next lookup, so it contains
+    # the new siblings.
+    if file_count:
+        mutable_app["static_manifest"] = None
+
+    return file_count
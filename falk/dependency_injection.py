@@ -1,3 +1,6 @@
+from contextlib import nullcontext, closing
+from weakref import WeakKeyDictionary
+import threading
 import asyncio
 import inspect
 
@@ -9,7 +12,17 @@ from falk.errors import (
 )
 
 
-def get_dependencies(callback):
+# Signatures get cached weak-keyed by callable, so components, providers, and
+# middlewares are inspected only once and the cache does not keep callables,
+# that are defined at runtime, alive.
+# Bound methods are created on every attribute access, so we key them by their
+# underlying function.
+_signature_cache = WeakKeyDictionary()
+_method_signature_cache = WeakKeyDictionary()
+_signature_cache_lock = threading.Lock()
+
+
+def _inspect_signature(callback):
     required_dependencies = []
     dependencies = {}
 
@@ -22,7 +35,55 @@ def get_dependencies(callback):
         else:
             dependencies[name] = parameter.default
 
-    return required_dependencies, dependencies
+    return tuple(required_dependencies), dependencies
+
+
+def get_signature(callback):
+    cache = _signature_cache
+    cache_key = callback
+
+    if inspect.ismethod(callback):
+        cache = _method_signature_cache
+        cache_key = callback.__func__
+
+    try:
+        with _signature_cache_lock:
+            signature = cache.get(cache_key)
+
+    except TypeError:
+
+        # callables that can not be weak referenced can not be cached
+        return _inspect_signature(callback)
+
+    if signature is None:
+        signature = _inspect_signature(callback)
+
+        with _signature_cache_lock:
+            cache[cache_key] = signature
+
+    return signature
+
+
+def clear_signature_cache():
+    with _signature_cache_lock:
+        _signature_cache.clear()
+        _method_signature_cache.clear()
+
+
+def get_dependencies(callback):
+    required_dependencies, dependencies = get_signature(callback)
+
+    # the cached values are shared, so we return copies
+    return list(required_dependencies), dict(dependencies)
+
+
+# Request caches, that are shared between threads, hold a lock under this key,
+# so request scoped providers still run only once per request.
+REQUEST_CACHE_LOCK = object()
+
+
+def share_request_cache(request_cache):
+    request_cache.setdefault(REQUEST_CACHE_LOCK, threading.RLock())
 
 
 def run_coroutine_sync(coroutine):
@@ -48,35 +109,23 @@ def format_dependencies(items):
     return " -> ".join(formated_items)
 
 
-def run_callback(
+def _get_resolution_steps(
         callback,
-        dependencies=None,
-        providers=None,
-        cache=None,
-        get_dependencies=get_dependencies,
-        run_coroutine_sync=run_coroutine_sync,
-        _stack=None,
+        dependencies,
+        providers,
+        cache,
+        request_cache,
+        request_scoped_providers,
+        get_dependencies,
+        _stack,
 ):
 
-    # TODO: replace `dependencies` and `providers` with `dependencies` and
-    # `uncachable_dependencies` which both should be implemented as
-    # providers (callbacks).
-    # With the current model, providers with dependencies like `caller`, which
-    # need to be re evaluated on every call, not only per request, don't work
-    # if dependency caching is enabled.
-    # The `providers` keyword is already removed from docs but that is a hack.
-    # We just feed `settings["dependencies"]` in as providers in rendering.
-
-    dependencies = dependencies or {}
-    providers = providers or {}
-    _stack = _stack or []
-
-    # We need to be very specific here because it is important that we use the
-    # exact same object for the entire tree of dependencies.
-    # `cache = cache or {}` would override the cache with every node that
-    # yields no cached values.
-    if cache is None:
-        cache = {}
+    # This generator walks the dependencies of a callback, and yields the
+    # name of every provider that needs to run. The caller runs the provider
+    # and sends its result back, so `run_callback` and `run_callback_async`
+    # share the same resolution logic and only differ in how providers get
+    # called.
+    # The generator returns the keyword arguments for the callback.
 
     # inspect callback
     required_dependencies, _ = get_dependencies(callback=callback)
@@ -108,30 +157,119 @@ def run_callback(
 
             continue
 
-        # providers need to be callable
-        if not callable(providers[name]):
-            raise InvalidDependencyProviderError(providers[name])
+        request_scoped = (
+            request_cache is not None and
+            name in request_scoped_providers
+        )
+
+        request_cache_lock = nullcontext()
 
-        # if we try to resolve a dependency that is already on the stack
-        # we know we encountered a circular dependency
-        if name in _stack:
-            raise CircularDependencyError(
-                format_dependencies([*_stack, name])
+        if request_scoped:
+            request_cache_lock = (
+                request_cache.get(REQUEST_CACHE_LOCK) or request_cache_lock
             )
 
-        # run provider
-        dependency = run_callback(
-            callback=providers[name],
-            providers=providers,
-            dependencies=dependencies,
-            cache=cache,
-            get_dependencies=get_dependencies,
-            run_coroutine_sync=run_coroutine_sync,
-            _stack=_stack + [name],
-        )
+        # The lock is held while the provider runs, so other threads that
+        # need the same provider wait for its result.
+        with request_cache_lock:
+            if request_scoped and name in request_cache:
+                callback_dependencies[name] = request_cache[name]
+                cache[name] = request_cache[name]
+
+                continue
+
+            # providers need to be callable
+            if not callable(providers[name]):
+                raise InvalidDependencyProviderError(providers[name])
+
+            # if we try to resolve a dependency that is already on the stack
+            # we know we encountered a circular dependency
+            if name in _stack:
+                raise CircularDependencyError(
+                    format_dependencies([*_stack, name])
+                )
+
+            # run provider
+            dependency = yield name
+
+            callback_dependencies[name] = dependency
+            cache[name] = dependency
+
+            if request_scoped:
+                request_cache[name] = dependency
+
+    return callback_dependencies
+
 
-        callback_dependencies[name] = dependency
-        cache[name] = dependency
+def run_callback(
+        callback,
+        dependencies=None,
+        providers=None,
+        cache=None,
+        request_cache=None,
+        request_scoped_providers=(),
+        get_dependencies=get_signature,
+        run_coroutine_sync=run_coroutine_sync,
+        _stack=None,
+):
+
+    # Provider results are cached in two scopes:
+    #
+    #   - `cache`: per call. Providers can depend on values like `caller`,
+    #     that change with every call, so by default, providers get
+    #     re evaluated for every callback.
+    #   - `request_cache`: per request. Providers which names are in
+    #     `request_scoped_providers` run only once per request and their
+    #     results get shared between all middlewares and components.
+    #     Request scoped providers must not depend on per call values.
+
+    dependencies = dependencies or {}
+    providers = providers or {}
+    _stack = _stack or []
+
+    # We need to be very specific here because it is important that we use the
+    # exact same object for the entire tree of dependencies.
+    # `cache = cache or {}` would override the cache with every node that
+    # yields no cached values.
+    if cache is None:
+        cache = {}
+
+    resolution_steps = _get_resolution_steps(
+        callback=callback,
+        dependencies=dependencies,
+        providers=providers,
+        cache=cache,
+        request_cache=request_cache,
+        request_scoped_providers=request_scoped_providers,
+        get_dependencies=get_dependencies,
+        _stack=_stack,
+    )
+
+    # `closing` makes sure the request cache lock gets released if a
+    # provider raises
+    with closing(resolution_steps):
+        dependency = None
+
+        while True:
+            try:
+                name = resolution_steps.send(dependency)
+
+            except StopIteration as stop_iteration:
+                callback_dependencies = stop_iteration.value
+
+                break
+
+            dependency = run_callback(
+                callback=providers[name],
+                providers=providers,
+                dependencies=dependencies,
+                cache=cache,
+                request_cache=request_cache,
+                request_scoped_providers=request_scoped_providers,
+                get_dependencies=get_dependencies,
+                run_coroutine_sync=run_coroutine_sync,
+                _stack=_stack + [name],
+            )
 
     # run callback
     return_value = callback(**callback_dependencies)
@@ -140,3 +278,88 @@ def run_callback(
         return run_coroutine_sync(return_value)
 
     return return_value
+
+
+async def run_callback_async(
+        callback,
+        dependencies=None,
+        providers=None,
+        cache=None,
+        request_cache=None,
+        request_scoped_providers=(),
+        inline_providers=(),
+        get_dependencies=get_signature,
+        run_sync=None,
+        _run_inline=False,
+        _stack=None,
+):
+
+    # This is the async twin of `run_callback`.
+    # Coroutine functions get awaited directly. Sync callables get passed to
+    # `run_sync`, which is expected to return an awaitable, so they can run
+    # in an executor and don't block the event loop. If no `run_sync` is set,
+    # sync callables run inline.
+    # Providers which names are in `inline_providers` are known to be cheap
+    # (like falk's built-in providers, that only create closures), so they
+    # run inline, to not pay for a thread hop per dependency.
+
+    dependencies = dependencies or {}
+    providers = providers or {}
+    _stack = _stack or []
+
+    if cache is None:
+        cache = {}
+
+    resolution_steps = _get_resolution_steps(
+        callback=callback,
+        dependencies=dependencies,
+        providers=providers,
+        cache=cache,
+        request_cache=request_cache,
+        request_scoped_providers=request_scoped_providers,
+        get_dependencies=get_dependencies,
+        _stack=_stack,
+    )
+
+    with closing(resolution_steps):
+        dependency = None
+
+        while True:
+            try:
+                name = resolution_steps.send(dependency)
+
+            except StopIteration as stop_iteration:
+                callback_dependencies = stop_iteration.value
+
+                break
+
+            dependency = await run_callback_async(
+                callback=providers[name],
+                providers=providers,
+                dependencies=dependencies,
+                cache=cache,
+                request_cache=request_cache,
+                request_scoped_providers=request_scoped_providers,
+                inline_providers=inline_providers,
+                get_dependencies=get_dependencies,
+                run_sync=run_sync,
+                _run_inline=name in inline_providers,
+                _stack=_stack + [name],
+            )
+
+    # run callback
+    if inspect.iscoroutinefunction(callback):
+        return await callback(**callback_dependencies)
+
+    if run_sync is None or _run_inline:
+        return_value = callback(**callback_dependencies)
+
+    else:
+        return_value = await run_sync(
+            lambda: callback(**callback_dependencies),
+        )
+
+    if asyncio.iscoroutine(return_value):
+        return await return_value
+
+    return return_value
@@ -143,3 +143,8 @@ class AsgiError(FalkError):
 
 class InvalidMountPointError(AsgiError):
     pass
+
+
+# scheduling
+class ServiceUnavailableError(FalkError):
+    pass
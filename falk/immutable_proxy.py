@@ -16,6 +16,32 @@ def get_immutable_proxy(data, name="", mutable_version_name=""):
     return data
 
 
+def _get_child_proxy(proxy, key, data):
+    # Only dicts and lists get wrapped. Everything else is returned as is,
+    # without allocating anything.
+    if not isinstance(data, (dict, list)):
+        return data
+
+    # Child proxies get cached per key so repeated lookups, and loops in
+    # templates, don't allocate a new proxy for every access.
+    # The cache entry is only valid as long as the key still points to the
+    # same object.
+    child_proxy = proxy._children.get(key)
+
+    if child_proxy is not None and child_proxy._data is data:
+        return child_proxy
+
+    child_proxy = get_immutable_proxy(
+        data=data,
+        name=proxy._name,
+        mutable_version_name=proxy._mutable_version_name,
+    )
+
+    proxy._children[key] = child_proxy
+
+    return child_proxy
+
+
 def _raise_error(proxy):
     error_message = "immutable data"
 
@@ -29,29 +55,29 @@ def _raise_error(proxy):
 
 
 class ImmutableProxyDict(dict):
+    __slots__ = (
+        "_data",
+        "_name",
+        "_mutable_version_name",
+        "_children",
+    )
+
     def __init__(self, data, name="", mutable_version_name=""):
         self._data = data
         self._name = name
         self._mutable_version_name = mutable_version_name
+        self._children = {}
 
     def __repr__(self):
         return f"<{self.__class__.__name__}({repr(self._data)})>"
 
     # proxied methods
     def __getitem__(self, key):
-        return get_immutable_proxy(
-            data=self._data.__getitem__(key),
-            name=self._name,
-            mutable_version_name=self._mutable_version_name,
-        )
+        return _get_child_proxy(self, key, self._data[key])
 
     def __iter__(self):
-        for item in self._data:
-            yield get_immutable_proxy(
-                data=item,
-                name=self._name,
-                mutable_version_name=self._mutable_version_name,
-            )
+        # dict keys are hashable and therefore never dicts or lists
+        return iter(self._data)
 
     def __contains__(self, *args, **kwargs):
         return self._data.__contains__(*args, **kwargs)
@@ -70,19 +96,11 @@ class ImmutableProxyDict(dict):
 
     def items(self, *args, **kwargs):
         for key, value in self._data.items(*args, **kwargs):
-            yield key, get_immutable_proxy(
-                data=value,
-                name=self._name,
-                mutable_version_name=self._mutable_version_name,
-            )
+            yield key, _get_child_proxy(self, key, value)
 
     def values(self, *args, **kwargs):
-        for value in self._data.values(*args, **kwargs):
-            yield get_immutable_proxy(
-                data=value,
-                name=self._name,
-                mutable_version_name=self._mutable_version_name,
-            )
+        for key, value in self._data.items(*args, **kwargs):
+            yield _get_child_proxy(self, key, value)
 
     def keys(self, *args, **kwargs):
         return self._data.keys(*args, **kwargs)
@@ -117,30 +135,39 @@ class ImmutableProxyDict(dict):
 
 
 class ImmutableProxyList(list):
+    __slots__ = (
+        "_data",
+        "_name",
+        "_mutable_version_name",
+        "_children",
+    )
+
     def __init__(self, data, name="", mutable_version_name=""):
         self._data = data
         self._name = name
         self._mutable_version_name = mutable_version_name
+        self._children = {}
 
     def __repr__(self):
         return f"<{self.__class__.__name__}({repr(self._data)})>"
 
     # proxied methods
     def __getitem__(self, key):
-        return get_immutable_proxy(
-            data=self._data.__getitem__(key),
-            name=self._name,
-            mutable_version_name=self._mutable_version_name,
-        )
-
-    def __iter__(self):
-        for item in self._data:
-            yield get_immutable_proxy(
-                data=item,
+        # slices create new lists on every call, so caching them would
+        # only leak memory
+        if isinstance(key, slice):
+            return get_immutable_proxy(
+                data=self._data[key],
                 name=self._name,
                 mutable_version_name=self._mutable_version_name,
             )
 
+        return _get_child_proxy(self, key, self._data[key])
+
+    def __iter__(self):
+        for index, item in enumerate(self._data):
+            yield _get_child_proxy(self, index, item)
+
     def __contains__(self, *args, **kwargs):
         return self._data.__contains__(*args, **kwargs)
 
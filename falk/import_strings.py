@@ -1,2 +1,18 @@
+import importlib
+
+
 def get_import_string(attribute):
     return f"{attribute.__module__}.{attribute.__qualname__}"
+
+
+def import_attribute(import_string):
+    # supports "module.attribute" and "module:attribute"
+    if ":" in import_string:
+        module_name, attribute_name = import_string.split(":", 1)
+
+    else:
+        module_name, attribute_name = import_string.rsplit(".", 1)
+
+    module = importlib.import_module(module_name)
+
+    return getattr(module, attribute_name)
@@ -1,16 +1,15 @@
-import os
-
 from falk.errors import NotFoundError
+from falk.http import set_header
+
+from falk.static_files import (
+    get_fingerprinted_static_file,
+    get_static_file,
+)
 
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
-def serve_static_files(
-        request,
-        response,
-        settings,
-        set_response_file,
-        set_response_status,
-        set_response_body,
-):
+
+def serve_static_files(mutable_app, request, response, settings):
 
     # NOTE: This needs to be a middleware because the prefix for static URLs
     # should be configurable in the settings (settings["static_url_prefix"]).
@@ -26,18 +25,32 @@ def serve_static_files(
     if rel_path.startswith("/"):
         rel_path = rel_path[1:]
 
-    for static_dir in settings["static_dirs"]:
-        abs_path = os.path.join(
-            static_dir,
-            rel_path,
-        )
-
-        if not os.path.exists(abs_path):
-            continue
-
-        # matching file found
-        set_response_file(abs_path)
+    file_stat = get_static_file(
+        mutable_app=mutable_app,
+        rel_path=rel_path,
+    )
 
-        return
+    # fingerprinted URLs
+    if not file_stat and settings["fingerprint_static_urls"]:
+        file_stat, is_current = get_fingerprinted_static_file(
+            mutable_app=mutable_app,
+            rel_path=rel_path,
+        )
 
-    raise NotFoundError()
+        if is_current:
+            set_header(
+                response["headers"],
+                "Cache-Control",
+                IMMUTABLE_CACHE_CONTROL,
+            )
+
+    if not file_stat:
+        raise NotFoundError()
+
+    # Static files get served inline, not as downloads.
+    response.update({
+        "file_path": file_stat["abs_path"],
+        "file_stat": file_stat,
+        "file_attachment": False,
+        "is_finished": True,
+    })
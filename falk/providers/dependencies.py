@@ -1,13 +1,37 @@
+from falk.utils.iterables import add_unique_value
+
+DEPENDENCY_SCOPES = ("call", "request")
+
+
 def add_dependency_provider(mutable_settings):
-    def add_dependency(dependency, name=""):
+    def add_dependency(dependency, name="", scope="call"):
         if not callable(dependency):
             raise ValueError("dependency needs to be a callback")
 
         if name and not isinstance(name, str):
             raise ValueError("name needs to be a string")
 
+        if scope not in DEPENDENCY_SCOPES:
+            raise ValueError(
+                f"scope needs to be one of {', '.join(DEPENDENCY_SCOPES)}",
+            )
+
         name = name or dependency.__name__
+        request_scoped_dependencies = (
+            mutable_settings["request_scoped_dependencies"]
+        )
 
         mutable_settings["dependencies"][name] = dependency
 
+        # Custom providers may block, so they never run inline, even if
+        # they replace a built-in provider.
+        if name in mutable_settings["inline_dependencies"]:
+            mutable_settings["inline_dependencies"].remove(name)
+
+        if scope == "request":
+            add_unique_value(request_scoped_dependencies, name)
+
+        elif name in request_scoped_dependencies:
+            request_scoped_dependencies.remove(name)
+
     return add_dependency
@@ -168,6 +168,31 @@ def set_response_file_provider(response, caller, is_root):
     return set_response_file
 
 
+def set_response_stream_provider(response, is_root):
+    def set_response_stream(iterable):
+        if not is_root:
+            raise RuntimeError(
+                "set_response_stream can only be used in root components",
+            )
+
+        if not (hasattr(iterable, "__iter__") or
+                hasattr(iterable, "__aiter__")):
+
+            raise RuntimeError(
+                "response streams need to be iterables or async iterables",
+            )
+
+        if isinstance(iterable, (str, bytes)):
+            raise RuntimeError(
+                "response streams need to yield chunks, use set_response_body for strings and bytes",  # NOQA
+            )
+
+        response["body_stream"] = iterable
+        response["is_finished"] = True
+
+    return set_response_stream
+
+
 def set_response_json_provider(response, is_root):
     def set_response_json(data):
         if not is_root:
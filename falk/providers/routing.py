@@ -1,23 +1,52 @@
+from falk.scheduling import set_route_limits
+from falk.errors import InvalidRouteError
 from falk import routing
 
 
 def add_route_provider(mutable_app):
-    def add_route(pattern, component, name=""):
-        mutable_app["routes"].append(
-            routing.get_route(
-                pattern=pattern,
-                component=component,
-                name=name,
-            ),
+    def add_route(
+            pattern,
+            component,
+            name="",
+            max_concurrency=0,
+            max_pending=0,
+    ):
+
+        route = routing.get_route(
+            pattern=pattern,
+            component=component,
+            name=name,
         )
 
+        if name:
+            if name in mutable_app["route_names"]:
+                raise InvalidRouteError(
+                    f'a route with name "{name}" already exists',
+                )
+
+            mutable_app["route_names"][name] = route
+
+        mutable_app["routes"].append(route)
+
+        if max_concurrency or max_pending:
+            set_route_limits(
+                mutable_app=mutable_app,
+                component=component,
+                max_concurrency=max_concurrency,
+                max_pending=max_pending,
+            )
+
     return add_route
 
 
-def get_url_provider(app, request):
-    def get_url(route_name, route_args=None, query=None, checks=True):
+def get_url_provider(mutable_app, request):
+    def get_url(route_name, route_args=None, query=None, checks=None):
+        if checks is None:
+            checks = mutable_app["settings"]["check_urls"]
+
         return routing.get_url(
-            routes=app["routes"],
+            routes=mutable_app["routes"],
+            route_names=mutable_app["route_names"],
             route_name=route_name,
             route_args=route_args,
             query=query,
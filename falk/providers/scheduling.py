@@ -0,0 +1,10 @@
+from falk import scheduling
+
+
+def get_scheduler_stats_provider(mutable_app):
+    def get_scheduler_stats():
+        return scheduling.get_scheduler_stats(
+            mutable_app=mutable_app,
+        )
+
+    return get_scheduler_stats
@@ -8,19 +8,41 @@ KEYS = [
     "run_coroutine_sync",
     "hash_string",
     "websockets",
+    "websocket_batch_window",
     "default_file_upload_handler",
+    "async_request_handling",
+    "max_pending_requests",
+    "stream_responses",
+
+    # routing
+    "check_urls",
 
     # static files
     "static_url_prefix",
+    "fingerprint_static_urls",
+    "file_chunk_size",
+    "static_file_cache_size",
+    "static_file_cache_max_file_size",
+
+    # compression
+    "compress_responses",
+    "compress_response",
+    "compression_encodings",
+    "compression_threshold",
 
     # tokens
     "token_secret",
+    "token_fallback_secrets",
     "encode_token",
     "decode_token",
+    "token_serializer",
+    "token_compression",
+    "token_compression_threshold",
 
     # components
     "node_id_random_bytes",
     "get_node_id",
+    "partial_rendering",
 
     # error components
     "bad_request_error_component",
@@ -36,6 +58,9 @@ KEYS = [
 
     # templating
     "extra_template_context",
+    "template_cache_size",
+    "precompile_templates",
+    "jinja2_bytecode_cache_dir",
 ]
 
 logger = logging.getLogger("falk.settings")
@@ -1,4 +1,4 @@
-from falk.static_files import get_static_url
+from falk.static_files import get_fingerprinted_rel_path, get_static_url
 from falk.utils.path import get_abs_path
 
 
@@ -18,12 +18,15 @@ def add_static_dir_provider(caller, mutable_settings):
     return add_static_dir
 
 
-def get_static_url_provider(settings, request):
+def get_static_url_provider(mutable_app, request):
     def _get_static_url(rel_path):
         return get_static_url(
             root_path=request["root_path"] or "/",
-            static_url_prefix=settings["static_url_prefix"],
-            rel_path=rel_path,
+            static_url_prefix=mutable_app["settings"]["static_url_prefix"],
+            rel_path=get_fingerprinted_rel_path(
+                mutable_app=mutable_app,
+                rel_path=rel_path,
+            ),
         )
 
     return _get_static_url
@@ -1,17 +1,39 @@
+from collections import ChainMap
 from urllib.parse import quote
 import builtins
+import logging
+import asyncio
+import html
 import json
+import re
 
-from jinja2 import Template, pass_context
+from jinja2 import pass_context
 
-from falk.dependency_injection import run_callback, get_dependencies
+from falk.templating import compile_template, render_template, stream_template
+from falk.static_files import get_fingerprinted_rel_path, get_static_url
 from falk.component_templates import parse_component_template
 from falk.utils.iterables import extend_with_unique_values
 from falk.immutable_proxy import get_immutable_proxy
 from falk.import_strings import get_import_string
-from falk.static_files import get_static_url
+from falk.scheduling import run_in_executor
 from falk.routing import get_url
 
+from falk.streaming import (
+    get_children_template,
+    is_wrapper_template,
+    outputs_children,
+    LazyChildren,
+    flush_stream,
+    write_stream,
+    get_stream,
+)
+
+from falk.dependency_injection import (
+    share_request_cache,
+    run_callback_async,
+    get_signature,
+    run_callback,
+)
 from falk.errors import (
     ComponentExecutionError,
     ComponentTemplatingError,
@@ -21,6 +43,11 @@ from falk.errors import (
     FalkError,
 )
 
+NODE_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+ASSET_ATTRIBUTE_RE = re.compile(r'\s(fx-id|href|src)="([^"]*)"')
+
+logger = logging.getLogger("falk")
+
 FALK_CLIENT_SCRIPT = """
 <script src="{{ falk.get_static_url('falk/falk.js') }}"></script>
 """
@@ -35,6 +62,17 @@ FALK_INIT_SCRIPT = """
 </script>
 """
 
+FALK_DEFERRED_SCRIPT = """
+<template fx-deferred="{{ node_id }}">{{ html }}</template>
+<script>
+    falk.renderDeferred(
+        '{{ node_id }}',
+        JSON.parse(`{{ token_string }}`),
+        JSON.parse(`{{ callback_string }}`),
+    );
+</script>
+"""
+
 
 @pass_context
 def _render_component(
@@ -43,6 +81,8 @@ def _render_component(
         _component_name="",
         _node_id=None,
         _token=None,
+        _props_hash=None,
+        _defer=None,
         **props,
 ):
 
@@ -70,9 +110,77 @@ def _render_component(
     if "children" not in props:
         props["children"] = ""
 
-    if caller:
+    # streaming
+    # If this component is the wrapper of a streamed template, its children
+    # get rendered lazily so everything before them can be sent to the
+    # client first.
+    parts = template_context["falk"]["_parts"]
+    stream = parts.get("stream")
+    stream_wrapper = bool(stream and stream["wrapper"])
+
+    # deferred components
+    # Components can only be deferred when the response gets streamed.
+    # Otherwise they get rendered in place.
+    if _defer and stream and not stream_wrapper and not _node_id:
+        if caller:
+            props["children"] = caller()
+
+        return _defer_component(
+            template_context=template_context,
+            component=component,
+            props=props,
+            placeholder=_defer,
+        )
+
+    if stream:
+        stream["rendered_components"] += 1
+
+    if stream_wrapper:
+        stream["wrapper"] = False
+
+    if caller and stream_wrapper:
+        children_template = stream["children_template"]
+
+        props["children"] = LazyChildren(
+            render=lambda: _render_stream_children(
+                template_context=template_context,
+                caller=caller,
+                children_template=children_template,
+            ),
+        )
+
+    elif caller:
         props["children"] = caller()
 
+    # partial rendering
+    # Child components, that the client already rendered with the same
+    # props, don't get rendered again. The client keeps its node in place
+    # of the placeholder.
+    # Children are part of the caller's template and can depend on its
+    # state, so components with children always get rendered.
+    mutable_app = template_context["mutable_app"]
+    mutable_request = template_context["mutable_request"]
+
+    if (not _node_id and
+            not caller and
+            not stream_wrapper and
+            mutable_app["settings"]["partial_rendering"]):
+
+        _props_hash = _get_props_hash(
+            mutable_app=mutable_app,
+            component=component,
+            props=props,
+        )
+
+        if mutable_request["is_mutation_request"]:
+            rendered_node_id = _pop_rendered_node_id(
+                mutable_request=mutable_request,
+                props_hash=_props_hash,
+            )
+
+            if rendered_node_id:
+                return f'<template fx-keep="{rendered_node_id}"></template>'
+
     parts = render_component(
         component=component,
         mutable_app=template_context["mutable_app"],
@@ -81,13 +189,137 @@ def _render_component(
         component_props=props,
         node_id=_node_id,
         token=_token,
+        props_hash=_props_hash,
         is_root=False,
-        parts=template_context["falk"]["_parts"],
+        parts=parts,
+        dependency_cache=template_context["falk"]["_dependency_cache"],
+        stream=stream_wrapper,
     )
 
     return parts["html"]
 
 
+def _get_props_hash(mutable_app, component, props):
+    settings = mutable_app["settings"]
+
+    component_id = settings["get_component_id"](
+        component=component,
+        mutable_app=mutable_app,
+    )
+
+    # Props that can't be serialized can't be compared, so components
+    # that get them always render.
+    try:
+        props_string = json.dumps([component_id, props], sort_keys=True)
+
+    except (TypeError, ValueError):
+        return ""
+
+    return settings["hash_string"](
+        mutable_app=mutable_app,
+        string=props_string,
+    )
+
+
+def _pop_rendered_node_id(mutable_request, props_hash):
+    # The client sends the hashes of all components it rendered inside the
+    # node that gets re-rendered: {props_hash: [node_id, ...]}
+    component_hashes = mutable_request["json"].get("componentHashes")
+
+    if not props_hash or not isinstance(component_hashes, dict):
+        return ""
+
+    node_ids = component_hashes.get(props_hash)
+
+    if not isinstance(node_ids, list) or not node_ids:
+        return ""
+
+    node_id = node_ids.pop(0)
+
+    if not isinstance(node_id, str) or not NODE_ID_RE.match(node_id):
+        return ""
+
+    return node_id
+
+
+def _defer_component(template_context, component, props, placeholder):
+    mutable_app = template_context["mutable_app"]
+    stream = template_context["falk"]["_parts"]["stream"]
+
+    node_id = mutable_app["settings"]["get_node_id"](
+        mutable_app=mutable_app,
+    )
+
+    stream["deferred"].append(
+        (component, props, node_id),
+    )
+
+    if not isinstance(placeholder, str):
+        placeholder = ""
+
+    return f'<div fx-deferred="{node_id}">{placeholder}</div>'
+
+
+def _render_stream_children(template_context, caller, children_template):
+    parts = template_context["falk"]["_parts"]
+    stream = parts["stream"]
+
+    # send everything, that was rendered before the children, to the client
+    flush_stream(stream)
+
+    # styles of components that were rendered after the head was sent
+    def _render_new_styles():
+        styles = parts["styles"][stream["styles_sent"]:]
+
+        if not styles:
+            return ""
+
+        stream["styles_sent"] = len(parts["styles"])
+
+        return _render_styles(
+            mutable_app=template_context["mutable_app"],
+            mutable_request=template_context["mutable_request"],
+            parts=parts,
+            styles=styles,
+        )
+
+    # If the children get output directly, they get streamed node by node,
+    # and every completed component subtree gets flushed to the client.
+    if children_template and stream["stream_children"]:
+        template, outputs_children = children_template
+        stream_children = stream["stream_children"]
+        rendered_components = stream["rendered_components"]
+
+        def _write(chunk):
+            nonlocal rendered_components
+
+            write_stream(stream, _render_new_styles())
+            write_stream(stream, chunk)
+
+            if stream["rendered_components"] != rendered_components:
+                rendered_components = stream["rendered_components"]
+
+                flush_stream(stream)
+
+        stream["stream_children"] = outputs_children
+
+        try:
+            stream_template(
+                template=template,
+                template_context=template_context.get_all(),
+                write=_write,
+            )
+
+        finally:
+            stream["stream_children"] = stream_children
+
+        return ""
+
+    children = caller()
+
+    return _render_new_styles() + children
+
+
 @pass_context
 def _run_callback(
         template_context,
@@ -160,11 +392,17 @@ def _get_url(
     route_name,
     route_args=None,
     query=None,
-    checks=True,
+    checks=None,
 ):
 
+    mutable_app = template_context["mutable_app"]
+
+    if checks is None:
+        checks = mutable_app["settings"]["check_urls"]
+
     return get_url(
-        routes=template_context["app"]["routes"],
+        routes=mutable_app["routes"],
+        route_names=mutable_app["route_names"],
         route_name=route_name,
         route_args=route_args,
         query=query,
@@ -179,12 +417,15 @@ def _get_static_url(
     rel_path,
 ):
 
-    settings = template_context["mutable_app"]["settings"]
+    mutable_app = template_context["mutable_app"]
 
     return get_static_url(
         root_path=template_context["request"]["root_path"] or "/",
-        static_url_prefix=settings["static_url_prefix"],
-        rel_path=rel_path,
+        static_url_prefix=mutable_app["settings"]["static_url_prefix"],
+        rel_path=get_fingerprinted_rel_path(
+            mutable_app=mutable_app,
+            rel_path=rel_path,
+        ),
     )
 
 
@@ -205,10 +446,15 @@ def _get_upload_token(template_context, plain=False):
 
 @pass_context
 def _get_styles(template_context):
+    parts = template_context["falk"]["_parts"]
+
+    if parts.get("stream"):
+        parts["stream"]["styles_sent"] = len(parts["styles"])
+
     return _render_styles(
         mutable_app=template_context["mutable_app"],
         mutable_request=template_context["mutable_request"],
-        parts=template_context["falk"]["_parts"],
+        parts=parts,
     )
 
 
@@ -221,6 +467,56 @@ def _get_scripts(template_context):
     )
 
 
+def get_request_template_context_layers(mutable_app, mutable_request):
+    layers = [
+        {
+            # public immutable data
+            "app": get_immutable_proxy(
+                data=mutable_app,
+                name="app",
+                mutable_version_name="mutable_app",
+            ),
+
+            "settings": get_immutable_proxy(
+                data=mutable_app["settings"],
+                name="settings",
+                mutable_version_name="mutable_settings",
+            ),
+
+            "request": get_immutable_proxy(
+                data=mutable_request,
+                name="request",
+                mutable_version_name="mutable_request",
+            ),
+
+            # public mutable data
+            "mutable_app": mutable_app,
+            "mutable_settings": mutable_app["settings"],
+            "mutable_request": mutable_request,
+        },
+        builtins.__dict__,
+    ]
+
+    # We render templates with the template context as parent, so jinja2
+    # does not add its globals by itself.
+    if mutable_app["jinja2_environment"] is not None:
+        layers.append(mutable_app["jinja2_environment"].globals)
+
+    return layers
+
+
+def _get_template_context_layers(mutable_app, mutable_request, parts):
+    if "template_context_layers" not in parts:
+        parts["template_context_layers"] = (
+            get_request_template_context_layers(
+                mutable_app=mutable_app,
+                mutable_request=mutable_request,
+            )
+        )
+
+    return parts["template_context_layers"]
+
+
 def get_template_context(
         mutable_app,
         mutable_request,
@@ -228,6 +524,7 @@ def get_template_context(
         parts=None,
         components=None,
         callbacks=None,
+        dependency_cache=None,
 ):
 
     if extra_template_context is None:
@@ -247,79 +544,145 @@ def get_template_context(
             "render": lambda: None,
         }
 
-    return {
-        **builtins.__dict__,
+    # The template context is layered so the parts that are the same for all
+    # components of a request are only built once per request.
+    # Writes (`template_context.update()`) always go to the first layer which
+    # is local to the component.
+    template_context_layers = _get_template_context_layers(
+        mutable_app=mutable_app,
+        mutable_request=mutable_request,
+        parts=parts,
+    )
 
-        # public immutable data
-        "app": get_immutable_proxy(
-            data=mutable_app,
-            name="app",
-            mutable_version_name="mutable_app",
-        ),
+    return ChainMap(
+        {
+            # The `falk` namespace is always added first so it can not be
+            # overloaded accidentally.
+            "falk": {
+
+                # internal data
+                "_components": components,
+                "_callbacks": callbacks,
+                "_parts": parts,
+                "_dependency_cache": dependency_cache,
+
+                # internal API
+                "_render_component": _render_component,
+
+                # public API
+                "get_url": _get_url,
+                "get_static_url": _get_static_url,
+                "get_styles": _get_styles,
+                "get_scripts": _get_scripts,
+                "get_upload_token": _get_upload_token,
+                "run_callback": _run_callback,
+            },
+        },
+        mutable_app["settings"]["extra_template_context"],
+        extra_template_context,
+        *template_context_layers,
+    )
 
-        "settings": get_immutable_proxy(
-            data=mutable_app["settings"],
-            name="settings",
-            mutable_version_name="mutable_settings",
-        ),
 
-        "request": get_immutable_proxy(
-            data=mutable_request,
-            name="request",
-            mutable_version_name="mutable_request",
-        ),
+def _get_known_assets(mutable_request):
+    # On mutation requests, the client sends the keys of all styles and
+    # scripts it already loaded (`href`, `src`, or `fx-id`), so we don't
+    # need to send them again.
+    if not mutable_request["is_mutation_request"]:
+        return None
 
-        # public mutable data
-        "mutable_app": mutable_app,
-        "mutable_settings": mutable_app["settings"],
-        "mutable_request": mutable_request,
-
-        **extra_template_context,
-        **mutable_app["settings"]["extra_template_context"],
-
-        # The `falk` namespace is always added last so it can not be
-        # overloaded accidentally.
-        "falk": {
-
-            # internal data
-            "_components": components,
-            "_callbacks": callbacks,
-            "_parts": parts,
-
-            # internal API
-            "_render_component": _render_component,
-
-            # public API
-            "get_url": _get_url,
-            "get_static_url": _get_static_url,
-            "get_styles": _get_styles,
-            "get_scripts": _get_scripts,
-            "get_upload_token": _get_upload_token,
-            "run_callback": _run_callback,
-        },
+    known_assets = mutable_request["json"].get("knownAssets")
+
+    if not isinstance(known_assets, list) or not known_assets:
+        return None
+
+    return {
+        asset_key for asset_key in known_assets
+        if isinstance(asset_key, str)
     }
 
 
-def _render_styles(mutable_app, mutable_request, parts):
-    template_string = "\n".join(parts["styles"])
+def _get_asset_key(block_html):
+    attributes = dict(
+        ASSET_ATTRIBUTE_RE.findall(block_html.split(">", 1)[0]),
+    )
 
-    template_context = get_template_context(
+    asset_key = (
+        attributes.get("href") or
+        attributes.get("src") or
+        attributes.get("fx-id", "")
+    )
+
+    return html.unescape(asset_key)
+
+
+def _render_styles(
+        mutable_app,
+        mutable_request,
+        parts,
+        styles=None,
+        known_assets=None,
+):
+
+    if styles is None:
+        styles = parts["styles"]
+
+    return _render_blocks(
         mutable_app=mutable_app,
         mutable_request=mutable_request,
+        parts=parts,
+        blocks=styles,
+        known_assets=known_assets,
     )
 
-    return Template(template_string).render(
-        **template_context,
+
+def _render_blocks(
+        mutable_app,
+        mutable_request,
+        parts,
+        blocks,
+        extra_template_context=None,
+        known_assets=None,
+):
+
+    template_context = get_template_context(
+        mutable_app=mutable_app,
+        mutable_request=mutable_request,
+        extra_template_context=extra_template_context,
+        parts=parts,
     )
 
+    # Blocks get rendered one by one so we can skip blocks the client
+    # already has.
+    if known_assets:
+        block_html_strings = []
+
+        for block in blocks:
+            block_html = render_template(
+                template=get_template(
+                    template_string=block,
+                    mutable_app=mutable_app,
+                ),
+                template_context=template_context,
+            )
+
+            if _get_asset_key(block_html.strip()) in known_assets:
+                continue
 
-def _render_scripts(mutable_app, mutable_request, parts):
-    template_string = "\n".join([
-        FALK_CLIENT_SCRIPT,
-        *parts["scripts"],
-        FALK_INIT_SCRIPT,
-    ])
+            block_html_strings.append(block_html)
+
+        return "\n".join(block_html_strings)
+
+    return render_template(
+        template=get_template(
+            template_string="\n".join(blocks),
+            mutable_app=mutable_app,
+        ),
+        template_context=template_context,
+    )
 
+
+def _render_scripts(mutable_app, mutable_request, parts, known_assets=None):
     # dump settings, tokens, and initial callbacks
     # If the request is a mutation request, we don't need to serialize the
     settings_string = ""
@@ -334,67 +697,195 @@ def _render_scripts(mutable_app, mutable_request, parts):
         token_string = json.dumps(parts["tokens"])
         callback_string = json.dumps(parts["callbacks"])
 
-    # generate template context
-    template_context = get_template_context(
+    return _render_blocks(
         mutable_app=mutable_app,
         mutable_request=mutable_request,
+        parts=parts,
+        blocks=[
+            FALK_CLIENT_SCRIPT,
+            *parts["scripts"],
+            FALK_INIT_SCRIPT,
+        ],
         extra_template_context={
             "settings_string": settings_string,
             "token_string": token_string,
             "callback_string": callback_string,
         },
-    )
-
-    return Template(template_string).render(
-        **template_context,
+        known_assets=known_assets,
     )
 
 
 def render_body(mutable_app, mutable_request, parts):
+    known_assets = _get_known_assets(mutable_request)
+
     return (
         _render_styles(
             mutable_app=mutable_app,
             mutable_request=mutable_request,
             parts=parts,
+            known_assets=known_assets,
         ) +
         parts["html"] +
         _render_scripts(
             mutable_app=mutable_app,
             mutable_request=mutable_request,
             parts=parts,
+            known_assets=known_assets,
         )
     )
 
 
-def render_component(
+def get_template(template_string, mutable_app):
+    settings = mutable_app["settings"]
+    template_cache = mutable_app["template_cache"]
+    cache_key = (None, template_string)
+    use_cache = template_cache is not None and not settings["debug"]
+
+    if use_cache:
+        template = template_cache.get(cache_key)
+
+        if template is not None:
+            return template
+
+    template = compile_template(
+        environment=mutable_app["jinja2_environment"],
+        template_string=template_string,
+    )
+
+    if use_cache:
+        template_cache.set(cache_key, template)
+
+    return template
+
+
+def get_component_template(component, component_template, mutable_app):
+    settings = mutable_app["settings"]
+    template_cache = mutable_app["template_cache"]
+
+    # The template cache is keyed by the component and the template source.
+    # Python strings cache their own hash, so for components that return
+    # constant strings, the lookup does not need to rehash the source.
+    # In debug mode, the cache is bypassed so changes to components and
+    # their templates show up without a restart.
+    cache_key = (component, component_template)
+    use_cache = template_cache is not None and not settings["debug"]
+
+    if use_cache:
+        cache_entry = template_cache.get(cache_key)
+
+        if cache_entry:
+            return cache_entry
+
+    # parse component template
+    # Constant templates get parsed when the component gets registered.
+    component_blocks = None
+
+    if not settings["debug"]:
+        component_blocks = mutable_app["component_templates"].get(cache_key)
+
+    if component_blocks is None:
+        def _hash_string(string):
+            return settings["hash_string"](
+                mutable_app=mutable_app,
+                string=string,
+            )
+
+        component_blocks = parse_component_template(
+            component_template=component_template,
+            component=component,
+            hash_string=_hash_string,
+        )
+
+    # compile jinja2 template
+    try:
+        template = compile_template(
+            environment=mutable_app["jinja2_environment"],
+            template_string=component_blocks["jinja2_template"],
+        )
+
+    except Exception as exception:
+        component_import_string = get_import_string(component)
+
+        raise ComponentTemplatingError(
+            f"{component_import_string}: {repr(exception)}",
+        ) from exception
+
+    cache_entry = (component_blocks, template)
+
+    if use_cache:
+        template_cache.set(cache_key, cache_entry)
+
+    return cache_entry
+
+
+def precompile_component_templates(mutable_app):
+    # Components return their templates at runtime, so we can only
+    # precompile templates that are returned as string constants. These get
+    # parsed when the component gets registered.
+    # Templates that get assembled at runtime get compiled on first use.
+    template_count = 0
+
+    for component, component_template in mutable_app["component_templates"]:
+        get_component_template(
+            component=component,
+            component_template=component_template,
+            mutable_app=mutable_app,
+        )
+
+        template_count += 1
+
+    return template_count
+
+
+def get_parts():
+    return {
+        "html": "",
+        "styles": [],
+        "scripts": [],
+        "callbacks": [],
+        "tokens": {},
+        "flags": {
+            "state": True,
+        },
+    }
+
+
+def get_render_steps(
         component,
         mutable_app,
         request,
         response,
         node_id=None,
         token=None,
+        props_hash="",
         component_state=None,
         component_props=None,
         exception=None,
         is_root=True,
         run_component_callback="",
         parts=None,
+        dependency_cache=None,
+        stream=False,
 ):
 
-    # TODO: add dependency caching once `uncachable_dependencies`
-    # is implemented.
+    # Rendering a component is split into steps, so the same code can be
+    # driven synchronously (`render_component`) and asynchronously
+    # (`render_component_async`).
+    # Every step that runs user code is yielded to the driver as
+    # `(step_name, step_args)`. The driver sends the result back or throws the
+    # raised exception into the generator.
 
     if parts is None:
-        parts = {
-            "html": "",
-            "styles": [],
-            "scripts": [],
-            "callbacks": [],
-            "tokens": {},
-            "flags": {
-                "state": True,
-            },
-        }
+        parts = get_parts()
+
+        # Only initial renders of root components get streamed.
+        # Mutation requests get their HTML as JSON.
+        if (is_root and
+                response.get("stream_writer") and
+                not request["is_mutation_request"]):
+
+            parts["stream"] = get_stream(response=response)
+            stream = True
 
     else:
         # reset component local flags
@@ -431,6 +922,15 @@ def render_component(
         "render": lambda: None,
     }
 
+    # The immutable proxies of the app, the settings, and the request are the
+    # same for all components of a request, so they get reused from the
+    # request layer of the template context.
+    request_layer = _get_template_context_layers(
+        mutable_app=mutable_app,
+        mutable_request=request,
+        parts=parts,
+    )[0]
+
     data = {
         # meta data
         "caller": component,
@@ -438,23 +938,9 @@ def render_component(
         "is_root": is_root,
 
         # immutable
-        "app": get_immutable_proxy(
-            data=mutable_app,
-            name="app",
-            mutable_version_name="mutable_app",
-        ),
-
-        "settings": get_immutable_proxy(
-            data=mutable_app["settings"],
-            name="settings",
-            mutable_version_name="mutable_settings",
-        ),
-
-        "request": get_immutable_proxy(
-            data=request,
-            name="request",
-            mutable_version_name="mutable_request",
-        ),
+        "app": request_layer["app"],
+        "settings": request_layer["settings"],
+        "request": request_layer["request"],
 
         "props": get_immutable_proxy(
             data=component_props,
@@ -483,11 +969,8 @@ def render_component(
         extra_template_context=data,
         parts=parts,
         callbacks=component_callbacks,
-
-        # TODO: we inspect the component at least twice here.
-        # Explicitly using `get_dependencies()` and inexplicitly
-        # using `run_callback()`.
-        components=get_dependencies(component)[1],
+        components=get_signature(component)[1],
+        dependency_cache=dependency_cache,
     )
 
     dependencies = {
@@ -497,12 +980,15 @@ def render_component(
 
     # run component
     try:
-        component_template = run_callback(
-            callback=component,
-            dependencies=dependencies,
-            providers=mutable_app["settings"]["dependencies"],
-            run_coroutine_sync=mutable_app["settings"]["run_coroutine_sync"],
-        )
+        component_template = yield ("run_callback", {
+            "callback": component,
+            "dependencies": dependencies,
+            "providers": mutable_app["settings"]["dependencies"],
+            "request_cache": dependency_cache,
+            "request_scoped_providers": (
+                mutable_app["settings"]["request_scoped_dependencies"]
+            ),
+        })
 
     # TODO: Because we catch FalkErrors here, no component name is shown when
     # an error like ForbiddenError is raised, which makes debugging annoying.
@@ -545,12 +1031,15 @@ def render_component(
             )
 
         try:
-            run_callback(
-                callback=component_callbacks[run_component_callback],
-                dependencies=dependencies,
-                providers=settings["dependencies"],
-                run_coroutine_sync=settings["run_coroutine_sync"],
-            )
+            yield ("run_callback", {
+                "callback": component_callbacks[run_component_callback],
+                "dependencies": dependencies,
+                "providers": settings["dependencies"],
+                "request_cache": dependency_cache,
+                "request_scoped_providers": (
+                    settings["request_scoped_dependencies"]
+                ),
+            })
 
         # TODO: Because we catch FalkErrors here, no component name is shown
         # when an error like ForbiddenError is raised, which makes
@@ -566,16 +1055,10 @@ def render_component(
             ) from exception
 
     # parse component template
-    def _hash_string(string):
-        return mutable_app["settings"]["hash_string"](
-            mutable_app=mutable_app,
-            string=string,
-        )
-
-    component_blocks = parse_component_template(
-        component_template=component_template,
+    component_blocks, template = get_component_template(
         component=component,
-        hash_string=_hash_string,
+        component_template=component_template,
+        mutable_app=mutable_app,
     )
 
     # add styles and scripts to the output
@@ -608,11 +1091,49 @@ def render_component(
         parts["tokens"][node_id] = token
 
     template_context["_token"] = token
+    template_context["_props_hash"] = props_hash
 
     # render jinja2 template
     try:
-        template = Template(component_blocks["jinja2_template"])
-        parts["html"] = template.render(template_context)
+        if not stream:
+            parts["html"] = yield ("render_template", {
+                "template": template,
+                "template_context": template_context,
+            })
+
+        # The only content of wrapper templates is the wrapper component, that
+        # writes itself to the stream.
+        elif _is_wrapper_template(component_blocks, mutable_app):
+            parts["stream"]["wrapper"] = True
+
+            parts["stream"]["children_template"] = _get_children_template(
+                component_blocks=component_blocks,
+                mutable_app=mutable_app,
+            )
+
+            yield ("render_template", {
+                "template": template,
+                "template_context": template_context,
+            })
+
+            parts["html"] = ""
+
+        else:
+            stream_children = parts["stream"]["stream_children"]
+
+            parts["stream"]["stream_children"] = _outputs_children(
+                component_blocks=component_blocks,
+                mutable_app=mutable_app,
+            )
+
+            yield ("stream_template", {
+                "template": template,
+                "template_context": template_context,
+                "write": lambda chunk: write_stream(parts["stream"], chunk),
+            })
+
+            parts["stream"]["stream_children"] = stream_children
+            parts["html"] = ""
 
     # TODO: Because we catch FalkErrors here, no component name is shown when
     # an error like ForbiddenError is raised, which makes debugging annoying.
@@ -627,4 +1148,318 @@ def render_component(
         ) from exception
 
     # finish
+    if stream and is_root:
+        flush_stream(parts["stream"])
+
+        if parts["stream"]["deferred"]:
+            yield ("render_deferred_components", {
+                "mutable_app": mutable_app,
+                "request": request,
+                "response": response,
+                "parts": parts,
+                "dependency_cache": dependency_cache,
+            })
+
     return parts
+
+
+def _is_wrapper_template(component_blocks, mutable_app):
+    if "is_wrapper_template" not in component_blocks:
+        component_blocks["is_wrapper_template"] = is_wrapper_template(
+            environment=mutable_app["jinja2_environment"],
+            template_string=component_blocks["jinja2_template"],
+        )
+
+    return component_blocks["is_wrapper_template"]
+
+
+def _get_children_template(component_blocks, mutable_app):
+    if "children_template" not in component_blocks:
+        component_blocks["children_template"] = get_children_template(
+            environment=mutable_app["jinja2_environment"],
+            template_string=component_blocks["jinja2_template"],
+        )
+
+    return component_blocks["children_template"]
+
+
+def _outputs_children(component_blocks, mutable_app):
+    if "outputs_children" not in component_blocks:
+        component_blocks["outputs_children"] = outputs_children(
+            environment=mutable_app["jinja2_environment"],
+            template_string=component_blocks["jinja2_template"],
+        )
+
+    return component_blocks["outputs_children"]
+
+
+def render_component(**kwargs):
+    render_steps = get_render_steps(**kwargs)
+    mutable_app = kwargs["mutable_app"]
+    step_result = None
+    step_exception = None
+
+    while True:
+        try:
+            if step_exception is not None:
+                step_name, step_args = render_steps.throw(step_exception)
+
+            else:
+                step_name, step_args = render_steps.send(step_result)
+
+        except StopIteration as stop_iteration:
+            return stop_iteration.value
+
+        step_result = None
+        step_exception = None
+
+        try:
+            if step_name == "run_callback":
+                step_result = run_callback(
+                    **step_args,
+                    run_coroutine_sync=(
+                        mutable_app["settings"]["run_coroutine_sync"]
+                    ),
+                )
+
+            elif step_name == "render_template":
+                step_result = render_template(**step_args)
+
+            elif step_name == "stream_template":
+                step_result = stream_template(**step_args)
+
+            elif step_name == "render_deferred_components":
+                step_result = render_deferred_components(**step_args)
+
+        except Exception as exception:
+            step_exception = exception
+
+
+async def render_component_async(**kwargs):
+    # Component callbacks, and their providers, that are coroutine functions
+    # get awaited on the event loop. Sync callables and the template
+    # rendering run in the executor.
+    # Nested components get rendered while the template renders, so they
+    # use the sync code path.
+    render_steps = get_render_steps(**kwargs)
+    mutable_app = kwargs["mutable_app"]
+    step_result = None
+    step_exception = None
+
+    def run_sync(function):
+        return run_in_executor(mutable_app=mutable_app, function=function)
+
+    while True:
+        try:
+            if step_exception is not None:
+                step_name, step_args = render_steps.throw(step_exception)
+
+            else:
+                step_name, step_args = render_steps.send(step_result)
+
+        except StopIteration as stop_iteration:
+            return stop_iteration.value
+
+        step_result = None
+        step_exception = None
+
+        try:
+            if step_name == "run_callback":
+                step_result = await run_callback_async(
+                    **step_args,
+                    inline_providers=(
+                        mutable_app["settings"]["inline_dependencies"]
+                    ),
+                    run_sync=run_sync,
+                )
+
+            elif step_name == "render_template":
+                step_result = await run_sync(
+                    lambda: render_template(**step_args),
+                )
+
+            elif step_name == "stream_template":
+                step_result = await run_sync(
+                    lambda: stream_template(**step_args),
+                )
+
+            elif step_name == "render_deferred_components":
+                step_result = await render_deferred_components_async(
+                    **step_args,
+                    run_sync=run_sync,
+                )
+
+        except Exception as exception:
+            step_exception = exception
+
+
+def _render_deferred_component(
+        mutable_app,
+        request,
+        response,
+        parts,
+        deferred_component,
+        dependency_cache,
+):
+
+    component, props, node_id = deferred_component
+
+    try:
+        return render_component(
+            component=component,
+            mutable_app=mutable_app,
+            request=request,
+            response=response,
+            component_props=props,
+            node_id=node_id,
+            is_root=False,
+            parts=get_parts(),
+            dependency_cache=dependency_cache,
+        )
+
+    # The document was already sent, so we can't render an error page
+    # anymore. The placeholder stays in place.
+    except Exception:
+        logger.exception(
+            "exception raised while rendering deferred component %s",
+            component,
+        )
+
+
+def _write_deferred_component(
+        mutable_app,
+        request,
+        parts,
+        deferred_component,
+        deferred_parts,
+):
+
+    stream = parts["stream"]
+    _, _, node_id = deferred_component
+
+    if deferred_parts is None:
+        return
+
+    # Styles and scripts, that are already part of the document, don't get
+    # sent again.
+    styles = [
+        style for style in deferred_parts["styles"]
+        if style not in parts["styles"]
+    ]
+
+    scripts = [
+        script for script in deferred_parts["scripts"]
+        if script not in parts["scripts"]
+    ]
+
+    extend_with_unique_values(parts["styles"], styles)
+    extend_with_unique_values(parts["scripts"], scripts)
+
+    if styles:
+        write_stream(stream, _render_blocks(
+            mutable_app=mutable_app,
+            mutable_request=request,
+            parts=deferred_parts,
+            blocks=styles,
+        ))
+
+    write_stream(stream, render_template(
+        template=get_template(
+            template_string=FALK_DEFERRED_SCRIPT,
+            mutable_app=mutable_app,
+        ),
+        template_context=get_template_context(
+            mutable_app=mutable_app,
+            mutable_request=request,
+            extra_template_context={
+                "node_id": node_id,
+                "html": deferred_parts["html"],
+                "token_string": json.dumps(deferred_parts["tokens"]),
+                "callback_string": json.dumps(deferred_parts["callbacks"]),
+            },
+            parts=deferred_parts,
+        ),
+    ))
+
+    if scripts:
+        write_stream(stream, _render_blocks(
+            mutable_app=mutable_app,
+            mutable_request=request,
+            parts=deferred_parts,
+            blocks=scripts,
+        ))
+
+    flush_stream(stream)
+
+
+def render_deferred_components(
+        mutable_app,
+        request,
+        response,
+        parts,
+        dependency_cache,
+):
+
+    for deferred_component in parts["stream"]["deferred"]:
+        deferred_parts = _render_deferred_component(
+            mutable_app=mutable_app,
+            request=request,
+            response=response,
+            parts=parts,
+            deferred_component=deferred_component,
+            dependency_cache=dependency_cache,
+        )
+
+        _write_deferred_component(
+            mutable_app=mutable_app,
+            request=request,
+            parts=parts,
+            deferred_component=deferred_component,
+            deferred_parts=deferred_parts,
+        )
+
+
+async def render_deferred_components_async(
+        mutable_app,
+        request,
+        response,
+        parts,
+        dependency_cache,
+        run_sync,
+):
+
+    # Deferred components get rendered concurrently, and get sent in the
+    # order they finish.
+    # The threads share the request cache, so it needs to be locked.
+    if dependency_cache is not None:
+        share_request_cache(dependency_cache)
+
+    async def _render(deferred_component):
+        deferred_parts = await run_sync(
+            lambda: _render_deferred_component(
+                mutable_app=mutable_app,
+                request=request,
+                response=response,
+                parts=parts,
+                deferred_component=deferred_component,
+                dependency_cache=dependency_cache,
+            ),
+        )
+
+        return deferred_component, deferred_parts
+
+    tasks = [
+        _render(deferred_component)
+        for deferred_component in parts["stream"]["deferred"]
+    ]
+
+    for task in asyncio.as_completed(tasks):
+        deferred_component, deferred_parts = await task
+
+        _write_deferred_component(
+            mutable_app=mutable_app,
+            request=request,
+            parts=parts,
+            deferred_component=deferred_component,
+            deferred_parts=deferred_parts,
+        )
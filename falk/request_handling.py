@@ -1,11 +1,20 @@
 from http.cookies import SimpleCookie
 import logging
 
-from falk.rendering import render_component, render_body
+from falk.scheduling import run_in_executor
+
+from falk.dependency_injection import run_callback_async, run_callback
 from falk.immutable_proxy import get_immutable_proxy
-from falk.dependency_injection import run_callback
-from falk.routing import get_component
+from falk.import_strings import get_import_string
+from falk.routing import get_router, match_path
 from falk.components import ItWorks
+from falk.http import set_header
+
+from falk.rendering import (
+    render_component_async,
+    render_component,
+    render_body,
+)
 
 from falk.errors import (
     InvalidTokenError,
@@ -41,6 +50,7 @@ def get_request():
         # flags
         "valid": True,
         "is_mutation_request": False,
+        "is_websocket_request": False,
 
         # user defined
         "user": None,
@@ -61,6 +71,25 @@ def get_response():
         "file_path": "",
         "json": None,
 
+        # sync or async iterable of `str` or `bytes` chunks
+        "body_stream": None,
+
+        # set when a compressed sibling of `file_path` gets sent instead
+        "file_encoding": "",
+
+        # size, modification time, and ETag of `file_path`
+        # (set by the static files middleware)
+        "file_stat": None,
+        "file_attachment": True,
+
+        # streaming
+        # `stream_writer` gets set by the server if the response may be
+        # streamed. `is_streaming` is set when the first chunk was sent.
+        # `is_aborted` is set when an exception was raised after that.
+        "stream_writer": None,
+        "is_streaming": False,
+        "is_aborted": False,
+
         # flags
         "is_finished": False,
 
@@ -69,17 +98,120 @@ def get_response():
     }
 
 
+def get_service_unavailable_response():
+    # Requests that get rejected by the scheduler get answered directly on
+    # the event loop, without running middlewares or error components, so
+    # rejecting requests stays cheap under load.
+    response = get_response()
+
+    response.update({
+        "status": 503,
+        "content_type": "text/plain",
+        "body": "503 Service Unavailable",
+        "is_finished": True,
+    })
+
+    set_header(response["headers"], "Content-Type", "text/plain")
+    set_header(response["headers"], "Retry-After", "1")
+
+    return response
+
+
+def _get_response_head(response):
+    if not response["is_streaming"]:
+        return None
+
+    return (
+        response["status"],
+        dict(response["headers"]),
+        response["cookie"].output(),
+    )
+
+
+def _check_response_head(middleware, response, response_head):
+    # The status, the headers, and the cookies of streamed responses get
+    # sent along with the first chunk. Changes that middlewares make
+    # afterwards can't be sent anymore.
+    if response_head is None or _get_response_head(response) == response_head:
+        return
+
+    logger.warning(
+        "%s changed the status, the headers, or the cookies of a response that was already streamed. These changes don't get sent.",  # NOQA
+        get_import_string(middleware),
+    )
+
+
 def run_middlewares(
         middlewares,
         request,
         response,
         mutable_app,
+        dependency_cache=None,
 ):
 
     # TODO: When an error is raised in an middleware, the middleware name is
     # not in the error message.
 
-    dependencies = {
+    dependencies = get_middleware_dependencies(
+        request=request,
+        response=response,
+        mutable_app=mutable_app,
+    )
+
+    for middleware in middlewares:
+        dependencies["caller"] = middleware
+        response_head = _get_response_head(response)
+
+        run_callback(
+            callback=middleware,
+            dependencies=dependencies,
+            providers=mutable_app["settings"]["dependencies"],
+            request_cache=dependency_cache,
+            request_scoped_providers=(
+                mutable_app["settings"]["request_scoped_dependencies"]
+            ),
+            run_coroutine_sync=mutable_app["settings"]["run_coroutine_sync"],
+        )
+
+        _check_response_head(middleware, response, response_head)
+
+
+async def run_middlewares_async(
+        middlewares,
+        request,
+        response,
+        mutable_app,
+        run_sync,
+        dependency_cache=None,
+):
+
+    dependencies = get_middleware_dependencies(
+        request=request,
+        response=response,
+        mutable_app=mutable_app,
+    )
+
+    for middleware in middlewares:
+        dependencies["caller"] = middleware
+        response_head = _get_response_head(response)
+
+        await run_callback_async(
+            callback=middleware,
+            dependencies=dependencies,
+            providers=mutable_app["settings"]["dependencies"],
+            request_cache=dependency_cache,
+            request_scoped_providers=(
+                mutable_app["settings"]["request_scoped_dependencies"]
+            ),
+            inline_providers=mutable_app["settings"]["inline_dependencies"],
+            run_sync=run_sync,
+        )
+
+        _check_response_head(middleware, response, response_head)
+
+
+def get_middleware_dependencies(request, response, mutable_app):
+    return {
         # meta data
         "is_root": True,
 
@@ -111,16 +243,6 @@ def run_middlewares(
         "response": response,
     }
 
-    for middleware in middlewares:
-        dependencies["caller"] = middleware
-
-        run_callback(
-            callback=middleware,
-            dependencies=dependencies,
-            providers=mutable_app["settings"]["dependencies"],
-            run_coroutine_sync=mutable_app["settings"]["run_coroutine_sync"],
-        )
-
 
 def run_component(
         component,
@@ -138,6 +260,39 @@ def run_component(
         **kwargs,
     )
 
+    set_component_response(
+        parts=parts,
+        mutable_app=mutable_app,
+        request=request,
+        response=response,
+    )
+
+
+async def run_component_async(
+        component,
+        mutable_app,
+        request,
+        response,
+        **kwargs,
+):
+
+    parts = await render_component_async(
+        component=component,
+        mutable_app=mutable_app,
+        request=request,
+        response=response,
+        **kwargs,
+    )
+
+    set_component_response(
+        parts=parts,
+        mutable_app=mutable_app,
+        request=request,
+        response=response,
+    )
+
+
+def set_component_response(parts, mutable_app, request, response):
     if response["is_finished"]:
         return
 
@@ -164,6 +319,7 @@ def run_error_component(
         mutable_app,
         request,
         response,
+        dependency_cache=None,
 ):
 
     # When we encounter an `InvalidTokenError` while processing a mutation
@@ -187,6 +343,15 @@ def run_error_component(
 
         return response
 
+    # If parts of the response were already sent, we can't change the status
+    # or render an error page anymore.
+    if response["is_streaming"]:
+        logger.exception("exception raised while streaming response")
+
+        response["is_aborted"] = True
+
+        return response
+
     if isinstance(exception, HTTPError):
         status = exception.STATUS.value
         error_component = mutable_app["settings"][exception.COMPONENT_NAME]
@@ -200,12 +365,24 @@ def run_error_component(
             mutable_app["settings"]["internal_server_error_component"]
         )
 
+    # The error page replaces the response stream, so it never gets sent.
+    # Sync iterables, like generators or files, get closed to release their
+    # resources. Async generators, that never ran, have nothing to clean up.
+    body_stream = response["body_stream"]
+
+    if body_stream is not None and hasattr(body_stream, "close"):
+        body_stream.close()
+
     # reset response
     response.update({
         "is_finished": False,
         "content_type": "text/html",
         "body": None,
+        "body_stream": None,
         "file_path": "",
+        "file_encoding": "",
+        "file_stat": None,
+        "file_attachment": True,
         "json": None,
     })
 
@@ -219,13 +396,61 @@ def run_error_component(
         request=request,
         response=response,
         exception=exception,
+        dependency_cache=dependency_cache,
     )
 
 
-def handle_request(mutable_app, request):
-    response = get_response()
+def get_request_component(mutable_app, request):
     component_state = None
 
+    # mutation requests
+    if request["is_mutation_request"]:
+        for key in ("token", "nodeId"):
+            if key not in request["json"]:
+                raise BadRequestError(f"no {key} provided")
+
+        # decode token
+        component_id, component_state = (
+            mutable_app["settings"]["decode_token"](
+                token=request["json"]["token"],
+                mutable_app=mutable_app,
+            )
+        )
+
+        # get component from cache
+        component = mutable_app["settings"]["get_component"](
+            component_id=component_id,
+            mutable_app=mutable_app,
+        )
+
+    # initial render
+    else:
+        component = ItWorks
+
+        if mutable_app["routes"]:
+
+            # search for a matching route
+            component, match_info = match_path(
+                router=get_router(mutable_app),
+                path=request["path"],
+            )
+
+            request["match_info"] = match_info
+
+        # no component found
+        if not component:
+            raise NotFoundError()
+
+    return component, component_state
+
+
+def handle_request(mutable_app, request, stream_writer=None):
+    response = get_response()
+    response["stream_writer"] = stream_writer
+
+    # results of request scoped dependency providers
+    dependency_cache = {}
+
     try:
 
         # pre request middlewares
@@ -238,6 +463,7 @@ def handle_request(mutable_app, request):
             request=request,
             response=response,
             mutable_app=mutable_app,
+            dependency_cache=dependency_cache,
         )
 
         # Re raise exceptions that were catched while parsing the request.
@@ -251,6 +477,7 @@ def handle_request(mutable_app, request):
             request=request,
             response=response,
             mutable_app=mutable_app,
+            dependency_cache=dependency_cache,
         )
 
         # Components and post component middlewares only run if the response
@@ -258,44 +485,10 @@ def handle_request(mutable_app, request):
         # static files for example.
         if not response["is_finished"]:
 
-            # mutation requests
-            if request["is_mutation_request"]:
-
-                for key in ("token", "nodeId"):
-                    if key not in request["json"]:
-                        raise BadRequestError(f"no {key} provided")
-
-                # decode token
-                component_id, component_state = (
-                    mutable_app["settings"]["decode_token"](
-                        token=request["json"]["token"],
-                        mutable_app=mutable_app,
-                    )
-                )
-
-                # get component from cache
-                component = mutable_app["settings"]["get_component"](
-                    component_id=component_id,
-                    mutable_app=mutable_app,
-                )
-
-            # initial render
-            else:
-                component = ItWorks
-
-                if mutable_app["routes"]:
-
-                    # search for a matching route
-                    component, match_info = get_component(
-                        routes=mutable_app["routes"],
-                        path=request["path"],
-                    )
-
-                    request["match_info"] = match_info
-
-                # no component found
-                if not component:
-                    raise NotFoundError()
+            component, component_state = get_request_component(
+                mutable_app=mutable_app,
+                request=request,
+            )
 
             run_component(
                 component=component,
@@ -305,6 +498,7 @@ def handle_request(mutable_app, request):
                 node_id=request["json"].get("nodeId", ""),
                 component_state=component_state,
                 run_component_callback=request["json"].get("callbackName", ""),
+                dependency_cache=dependency_cache,
             )
 
             # post component middlewares
@@ -315,6 +509,7 @@ def handle_request(mutable_app, request):
                 request=request,
                 response=response,
                 mutable_app=mutable_app,
+                dependency_cache=dependency_cache,
             )
 
     except Exception as exception:
@@ -323,6 +518,7 @@ def handle_request(mutable_app, request):
             mutable_app=mutable_app,
             request=request,
             response=response,
+            dependency_cache=dependency_cache,
         )
 
     # post request middlewares
@@ -337,6 +533,7 @@ def handle_request(mutable_app, request):
             request=request,
             response=response,
             mutable_app=mutable_app,
+            dependency_cache=dependency_cache,
         )
 
     except Exception as exception:
@@ -345,6 +542,113 @@ def handle_request(mutable_app, request):
             mutable_app=mutable_app,
             request=request,
             response=response,
+            dependency_cache=dependency_cache,
+        )
+
+    # compression
+    if mutable_app["settings"]["compress_responses"]:
+        mutable_app["settings"]["compress_response"](
+            mutable_app=mutable_app,
+            request=request,
+            response=response,
+        )
+
+    return response
+
+
+async def handle_request_async(mutable_app, request, stream_writer=None):
+    # This is the async twin of `handle_request`. It runs on the event loop
+    # and only uses the executor for sync callables, so async middlewares,
+    # components, and callbacks don't block a worker thread.
+    response = get_response()
+    response["stream_writer"] = stream_writer
+
+    # results of request scoped dependency providers
+    dependency_cache = {}
+
+    def run_sync(function):
+        return run_in_executor(mutable_app=mutable_app, function=function)
+
+    async def _run_error_component(exception):
+        await run_sync(
+            lambda: run_error_component(
+                exception=exception,
+                mutable_app=mutable_app,
+                request=request,
+                response=response,
+                dependency_cache=dependency_cache,
+            ),
+        )
+
+    async def _run_middlewares(middlewares):
+        await run_middlewares_async(
+            middlewares=middlewares,
+            request=request,
+            response=response,
+            mutable_app=mutable_app,
+            run_sync=run_sync,
+            dependency_cache=dependency_cache,
+        )
+
+    try:
+
+        # pre request middlewares
+        await _run_middlewares(
+            mutable_app["settings"]["pre_request_middlewares"],
+        )
+
+        if request["exception"]:
+            raise request["exception"]
+
+        # pre component middlewares
+        await _run_middlewares(
+            mutable_app["settings"]["pre_component_middlewares"],
+        )
+
+        if not response["is_finished"]:
+            component, component_state = get_request_component(
+                mutable_app=mutable_app,
+                request=request,
+            )
+
+            await run_component_async(
+                component=component,
+                mutable_app=mutable_app,
+                request=request,
+                response=response,
+                node_id=request["json"].get("nodeId", ""),
+                component_state=component_state,
+                run_component_callback=request["json"].get("callbackName", ""),
+                dependency_cache=dependency_cache,
+            )
+
+            # post component middlewares
+            await _run_middlewares(
+                mutable_app["settings"]["post_component_middlewares"],
+            )
+
+    except Exception as exception:
+        await _run_error_component(exception)
+
+    # post request middlewares
+    try:
+        await _run_middlewares(
+            mutable_app["settings"]["post_request_middlewares"],
+        )
+
+    except Exception as exception:
+        await _run_error_component(exception)
+
+    # compression
+    # Compression can be CPU heavy, so it runs in the executor. If it is
+    # disabled, we don't pay for the thread hop.
+    if mutable_app["settings"]["compress_responses"]:
+        await run_sync(
+            lambda: mutable_app["settings"]["compress_response"](
+                mutable_app=mutable_app,
+                request=request,
+                response=response,
+            ),
         )
 
     return response
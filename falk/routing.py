@@ -13,6 +13,10 @@ PARTS_RE = re.compile(r"<(?P<name>[^:>]+)(:(?P<pattern>[^>]+))?>")
 ROUTE_PART_FORMAT_STRING = r"(?P<{}>{})"
 DEFAULT_PART_PATTERN = r"[^/]+"
 OPTIONAL_TRAILING_SLASH_PATTERN = r"(/)"
+STATIC_PATTERN_RE = re.compile(
+    r"^\^(?P<path>[A-Za-z0-9_~/-]*)(?P<slash>\(/\)\?)?\$$",
+)
+GROUP_NAME_RE = re.compile(r"\(\?P(?P<kind>[<=])(?P<name>\w+)")
 
 
 def is_asgi_component(component):
@@ -121,6 +125,135 @@ def get_component(routes, path, asgi_interface=False):
     return None, None
 
 
+def compile_routes(routes):
+    # Routes get compiled into one router per interface.
+    # Routes without parameters are looked up in a dict. All other routes
+    # get combined into one regex, with their group names prefixed by the
+    # route index, so a path can be matched with a single `re.match`.
+    # Routes are matched in order, so the first matching route wins,
+    # regardless of whether it is static or not.
+    router = {
+        "route_count": len(routes),
+    }
+
+    for asgi_interface in (False, True):
+        static_routes = {}
+        regex_parts = []
+        regex_routes = {}
+        first_regex_index = len(routes)
+
+        for index, route in enumerate(routes):
+            _is_asgi_component, pattern_re, component, _, _ = route
+
+            if _is_asgi_component is not asgi_interface:
+                continue
+
+            # static routes
+            match_object = STATIC_PATTERN_RE.match(pattern_re.pattern)
+
+            if match_object:
+                paths = [match_object["path"]]
+
+                if match_object["slash"]:
+                    paths.append(match_object["path"] + "/")
+
+                for path in paths:
+                    static_routes.setdefault(path, (index, component))
+
+                continue
+
+            # dynamic routes
+            group_names = {}
+
+            def prefix_group_name(match_object):
+                name = match_object["name"]
+                prefixed_name = f"r{index}_{name}"
+
+                if match_object["kind"] == "<":
+                    group_names[prefixed_name] = name
+
+                return f"(?P{match_object['kind']}{prefixed_name}"
+
+            pattern = pattern_re.pattern
+
+            if pattern.startswith("^"):
+                pattern = pattern[1:]
+
+            if pattern.endswith("$"):
+                pattern = pattern[:-1]
+
+            pattern = GROUP_NAME_RE.sub(prefix_group_name, pattern)
+
+            regex_parts.append(f"(?P<r{index}>{pattern})$")
+
+            regex_routes[f"r{index}"] = (index, component, group_names)
+            first_regex_index = min(first_regex_index, index)
+
+        regex = None
+
+        if regex_parts:
+            regex = re.compile("|".join(regex_parts))
+
+        router[asgi_interface] = (
+            static_routes,
+            regex,
+            regex_routes,
+            first_regex_index,
+        )
+
+    return router
+
+
+def get_router(mutable_app):
+    router = mutable_app.get("router")
+
+    # Routes can be added at runtime, so we recompile the router if the
+    # number of routes changed since it was compiled.
+    if router is None or router["route_count"] != len(mutable_app["routes"]):
+        router = compile_routes(mutable_app["routes"])
+
+        mutable_app["router"] = router
+
+    return router
+
+
+def match_path(router, path, asgi_interface=False):
+    if not path.startswith("/"):
+        raise InvalidPathError(
+            'all paths have to start with "/"',
+        )
+
+    static_routes, regex, regex_routes, first_regex_index = (
+        router[asgi_interface]
+    )
+
+    static_route = static_routes.get(path)
+
+    # Static routes that were added before all dynamic routes can't be
+    # shadowed, so we can skip the regex.
+    if static_route and static_route[0] < first_regex_index:
+        return static_route[1], {}
+
+    if regex:
+        match_object = regex.match(path)
+
+        if match_object:
+            index, component, group_names = regex_routes[
+                match_object.lastgroup
+            ]
+
+            if not static_route or index < static_route[0]:
+                return component, {
+                    name: match_object[prefixed_name]
+                    for prefixed_name, name in group_names.items()
+                }
+
+    if static_route:
+        return static_route[1], {}
+
+    return None, None
+
+
 def get_asgi_components(routes):
     components = []
 
@@ -140,14 +273,22 @@ def get_url(
         query=None,
         prefix="",
         checks=True,
+        route_names=None,
 ):
 
     # find route by name
+    # `route_names` is an index of all named routes, that gets built by
+    # `add_route`. Routes that were added to the routes list directly are
+    # not indexed, so we fall back to searching the routes list.
     route = None
 
-    for _route in routes:
-        if _route[4] == route_name:
-            route = _route
+    if route_names:
+        route = route_names.get(route_name)
+
+    if not route:
+        for _route in routes:
+            if _route[4] == route_name:
+                route = _route
 
     if not route:
         raise UnknownRouteError(f'no route with name "{route_name}" found')
@@ -0,0 +1,183 @@
+import asyncio
+
+from falk.errors import ServiceUnavailableError, InvalidPathError
+from falk.routing import get_router, match_path
+
+
+def get_scheduler():
+    return {
+        # requests that were accepted and are waiting or running
+        "pending": 0,
+
+        # functions that were submitted to the executor and did not
+        # finish yet
+        "executor_tasks": 0,
+
+        "completed": 0,
+        "rejected": 0,
+
+        # component: route state
+        "routes": {},
+    }
+
+
+def get_route_state(max_concurrency=0, max_pending=0):
+    return {
+        "max_concurrency": max_concurrency,
+        "max_pending": max_pending,
+        "semaphore": None,
+        "pending": 0,
+        "running": 0,
+        "completed": 0,
+        "rejected": 0,
+    }
+
+
+def set_route_limits(mutable_app, component, max_concurrency=0, max_pending=0):
+    if max_concurrency < 0 or max_pending < 0:
+        raise ValueError("route limits have to be positive integers")
+
+    routes = mutable_app["scheduler"]["routes"]
+
+    if not max_concurrency and not max_pending:
+        routes.pop(component, None)
+
+        return
+
+    routes[component] = get_route_state(
+        max_concurrency=max_concurrency,
+        max_pending=max_pending,
+    )
+
+
+async def run_in_executor(mutable_app, function):
+    scheduler = mutable_app["scheduler"]
+    loop = asyncio.get_running_loop()
+
+    scheduler["executor_tasks"] += 1
+
+    try:
+        return await loop.run_in_executor(mutable_app["executor"], function)
+
+    finally:
+        scheduler["executor_tasks"] -= 1
+
+
+def _get_route_state(mutable_app, path):
+    routes = mutable_app["scheduler"]["routes"]
+
+    # We only need to match the path if any route has limits configured.
+    if not routes:
+        return None
+
+    try:
+        component, _ = match_path(
+            router=get_router(mutable_app),
+            path=path,
+        )
+
+    except InvalidPathError:
+        return None
+
+    return routes.get(component)
+
+
+async def run_scheduled(mutable_app, path, callback):
+    # All state gets only touched from the event loop, so we don't need
+    # locks here.
+    # Requests get rejected before they are queued, so a slow route can
+    # only occupy as many workers as its `max_concurrency` allows, and
+    # overloaded servers answer with a fast 503 instead of building up
+    # an unbounded queue.
+    scheduler = mutable_app["scheduler"]
+    max_pending = mutable_app["settings"]["max_pending_requests"]
+    route_state = _get_route_state(mutable_app=mutable_app, path=path)
+
+    if max_pending and scheduler["pending"] >= max_pending:
+        scheduler["rejected"] += 1
+
+        raise ServiceUnavailableError()
+
+    if route_state:
+        if (route_state["max_pending"] and
+                route_state["pending"] >= route_state["max_pending"]):
+
+            scheduler["rejected"] += 1
+            route_state["rejected"] += 1
+
+            raise ServiceUnavailableError()
+
+        # semaphores have to be created on the running event loop
+        if (route_state["max_concurrency"] and
+                route_state["semaphore"] is None):
+
+            route_state["semaphore"] = asyncio.Semaphore(
+                route_state["max_concurrency"],
+            )
+
+    scheduler["pending"] += 1
+
+    if route_state:
+        route_state["pending"] += 1
+
+    try:
+        if not route_state:
+            return await callback()
+
+        if route_state["semaphore"] is None:
+            route_state["running"] += 1
+
+            try:
+                return await callback()
+
+            finally:
+                route_state["running"] -= 1
+
+        async with route_state["semaphore"]:
+            route_state["running"] += 1
+
+            try:
+                return await callback()
+
+            finally:
+                route_state["running"] -= 1
+
+    finally:
+        scheduler["pending"] -= 1
+        scheduler["completed"] += 1
+
+        if route_state:
+            route_state["pending"] -= 1
+            route_state["completed"] += 1
+
+
+def get_scheduler_stats(mutable_app):
+    scheduler = mutable_app["scheduler"]
+    workers = mutable_app["settings"]["workers"]
+    executor_tasks = scheduler["executor_tasks"]
+
+    stats = {
+        "workers": workers,
+        "executor_tasks": executor_tasks,
+        "executor_queue": max(executor_tasks - workers, 0),
+        "executor_saturation": min(executor_tasks / max(workers, 1), 1.0),
+        "pending": scheduler["pending"],
+        "completed": scheduler["completed"],
+        "rejected": scheduler["rejected"],
+        "routes": {},
+    }
+
+    for component, route_state in scheduler["routes"].items():
+        name = f"{component.__module__}.{component.__qualname__}"
+
+        stats["routes"][name] = {
+            "max_concurrency": route_state["max_concurrency"],
+            "max_pending": route_state["max_pending"],
+            "pending": route_state["pending"],
+            "running": route_state["running"],
+            "waiting": route_state["pending"] - route_state["running"],
+            "completed": route_state["completed"],
+            "rejected": route_state["rejected"],
+        }
+
+    return stats
@@ -0,0 +1,78 @@
+import hashlib
+import base64
+import hmac
+
+
+def get_key_id(secret):
+    # Key ids identify secrets in tokens without leaking them.
+    digest = hashlib.sha256(secret.encode()).digest()
+
+    return base64.urlsafe_b64encode(digest[:6]).decode()
+
+
+class Signer:
+    def __init__(self, secret, fallback_secrets=()):
+        self.secrets = (secret, *fallback_secrets)
+        self.key_id = get_key_id(secret)
+
+        # `hmac.new()` derives the inner and outer key pads from the secret
+        # every time. We do this once per secret and copy the prepared
+        # state for every signature.
+        self._hmacs = {}
+
+        for _secret in self.secrets:
+            self._hmacs.setdefault(
+                get_key_id(_secret),
+                hmac.new(key=_secret.encode(), digestmod=hashlib.sha256),
+            )
+
+        self.key_ids = tuple(self._hmacs.keys())
+
+    def sign(self, message, key_id=None):
+        signature = self._hmacs[key_id or self.key_id].copy()
+        signature.update(message)
+
+        return signature.digest()
+
+    def verify(self, message, signature, key_id=None):
+        # Tokens without key id get checked against all secrets.
+        key_ids = self.key_ids
+
+        if key_id is not None:
+            if key_id not in self._hmacs:
+                return False
+
+            key_ids = (key_id, )
+
+        for key_id in key_ids:
+            if hmac.compare_digest(signature, self.sign(message, key_id)):
+                return True
+
+        return False
+
+
+def get_signer(mutable_app):
+    settings = mutable_app["settings"]
+
+    secrets = (
+        settings["token_secret"],
+        *settings["token_fallback_secrets"],
+    )
+
+    signer = mutable_app.get("signer")
+
+    # Secrets can be changed at runtime, so we rebuild the signer if they
+    # changed since it was created.
+    if signer is None or signer.secrets != secrets:
+        signer = Signer(
+            secret=secrets[0],
+            fallback_secrets=secrets[1:],
+        )
+
+        mutable_app["signer"] = signer
+
+        # Memoized component ids are derived from the old secret.
+        if "component_ids" in mutable_app:
+            mutable_app["component_ids"].clear()
+
+    return signer
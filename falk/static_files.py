@@ -1,5 +1,18 @@
+import posixpath
+import hashlib
+import re
 import os
 
+from falk.utils.lru_cache import LRUCache
+from falk.compression import ENCODINGS
+
+CONTENT_HASH_MAX_SIZE = 16 * 1024 * 1024  # 16 MiB
+CONTENT_HASH_CHUNK_SIZE = 64 * 1024  # 64 KiB
+
+# css/main.css -> css/main.0123456789ab.css
+FINGERPRINT_LENGTH = 12
+FINGERPRINT_RE = re.compile(r"^(?P<name>.+)\.(?P<fingerprint>[0-9a-f]{12})(?P<extension>\.[^./]+)?$")  # NOQA
+
 
 def get_falk_static_dir():
     return os.path.join(
@@ -20,3 +33,248 @@ def get_static_url(root_path, static_url_prefix, rel_path):
         static_url_prefix,
         rel_path,
     )
+
+
+# static manifest
+# All files in the static dirs get indexed at startup, so static requests
+# don't need to search the file system.
+# In debug mode, entries get revalidated on every lookup so added, changed,
+# and removed files get picked up without a restart.
+def get_content_hash(abs_path):
+    # The hash is only used for cache busting and ETags, so this works on
+    # FIPS enabled systems too.
+    md5_hash = hashlib.md5(usedforsecurity=False)
+
+    with open(abs_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CONTENT_HASH_CHUNK_SIZE), b""):
+            md5_hash.update(chunk)
+
+    return md5_hash.hexdigest()
+
+
+def get_file_stat(abs_path, hash_content=False):
+    stat = os.stat(abs_path)
+
+    # Strong ETags need the content hash. Large files, and files that are
+    # not part of the static manifest, get a weak ETag based on their size
+    # and their modification time.
+    if hash_content and stat.st_size <= CONTENT_HASH_MAX_SIZE:
+        content_hash = get_content_hash(abs_path)
+        etag = f'"{content_hash}"'
+
+    else:
+        content_hash = ""
+        etag = f'W/"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+    return {
+        "abs_path": abs_path,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "content_hash": content_hash,
+        "etag": etag,
+
+        # encoding: file stat of the compressed sibling
+        # (set by the static manifest)
+        "compressed_files": {},
+    }
+
+
+def _get_compressed_files(files, file_stat, rel_path):
+    # Compressed siblings (`main.css.gz`) are files in the static dirs too,
+    # so they are part of the manifest already. Siblings from other static
+    # dirs belong to other files.
+    compressed_files = {}
+
+    for name, (extension, _, _) in ENCODINGS.items():
+        compressed_file_stat = files.get(rel_path + extension)
+
+        if (compressed_file_stat and
+                compressed_file_stat["abs_path"] ==
+                file_stat["abs_path"] + extension):
+
+            compressed_files[name] = compressed_file_stat
+
+    return compressed_files
+
+
+def get_static_manifest(mutable_app):
+    static_dirs = tuple(mutable_app["settings"]["static_dirs"])
+    static_manifest = mutable_app["static_manifest"]
+
+    # The manifest gets rebuilt when the static dirs change.
+    if static_manifest and static_manifest["static_dirs"] == static_dirs:
+        return static_manifest
+
+    static_manifest = {
+        "static_dirs": static_dirs,
+
+        # rel_path: file stat
+        "files": {},
+    }
+
+    # Files in static dirs that were added first take precedence.
+    for static_dir in static_dirs:
+        walked_dirs = set()
+
+        for root, dir_names, file_names in os.walk(
+                static_dir,
+                followlinks=True,
+        ):
+
+            # Symlinks can point to a parent dir. Every dir gets walked only
+            # once, so symlink loops don't make the walk recurse forever.
+            root_stat = os.stat(root)
+            dir_key = (root_stat.st_dev, root_stat.st_ino)
+
+            if dir_key in walked_dirs:
+                dir_names.clear()
+
+                continue
+
+            walked_dirs.add(dir_key)
+
+            for file_name in file_names:
+                abs_path = os.path.join(root, file_name)
+                rel_path = os.path.relpath(abs_path, static_dir)
+                rel_path = rel_path.replace(os.sep, "/")
+
+                if rel_path in static_manifest["files"]:
+                    continue
+
+                static_manifest["files"][rel_path] = get_file_stat(
+                    abs_path=abs_path,
+                    hash_content=True,
+                )
+
+    for rel_path, file_stat in static_manifest["files"].items():
+        file_stat["compressed_files"] = _get_compressed_files(
+            files=static_manifest["files"],
+            file_stat=file_stat,
+            rel_path=rel_path,
+        )
+
+    mutable_app["static_manifest"] = static_manifest
+
+    return static_manifest
+
+
+def _find_static_file(static_dirs, rel_path):
+    for static_dir in static_dirs:
+        abs_static_dir = os.path.join(os.path.abspath(static_dir), "")
+        abs_path = os.path.abspath(os.path.join(static_dir, rel_path))
+
+        # prevent path traversal (`/static/../secret.txt`)
+        if not abs_path.startswith(abs_static_dir):
+            return ""
+
+        if os.path.isfile(abs_path):
+            return abs_path
+
+    return ""
+
+
+def get_static_file(mutable_app, rel_path):
+    static_manifest = get_static_manifest(mutable_app)
+    files = static_manifest["files"]
+    file_stat = files.get(rel_path)
+
+    if not mutable_app["settings"]["debug"]:
+        return file_stat
+
+    # debug mode
+    abs_path = _find_static_file(
+        static_dirs=static_manifest["static_dirs"],
+        rel_path=rel_path,
+    )
+
+    if not abs_path:
+        files.pop(rel_path, None)
+
+        return None
+
+    stat = os.stat(abs_path)
+
+    if (not file_stat or
+            file_stat["abs_path"] != abs_path or
+            file_stat["size"] != stat.st_size or
+            file_stat["mtime"] != stat.st_mtime):
+
+        file_stat = get_file_stat(abs_path=abs_path, hash_content=True)
+        files[rel_path] = file_stat
+
+    # compressed siblings
+    compressed_files = {}
+
+    for name, (extension, _, _) in ENCODINGS.items():
+        if os.path.isfile(abs_path + extension):
+            compressed_files[name] = get_file_stat(abs_path + extension)
+
+    file_stat["compressed_files"] = compressed_files
+
+    return file_stat
+
+
+# fingerprints
+# With `settings["fingerprint_static_urls"]` set, static URLs contain the
+# content hash of their file (`/static/falk/falk.0123456789ab.js`), so they
+# can be cached forever. A new version of a file gets a new URL.
+def get_fingerprinted_rel_path(mutable_app, rel_path):
+    if not mutable_app["settings"]["fingerprint_static_urls"]:
+        return rel_path
+
+    file_stat = get_static_file(
+        mutable_app=mutable_app,
+        rel_path=rel_path.lstrip("/"),
+    )
+
+    if not file_stat or not file_stat["content_hash"]:
+        return rel_path
+
+    name, extension = posixpath.splitext(rel_path)
+    fingerprint = file_stat["content_hash"][:FINGERPRINT_LENGTH]
+
+    return f"{name}.{fingerprint}{extension}"
+
+
+def get_fingerprinted_static_file(mutable_app, rel_path):
+    # Returns the file stat of the file the fingerprinted path points to,
+    # and whether the fingerprint matches the current content of the file.
+    # Outdated fingerprints, of clients that loaded a page before a deploy,
+    # still get served, but without caching them forever.
+    match = FINGERPRINT_RE.match(rel_path)
+
+    if not match:
+        return None, False
+
+    file_stat = get_static_file(
+        mutable_app=mutable_app,
+        rel_path=match["name"] + (match["extension"] or ""),
+    )
+
+    if not file_stat:
+        return None, False
+
+    is_current = (
+        file_stat["content_hash"][:FINGERPRINT_LENGTH] ==
+        match["fingerprint"]
+    )
+
+    return file_stat, is_current
+
+
+# static file cache
+# Small static files get cached in memory, so they can be sent without
+# reading them from disk again. The cache is bounded by the total size of
+# all cached files. Compressed siblings get cached separately.
+def _get_cache_entry_size(cache_entry):
+    return len(cache_entry["body"])
+
+
+def get_static_file_cache(max_size):
+    if max_size < 1:
+        return None
+
+    return LRUCache(
+        max_size=max_size,
+        get_size=_get_cache_entry_size,
+    )
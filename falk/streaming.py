@@ -0,0 +1,209 @@
+from jinja2 import nodes
+
+# Streaming renders the document in the order the browser needs it:
+# When the root component wraps its content in a component
+# (`<HTML5Base>...</HTML5Base>`), the wrapper gets rendered first and its
+# children get rendered lazily when the wrapper template outputs them.
+# Everything the wrapper rendered up to this point, like the document head,
+# gets flushed to the client before the children get rendered.
+#
+# Children that are rendered later can add styles, that are not part of the
+# already sent head. These get sent right before the children.
+#
+# Components that are marked as deferred (`<Component fx-defer />`) render a
+# placeholder first, and get rendered after the whole document was sent.
+# Their HTML gets sent in a `<template>` along with a script, that moves it
+# into the placeholder.
+
+
+def get_stream(response):
+    return {
+        "response": response,
+        "buffer": [],
+        "styles_sent": 0,
+
+        # set when the next rendered component is the only content of a
+        # streamed template
+        "wrapper": False,
+
+        # set along with `wrapper`
+        # (template, outputs_children)
+        "children_template": None,
+
+        # set while a template gets streamed, that outputs its children
+        # directly, so the children can be streamed node by node
+        "stream_children": False,
+
+        # counts the components rendered while streaming, so we know when
+        # a component subtree was completed
+        "rendered_components": 0,
+
+        # components that get rendered after the document was sent
+        # [(component, props, node_id), ...]
+        "deferred": [],
+    }
+
+
+def write_stream(stream, chunk):
+    if chunk:
+        stream["buffer"].append(chunk)
+
+
+def flush_stream(stream):
+    if not stream["buffer"]:
+        return
+
+    chunk = "".join(stream["buffer"])
+    response = stream["response"]
+
+    stream["buffer"].clear()
+
+    # The stream writer sends the status and the headers along with the
+    # first chunk, so `is_streaming` has to be set afterwards.
+    response["stream_writer"](response, chunk)
+
+    response["is_streaming"] = True
+
+
+def _is_whitespace(node):
+    return (
+        isinstance(node, nodes.Output) and
+        all(
+            isinstance(child, nodes.TemplateData) and not child.data.strip()
+            for child in node.nodes
+        )
+    )
+
+
+def _is_component_call(node):
+    return (
+        isinstance(node, nodes.CallBlock) and
+        isinstance(node.call.node, nodes.Getattr) and
+        isinstance(node.call.node.node, nodes.Name) and
+        node.call.node.node.name == "falk" and
+        node.call.node.attr == "_render_component"
+    )
+
+
+def _is_children(node):
+    if not isinstance(node, (nodes.Getattr, nodes.Getitem)):
+        return False
+
+    if not isinstance(node.node, nodes.Name) or node.node.name != "props":
+        return False
+
+    if isinstance(node, nodes.Getattr):
+        return node.attr == "children"
+
+    return isinstance(node.arg, nodes.Const) and node.arg.value == "children"
+
+
+def _outputs_children(body):
+    # Children can only be streamed node by node if they get output once,
+    # directly at the top level of the template. Otherwise the template
+    # may work with them as a string.
+    references = [
+        child
+        for node in body
+        for child in node.find_all((nodes.Getattr, nodes.Getitem))
+        if _is_children(child)
+    ]
+
+    outputs = [
+        child
+        for node in body
+        if isinstance(node, nodes.Output)
+        for child in node.nodes
+        if _is_children(child)
+    ]
+
+    return len(references) == 1 and len(outputs) == 1
+
+
+def _get_body(environment, template_string):
+    return [
+        node for node in environment.parse(template_string).body
+        if not _is_whitespace(node)
+    ]
+
+
+def is_wrapper_template(environment, template_string):
+    # Wrapper templates consist of one component call with children
+    # (`<HTML5Base>...</HTML5Base>`) and nothing else, so the first
+    # component that gets rendered is the wrapper.
+    body = _get_body(environment, template_string)
+
+    return len(body) == 1 and _is_component_call(body[0])
+
+
+def outputs_children(environment, template_string):
+    return _outputs_children(environment.parse(template_string).body)
+
+
+def get_children_template(environment, template_string):
+    # The children of a wrapper template get compiled into their own
+    # template, so they can be streamed node by node instead of being
+    # rendered into one string by `caller()`.
+    call_block = _get_body(environment, template_string)[0]
+
+    template_node = nodes.Template(
+        call_block.body,
+        lineno=call_block.lineno,
+    )
+
+    template_node.set_environment(environment)
+
+    template = environment.template_class.from_code(
+        environment,
+        environment.compile(template_node),
+        environment.make_globals(None),
+    )
+
+    return template, _outputs_children(call_block.body)
+
+
+class LazyChildren:
+    # Children of streamed wrapper components get rendered when they are
+    # used for the first time. To not break components that work with their
+    # children as strings, all string methods are proxied to the rendered
+    # children.
+
+    def __init__(self, render):
+        self._render = render
+        self._string = None
+
+    def __str__(self):
+        if self._string is None:
+            self._string = str(self._render())
+
+        return self._string
+
+    def __html__(self):
+        return str(self)
+
+    def __getattr__(self, name):
+        return getattr(str(self), name)
+
+    def __len__(self):
+        return len(str(self))
+
+    def __bool__(self):
+        return bool(str(self))
+
+    def __eq__(self, other):
+        return str(self) == other
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __add__(self, other):
+        return str(self) + other
+
+    def __radd__(self, other):
+        return other + str(self)
+
+    def __contains__(self, item):
+        return item in str(self)
+
+    def __iter__(self):
+        return iter(str(self))
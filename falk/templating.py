@@ -0,0 +1,89 @@
+import hashlib
+import os
+
+from jinja2 import Environment, FileSystemBytecodeCache
+
+
+def get_jinja2_environment(mutable_app):
+    settings = mutable_app["settings"]
+    bytecode_cache = None
+
+    if settings["jinja2_bytecode_cache_dir"]:
+        os.makedirs(settings["jinja2_bytecode_cache_dir"], exist_ok=True)
+
+        bytecode_cache = FileSystemBytecodeCache(
+            directory=settings["jinja2_bytecode_cache_dir"],
+        )
+
+    return Environment(
+        bytecode_cache=bytecode_cache,
+    )
+
+
+def compile_template(environment, template_string):
+    bytecode_cache = environment.bytecode_cache
+
+    if bytecode_cache is None:
+        return environment.from_string(template_string)
+
+    # jinja2 only consults the bytecode cache when templates get loaded
+    # through a loader, so we do the lookup ourselves here.
+    # Templates are named after the hash of their source, so every template
+    # gets its own bucket.
+    name = hashlib.sha1(template_string.encode()).hexdigest()
+
+    bucket = bytecode_cache.get_bucket(
+        environment=environment,
+        name=name,
+        filename=None,
+        source=template_string,
+    )
+
+    code = bucket.code
+
+    if code is None:
+        code = environment.compile(template_string)
+        bucket.code = code
+
+        bytecode_cache.set_bucket(bucket)
+
+    return environment.template_class.from_code(
+        environment,
+        code,
+        environment.make_globals(None),
+    )
+
+
+def render_template(template, template_context):
+    # `Template.render()` copies the template context into a new dict.
+    # We use the template context as parent of the jinja2 context
+    # instead, so layered template contexts (`ChainMap`) don't get flattened
+    # for every render.
+    context = template.new_context(
+        vars=template_context,
+        shared=True,
+    )
+
+    try:
+        return template.environment.concat(
+            template.root_render_func(context),
+        )
+
+    except Exception:
+        return template.environment.handle_exception()
+
+
+def stream_template(template, template_context, write):
+    # Like `render_template`, but the rendered chunks get passed to `write`
+    # as they are generated.
+    context = template.new_context(
+        vars=template_context,
+        shared=True,
+    )
+
+    try:
+        for chunk in template.root_render_func(context):
+            write(chunk)
+
+    except Exception:
+        return template.environment.handle_exception()
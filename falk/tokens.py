@@ -1,9 +1,135 @@
-import hashlib
 import base64
-import hmac
 import json
+import zlib
 
 from falk.errors import InvalidSettingsError, InvalidTokenError
+from falk.signing import get_signer
+
+try:
+    import orjson
+
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    from compression import zstd  # Python >= 3.14
+
+except ImportError:  # pragma: no cover
+    try:
+        import zstandard as zstd
+
+    except ImportError:
+        zstd = None
+
+# Tokens are versioned so tokens of older falk versions, that are still
+# embedded in open pages, can be decoded after an update.
+#
+#   legacy: base64(signature + json)
+#   2:      "2." + base64(signature + header + body)
+#   3:      "3." + key id + "." + base64(signature + header + body)
+#
+# The header is one byte, that contains the serializer id (high nibble) and
+# the compression id (low nibble) of the body. The signature covers the
+# header and the body.
+# The key id names the secret the token was signed with, so secrets can be
+# rotated without invalidating all tokens (`token_fallback_secrets`).
+TOKEN_PREFIX = "3."
+V2_TOKEN_PREFIX = "2."
+SIGNATURE_LENGTH = 32
+
+
+# serializers
+def _dumps_json(data):
+    return json.dumps(
+        data,
+        separators=(",", ":"),
+        sort_keys=True,
+    ).encode()
+
+
+def _loads_json(data):
+    return json.loads(data.decode())
+
+
+# orjson is faster than json, but serializes values json can't
+# (datetimes, UUIDs, dataclasses) and turns NaN and Infinity into `null`.
+# So it only gets used when it is configured explicitly.
+def _dumps_orjson(data):
+    return orjson.dumps(
+        data,
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+def _loads_orjson(data):
+    return orjson.loads(data)
+
+
+def _dumps_msgpack(data):
+    return msgpack.packb(data)
+
+
+def _loads_msgpack(data):
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+# compressors
+def _compress_zstd(data):
+    if hasattr(zstd, "ZstdCompressor"):
+        return zstd.ZstdCompressor().compress(data)
+
+    return zstd.compress(data)  # pragma: no cover
+
+
+def _decompress_zstd(data):
+    if hasattr(zstd, "ZstdDecompressor"):
+        return zstd.ZstdDecompressor().decompress(data)
+
+    return zstd.decompress(data)  # pragma: no cover
+
+
+# name: (id, encode, decode, available)
+SERIALIZERS = {
+    "json": (0, _dumps_json, _loads_json, True),
+    "msgpack": (1, _dumps_msgpack, _loads_msgpack, msgpack is not None),
+    "orjson": (2, _dumps_orjson, _loads_orjson, orjson is not None),
+}
+
+COMPRESSORS = {
+    "": (0, None, None, True),
+    "zlib": (1, zlib.compress, zlib.decompress, True),
+    "zstd": (2, _compress_zstd, _decompress_zstd, zstd is not None),
+}
+
+
+def _get_codec(codecs, name, setting_name):
+    if name not in codecs:
+        raise InvalidSettingsError(
+            f"'{setting_name}': unknown value '{name}'. Available values: {', '.join(repr(codec_name) for codec_name in codecs)}",  # NOQA
+        )
+
+    codec = codecs[name]
+
+    if not codec[3]:
+        raise InvalidSettingsError(
+            f"'{setting_name}': '{name}' is not installed",
+        )
+
+    return codec
+
+
+def _get_codec_by_id(codecs, codec_id):
+    for codec in codecs.values():
+        if codec[0] == codec_id and codec[3]:
+            return codec
+
+    raise InvalidTokenError()
 
 
 def encode_token(component_id, data, mutable_app):
@@ -12,24 +138,74 @@ def encode_token(component_id, data, mutable_app):
             "'token_secret' needs to be configured to encode tokens",
         )
 
-    secret = mutable_app["settings"]["token_secret"]
-
-    component_data = json.dumps(
-        [component_id, data],
-        separators=(",", ":"),
-        sort_keys=True,
-    ).encode()
+    settings = mutable_app["settings"]
+    signer = get_signer(mutable_app)
 
-    signature = hmac.new(
-        key=secret.encode(),
-        msg=component_data,
-        digestmod=hashlib.sha256,
+    # serialize
+    serializer_id, dumps, _, _ = _get_codec(
+        codecs=SERIALIZERS,
+        name=settings["token_serializer"],
+        setting_name="token_serializer",
     )
 
-    payload = signature.digest() + component_data
-    token = base64.urlsafe_b64encode(payload).decode()
+    try:
+        body = dumps([component_id, data])
+
+    except TypeError:
+        # orjson is stricter than json (integers above 64 bit for example),
+        # so we fall back to json
+        if settings["token_serializer"] != "orjson":
+            raise
+
+        serializer_id, dumps, _, _ = SERIALIZERS["json"]
+        body = dumps([component_id, data])
+
+    # compress
+    # Small bodies don't compress well, so we only compress bodies above
+    # the configured threshold, and only use the compressed body if it
+    # actually is smaller.
+    compressor_id = 0
+
+    if (settings["token_compression"] and
+            len(body) >= settings["token_compression_threshold"]):
+
+        _compressor_id, compress, _, _ = _get_codec(
+            codecs=COMPRESSORS,
+            name=settings["token_compression"],
+            setting_name="token_compression",
+        )
 
-    return token
+        compressed_body = compress(body)
+
+        if len(compressed_body) < len(body):
+            compressor_id = _compressor_id
+            body = compressed_body
+
+    payload = bytes([serializer_id << 4 | compressor_id]) + body
+    signature = signer.sign(payload)
+
+    token = base64.urlsafe_b64encode(signature + payload).decode()
+
+    return f"{TOKEN_PREFIX}{signer.key_id}.{token}"
+
+
+def _decode_legacy_token(token, signer):
+    try:
+        decoded = base64.urlsafe_b64decode(token.encode())
+        signature = decoded[:SIGNATURE_LENGTH]
+        component_data = decoded[SIGNATURE_LENGTH:]
+
+    except Exception as exception:
+        raise InvalidTokenError() from exception
+
+    if not signer.verify(message=component_data, signature=signature):
+        raise InvalidTokenError()
+
+    component_id, data = json.loads(
+        component_data.decode(),
+    )
+
+    return component_id, data
 
 
 def decode_token(token, mutable_app):
@@ -38,27 +214,50 @@ def decode_token(token, mutable_app):
             "'token_secret' needs to be configured to decode tokens",
         )
 
-    secret = mutable_app["settings"]["token_secret"]
+    signer = get_signer(mutable_app)
+    key_id = None
+
+    if token.startswith(TOKEN_PREFIX):
+        key_id, _, token = token[len(TOKEN_PREFIX):].partition(".")
+
+    elif token.startswith(V2_TOKEN_PREFIX):
+        token = token[len(V2_TOKEN_PREFIX):]
+
+    else:
+        return _decode_legacy_token(token=token, signer=signer)
 
     try:
         decoded = base64.urlsafe_b64decode(token.encode())
-        signature = decoded[:32]
-        component_data = decoded[32:]
+        signature = decoded[:SIGNATURE_LENGTH]
+        payload = decoded[SIGNATURE_LENGTH:]
 
     except Exception as exception:
         raise InvalidTokenError() from exception
 
-    expected_signature = hmac.new(
-        key=secret.encode(),
-        msg=component_data,
-        digestmod=hashlib.sha256,
-    ).digest()
+    valid = payload and signer.verify(
+        message=payload,
+        signature=signature,
+        key_id=key_id,
+    )
 
-    if not hmac.compare_digest(signature, expected_signature):
+    if not valid:
         raise InvalidTokenError()
 
-    component_id, data = json.loads(
-        component_data.decode(),
-    )
+    # The signature is valid, so we know we created this token and can
+    # decompress it safely.
+    header = payload[0]
+    body = payload[1:]
+
+    _, _, loads, _ = _get_codec_by_id(SERIALIZERS, header >> 4)
+    _, _, decompress, _ = _get_codec_by_id(COMPRESSORS, header & 0x0F)
+
+    try:
+        if decompress:
+            body = decompress(body)
+
+        component_id, data = loads(body)
+
+    except Exception as exception:
+        raise InvalidTokenError() from exception
 
     return component_id, data
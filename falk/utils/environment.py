@@ -10,7 +10,7 @@ def get_string(name, default):
 
         return value
 
-    return os.environ["name"]
+    return os.environ[name]
 
 
 def get_boolean(name, default):
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+import threading
+
+
+class LRUCache:
+    # Without `get_size`, every entry has a size of 1, so `max_size` is the
+    # maximum number of entries.
+
+    def __init__(self, max_size, get_size=None):
+        self.max_size = max_size
+        self.get_size = get_size
+
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _get_size(self, value):
+        if self.get_size is None:
+            return 1
+
+        return self.get_size(value)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._entries[key]
+
+            except KeyError:
+                self.misses += 1
+
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def set(self, key, value):
+        size = self._get_size(value)
+
+        # Entries that would not fit into the cache on their own would
+        # evict all other entries.
+        if self.max_size < 1 or size > self.max_size:
+            self.pop(key)
+
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._get_size(self._entries[key])
+
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self.size += size
+
+            while self.size > self.max_size:
+                _, evicted_value = self._entries.popitem(last=False)
+                self.size -= self._get_size(evicted_value)
+
+    def pop(self, key):
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._get_size(self._entries.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self):
+        return {
+            "size": self.size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -148,3 +148,75 @@ def test_file_upload_handler_dependencies():
         ),
         mutable_app=mutable_app,
     ) is mutable_app["settings"]["default_file_upload_handler"]
+
+
+def test_component_ids_with_fallback_secrets():
+    from falk.component_registry import get_component, register_component
+    from falk.secrets import get_random_secret
+    from falk.apps import get_default_app
+
+    def Component():
+        return "<div></div>"
+
+    # old app
+    app = get_default_app()
+    old_secret = app["settings"]["token_secret"]
+
+    register_component(Component, app)
+
+    old_component_id = app["components"][Component]
+
+    # new app with rotated secret
+    app = get_default_app()
+    app["settings"]["token_secret"] = get_random_secret()
+    app["settings"]["token_fallback_secrets"] = [old_secret]
+
+    register_component(Component, app)
+
+    assert app["components"][Component] != old_component_id
+    assert get_component(old_component_id, app) is Component
+
+
+def test_component_id_memoization():
+    import gc
+
+    from falk.apps import get_default_app, run_configure_app
+    from falk.component_registry import get_component_id
+    from falk.secrets import get_random_secret
+    from falk.components import ItWorks
+
+    def Component():
+        pass  # pragma: no cover
+
+    # unregistered components
+    mutable_app = get_default_app()
+    component_id = get_component_id(Component, mutable_app)
+
+    assert mutable_app["component_ids"] == {Component: component_id}
+    assert get_component_id(Component, mutable_app) == component_id
+    assert Component not in mutable_app["components"]
+
+    # rotated secrets
+    mutable_app["settings"]["token_secret"] = get_random_secret()
+
+    assert get_component_id(Component, mutable_app) != component_id
+
+    # components, that were created at runtime, can be garbage collected
+    del Component
+    gc.collect()
+
+    assert len(mutable_app["component_ids"]) == 0
+
+    # error components get registered at configure time
+    mutable_app = run_configure_app(lambda: None)
+    settings = mutable_app["settings"]
+
+    for component in (
+            ItWorks,
+            settings["bad_request_error_component"],
+            settings["forbidden_error_component"],
+            settings["not_found_error_component"],
+            settings["internal_server_error_component"],
+    ):
+
+        assert component in mutable_app["components"]
@@ -15,6 +15,53 @@ def test_get_dependencies():
     )
 
 
+def test_signature_cache():
+    import gc
+
+    from falk.dependency_injection import (
+        _method_signature_cache,
+        get_dependencies,
+        _signature_cache,
+        get_signature,
+    )
+
+    def callback1(arg_1, arg_2="value"):
+        pass  # pragma: no cover
+
+    class Component:
+        def render(self, arg_1):
+            pass  # pragma: no cover
+
+    # functions
+    signature = get_signature(callback1)
+
+    assert signature == (("arg_1", ), {"arg_2": "value"})
+    assert get_signature(callback1) is signature
+    assert callback1 in _signature_cache
+
+    # returned values of `get_dependencies` are no shared state
+    required_dependencies, dependencies = get_dependencies(callback1)
+
+    required_dependencies.append("arg_3")
+    dependencies["arg_4"] = "value"
+
+    assert get_signature(callback1) == (("arg_1", ), {"arg_2": "value"})
+
+    # bound methods
+    component = Component()
+
+    assert get_signature(component.render) == (("arg_1", ), {})
+    assert Component.render in _method_signature_cache
+
+    # the cache does not keep callables alive
+    del callback1
+    gc.collect()
+
+    assert not any(
+        callback.__name__ == "callback1" for callback in _signature_cache
+    )
+
+
 def test_run_callback():
     from falk.dependency_injection import run_callback
     from falk.errors import UnknownDependencyError
@@ -181,6 +228,155 @@ def test_dependency_provider_caching():
     assert cache["request"] == "request"
 
 
+def test_request_scoped_provider_caching():
+    from falk.dependency_injection import run_callback
+
+    call_counts = {
+        "user": 0,
+        "caller_name": 0,
+    }
+
+    request_cache = {}
+
+    def user_provider():
+        call_counts["user"] += 1
+
+        return "user"
+
+    def caller_name_provider(caller):
+        call_counts["caller_name"] += 1
+
+        return caller.__name__
+
+    def callback1(user, caller_name):
+        return [user, caller_name]
+
+    def callback2(user, caller_name):
+        return [user, caller_name]
+
+    for callback in (callback1, callback2):
+        return_value = run_callback(
+            callback=callback,
+            dependencies={
+                "caller": callback,
+            },
+            providers={
+                "user": user_provider,
+                "caller_name": caller_name_provider,
+            },
+            request_cache=request_cache,
+            request_scoped_providers=["user"],
+        )
+
+        assert return_value == ["user", callback.__name__]
+
+    # call scoped providers run for every call, request scoped providers
+    # only once
+    assert call_counts == {
+        "user": 1,
+        "caller_name": 2,
+    }
+
+    assert request_cache == {
+        "user": "user",
+    }
+
+
+def test_shared_request_cache(loop):
+    from concurrent.futures import ThreadPoolExecutor
+    import threading
+    import asyncio
+    import time
+
+    from falk.dependency_injection import share_request_cache, run_callback
+
+    from falk.dependency_injection import (
+        REQUEST_CACHE_LOCK,
+        run_callback_async,
+    )
+
+    call_count = 0
+    request_cache = {}
+    barrier = threading.Barrier(4)
+
+    def user_provider():
+        nonlocal call_count
+
+        call_count += 1
+        time.sleep(0.05)
+
+        return "user"
+
+    def callback(user):
+        return user
+
+    def run():
+        barrier.wait(timeout=5)
+
+        return run_callback(
+            callback=callback,
+            providers={
+                "user": user_provider,
+            },
+            request_cache=request_cache,
+            request_scoped_providers=["user"],
+        )
+
+    share_request_cache(request_cache)
+
+    # Request scoped providers run only once, even if multiple threads
+    # resolve them at the same time.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(run) for _ in range(4)]
+
+        assert [future.result() for future in futures] == ["user"] * 4
+
+    assert call_count == 1
+
+    # the async twin uses the same request cache
+    return_value = asyncio.run_coroutine_threadsafe(
+        run_callback_async(
+            callback=callback,
+            providers={
+                "user": user_provider,
+            },
+            request_cache=request_cache,
+            request_scoped_providers=["user"],
+        ),
+        loop,
+    ).result()
+
+    assert return_value == "user"
+    assert call_count == 1
+
+    # The lock gets released when a provider raises.
+    def broken_provider():
+        raise ValueError()
+
+    def broken_callback(broken):
+        pass  # pragma: no cover
+
+    # `exc_info` keeps the traceback, and with it the frames of the
+    # provider resolution, alive.
+    with pytest.raises(ValueError) as exc_info:
+        run_callback(
+            callback=broken_callback,
+            providers={
+                "broken": broken_provider,
+            },
+            request_cache=request_cache,
+            request_scoped_providers=["broken"],
+        )
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        lock = request_cache[REQUEST_CACHE_LOCK]
+        future = executor.submit(lambda: lock.acquire(timeout=1))
+
+        assert future.result()
+
+    assert exc_info.type is ValueError
+
+
 def test_async_callbacks_and_providers(loop):
     import asyncio
 
@@ -251,6 +447,45 @@ def test_async_callbacks_and_providers(loop):
     assert return_value == "SUCCESS 2"
 
 
+def test_inline_providers(loop):
+    import asyncio
+
+    from falk.dependency_injection import run_callback_async
+
+    sync_calls = []
+
+    async def run_sync(function):
+        sync_calls.append(function)
+
+        return function()
+
+    def header_provider():
+        return "header"
+
+    def user_provider(header):
+        return "user"
+
+    def callback(header, user):
+        return f"{header} {user}"
+
+    # Only the user provider and the callback get passed to `run_sync`.
+    return_value = asyncio.run_coroutine_threadsafe(
+        run_callback_async(
+            callback=callback,
+            providers={
+                "header": header_provider,
+                "user": user_provider,
+            },
+            inline_providers=["header"],
+            run_sync=run_sync,
+        ),
+        loop,
+    ).result()
+
+    assert return_value == "header user"
+    assert len(sync_calls) == 2
+
+
 def test_invalid_dependency_providers():
     from falk.errors import InvalidDependencyProviderError
     from falk.dependency_injection import run_callback
@@ -45,3 +45,53 @@ def test_immutable_proxies():
 
     with pytest.raises(TypeError):
         immutable_data["foo"] += ["foo"]
+
+
+def test_immutable_proxy_child_caching():
+    from falk.immutable_proxy import get_immutable_proxy
+
+    mutable_data = {
+        "list": [{"foo": "bar"}, {"foo": "baz"}],
+        "dict": {"foo": "bar"},
+        "string": "foo",
+    }
+
+    immutable_data = get_immutable_proxy(
+        data=mutable_data,
+        name="props",
+        mutable_version_name="mutable_props",
+    )
+
+    # child proxies get reused
+    assert immutable_data["dict"] is immutable_data["dict"]
+    assert immutable_data["list"] is immutable_data["list"]
+    assert immutable_data["string"] is mutable_data["string"]
+
+    assert (
+        list(immutable_data["list"]) ==
+        [immutable_data["list"][0], immutable_data["list"][1]]
+    )
+
+    assert (
+        list(immutable_data["list"])[0] is
+        immutable_data["list"][0]
+    )
+
+    assert (
+        dict(immutable_data.items())["dict"] is
+        immutable_data["dict"]
+    )
+
+    # slices
+    assert immutable_data["list"][:1] == [{"foo": "bar"}]
+
+    # child proxies get invalidated when the underlying data changes
+    dict_proxy = immutable_data["dict"]
+    mutable_data["dict"] = {"foo": "baz"}
+
+    assert immutable_data["dict"] is not dict_proxy
+    assert immutable_data["dict"]["foo"] == "baz"
+
+    # error messages
+    with pytest.raises(TypeError, match="props is immutable. use mutable_props instead"):  # NOQA
+        immutable_data["list"][0]["foo"] = "foo"
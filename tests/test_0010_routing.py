@@ -193,3 +193,136 @@ def test_routing():
             "bar": ["foo1", "foo2"],
         }
     ) == "/admin/?foo=bar&bar=foo1&bar=foo2"
+
+
+def test_compiled_routes():
+    from falk.errors import InvalidPathError
+
+    from falk.routing import (
+        compile_routes,
+        get_component,
+        match_path,
+        get_route,
+    )
+
+    def ShowModelObject():
+        pass
+
+    def ShowModel():
+        pass
+
+    def AdminIndex():
+        pass
+
+    def AdminSettings():
+        pass
+
+    def File():
+        pass
+
+    def Index():
+        pass
+
+    async def AsgiApp(asgi_scope, asgi_receive, asgi_send):
+        pass
+
+    routes = [
+        get_route(r"/admin/<model>/<pk:\d+>(/)", ShowModelObject),
+        get_route(r"/admin/<model>(/)", ShowModel),
+        get_route(r"/admin/", AdminIndex),
+        get_route(r"/admin/settings", AdminSettings),  # shadowed
+        get_route(r"/files/<path:.*>", File),
+        get_route(r"/asgi<path:.*>", AsgiApp),
+        get_route(r"/", Index),
+    ]
+
+    router = compile_routes(routes)
+
+    paths = [
+        "/",
+        "/admin/",
+        "/admin",
+        "/admin/settings",
+        "/admin/users",
+        "/admin/users/",
+        "/admin/users/10",
+        "/admin/users/10/",
+        "/admin/users/foo/",
+        "/files/",
+        "/files/foo/bar.txt",
+        "/asgi/foo",
+        "/foo",
+    ]
+
+    # the compiled router has to return the same results as the linear
+    # route scan
+    for path in paths:
+        for asgi_interface in (False, True):
+            assert match_path(
+                router=router,
+                path=path,
+                asgi_interface=asgi_interface,
+            ) == get_component(
+                routes=routes,
+                path=path,
+                asgi_interface=asgi_interface,
+            )
+
+    assert match_path(router, "/admin/settings") == (
+        ShowModel,
+        {"model": "settings"},
+    )
+
+    assert match_path(router, "/asgi/foo", asgi_interface=True) == (
+        AsgiApp,
+        {"path": "/foo"},
+    )
+
+    # invalid path
+    with pytest.raises(InvalidPathError):
+        match_path(router, "admin/")
+
+
+def test_route_names():
+    from falk.errors import InvalidRouteArgsError, InvalidRouteError
+    from falk.providers.routing import get_url_provider
+    from falk.apps import run_configure_app
+    from falk.request_handling import get_request
+
+    def Index():
+        pass
+
+    def ShowUser():
+        pass
+
+    def configure_app(add_route):
+        add_route(r"/users/<pk:\d+>", ShowUser, name="show_user")
+        add_route(r"/", Index, name="index")
+
+    mutable_app = run_configure_app(configure_app)
+
+    assert list(mutable_app["route_names"].keys()) == ["show_user", "index"]
+
+    get_url = get_url_provider(
+        mutable_app=mutable_app,
+        request=get_request(),
+    )
+
+    assert get_url("index") == "/"
+    assert get_url("show_user", {"pk": 1}) == "/users/1"
+
+    # checks
+    with pytest.raises(InvalidRouteArgsError):
+        get_url("show_user", {"pk": "foo"})
+
+    mutable_app["settings"]["check_urls"] = False
+
+    assert get_url("show_user", {"pk": "foo"}) == "/users/foo"
+
+    # duplicate route names
+    def configure_app(add_route):
+        add_route(r"/", Index, name="index")
+        add_route(r"/index", Index, name="index")
+
+    with pytest.raises(InvalidRouteError):
+        run_configure_app(configure_app)
@@ -0,0 +1,257 @@
+def test_lru_cache():
+    from falk.utils.lru_cache import LRUCache
+
+    cache = LRUCache(max_size=2)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.get("a") == 1
+
+    # "b" is the least recently used entry now
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+    assert cache.get("b") is None
+    assert cache.get_stats() == {
+        "size": 2,
+        "max_size": 2,
+        "hits": 1,
+        "misses": 1,
+    }
+
+    # disabled cache
+    cache = LRUCache(max_size=0)
+
+    cache.set("a", 1)
+
+    assert len(cache) == 0
+
+    # size bounded cache
+    cache = LRUCache(max_size=10, get_size=len)
+
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.set("a", "aaa")
+
+    assert cache.get_stats()["size"] == 7
+
+    # "b" is the least recently used entry now
+    cache.set("c", "ccccc")
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.get_stats()["size"] == 8
+
+    # entries that are bigger than the cache don't get cached
+    cache.set("a", "a" * 11)
+
+    assert "a" not in cache
+    assert "c" in cache
+    assert cache.get_stats()["size"] == 5
+
+
+def test_template_cache():
+    from falk.templating import get_jinja2_environment
+    from falk.rendering import get_component_template
+    from falk.utils.lru_cache import LRUCache
+    from falk.apps import get_default_app
+
+    def Component():
+        return """
+            <div>{{ 1 + 1 }}</div>
+        """
+
+    mutable_app = get_default_app()
+    mutable_app["template_cache"] = LRUCache(max_size=8)
+    mutable_app["jinja2_environment"] = get_jinja2_environment(mutable_app)
+    template_cache = mutable_app["template_cache"]
+
+    # first render: cache miss
+    component_blocks, template = get_component_template(
+        component=Component,
+        component_template=Component(),
+        mutable_app=mutable_app,
+    )
+
+    assert template.render({}).strip() == "<div>2</div>"
+    assert template_cache.get_stats()["misses"] == 1
+    assert template_cache.get_stats()["hits"] == 0
+
+    # second render: cache hit
+    cache_entry = get_component_template(
+        component=Component,
+        component_template=Component(),
+        mutable_app=mutable_app,
+    )
+
+    assert cache_entry == (component_blocks, template)
+    assert template_cache.get_stats()["hits"] == 1
+
+    # debug mode bypasses the cache
+    mutable_app["settings"]["debug"] = True
+
+    _, _template = get_component_template(
+        component=Component,
+        component_template=Component(),
+        mutable_app=mutable_app,
+    )
+
+    assert _template is not template
+    assert template_cache.get_stats()["hits"] == 1
+
+
+def test_constant_component_templates():
+    from falk.component_templates import get_constant_component_templates
+
+    def Component(flag):
+        if flag:
+            return "<div>a</div>"
+
+        return "<div>b</div>"
+
+    def DynamicComponent(template):
+        return template
+
+    assert get_constant_component_templates(Component) == [
+        "<div>a</div>",
+        "<div>b</div>",
+    ]
+
+    assert get_constant_component_templates(DynamicComponent) == []
+
+
+def test_precompile_component_templates(tmp_path):
+    from falk.rendering import precompile_component_templates
+    from falk.apps import run_configure_app
+
+    def Child():
+        return "<span>child</span>"
+
+    def Page(Child=Child):
+        return """
+            <div><Child /></div>
+        """
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["jinja2_bytecode_cache_dir"] = str(tmp_path)
+
+        add_route(r"/", Page)
+
+    mutable_app = run_configure_app(configure_app)
+    template_cache = mutable_app["template_cache"]
+    component_templates = mutable_app["component_templates"]
+
+    assert (Page, Page()) in component_templates
+    assert (Child, Child()) in component_templates
+
+    template_count = precompile_component_templates(mutable_app)
+
+    assert template_count == len(component_templates)
+    assert template_cache.get_stats()["size"] == template_count
+
+    # the bytecode cache was written
+    jinja2_templates = set(
+        component_blocks["jinja2_template"]
+        for component_blocks in component_templates.values()
+    )
+
+    assert len(list(tmp_path.iterdir())) == len(jinja2_templates)
+
+    # a second app loads the templates from the bytecode cache
+    mutable_app = run_configure_app(configure_app)
+    bytecode_cache = mutable_app["jinja2_environment"].bytecode_cache
+    loaded_buckets = []
+
+    def load_bytecode(bucket):
+        load_bytecode.original(bucket)
+
+        loaded_buckets.append(bucket)
+
+    load_bytecode.original = bytecode_cache.load_bytecode
+    bytecode_cache.load_bytecode = load_bytecode
+
+    precompile_component_templates(mutable_app)
+
+    assert len(loaded_buckets) == template_count
+    assert all(bucket.code is not None for bucket in loaded_buckets)
+
+
+def test_parse_constant_templates_on_registration():
+    from falk.component_registry import register_component
+    from falk.templating import get_jinja2_environment
+    from falk.rendering import get_component_template
+    from falk.apps import get_default_app
+
+    def Component(dynamic=False):
+        if dynamic:
+            return f"<div>{dynamic}</div>"
+
+        return """
+            <div>
+                <span
+                    class="foo">
+                    {{ 1 + 1 }}
+                </span>
+            </div>
+        """
+
+    def NoTemplateComponent():
+        return "no template"
+
+    mutable_app = get_default_app()
+    mutable_app["jinja2_environment"] = get_jinja2_environment(mutable_app)
+
+    register_component(Component, mutable_app)
+    register_component(NoTemplateComponent, mutable_app)
+
+    component_templates = mutable_app["component_templates"]
+
+    assert list(component_templates.keys()) == [(Component, Component())]
+
+    # constant templates are not parsed again
+    component_blocks, template = get_component_template(
+        component=Component,
+        component_template=Component(),
+        mutable_app=mutable_app,
+    )
+
+    assert component_blocks is component_templates[(Component, Component())]
+    assert "".join(template.render({}).split()) == '<div><spanclass="foo">2</span></div>'  # NOQA
+
+    # dynamic templates are parsed at runtime
+    component_blocks, template = get_component_template(
+        component=Component,
+        component_template=Component(dynamic="foo"),
+        mutable_app=mutable_app,
+    )
+
+    assert template.render({}) == "<div>foo</div>"
+
+
+def test_parse_constant_templates_errors():
+    import pytest
+
+    from falk.component_registry import register_component
+    from falk.apps import get_default_app
+
+    def Component():
+        return """
+            <style>div { color: red; }</style>
+            <div>foo</div>
+        """
+
+    def hash_string(mutable_app, string):
+        raise RuntimeError("hash_string is broken")
+
+    mutable_app = get_default_app()
+    mutable_app["settings"]["hash_string"] = hash_string
+
+    # Only parser errors get ignored. Errors in the parser's dependencies
+    # get raised.
+    with pytest.raises(RuntimeError, match="hash_string is broken"):
+        register_component(Component, mutable_app)
@@ -0,0 +1,81 @@
+def test_layered_template_context():
+    from falk.templating import get_jinja2_environment, render_template
+    from falk.rendering import get_template_context
+    from falk.request_handling import get_request
+    from falk.apps import get_default_app
+
+    mutable_app = get_default_app()
+    mutable_app["jinja2_environment"] = get_jinja2_environment(mutable_app)
+    mutable_app["settings"]["extra_template_context"]["foo"] = "foo"
+    mutable_request = get_request()
+    parts = {}
+
+    template_context1 = get_template_context(
+        mutable_app=mutable_app,
+        mutable_request=mutable_request,
+        extra_template_context={"bar": "bar"},
+        parts=parts,
+    )
+
+    template_context2 = get_template_context(
+        mutable_app=mutable_app,
+        mutable_request=mutable_request,
+        parts=parts,
+    )
+
+    # request wide layers are shared
+    assert template_context1["app"] is template_context2["app"]
+    assert template_context1["len"] is len
+
+    # component local data
+    assert template_context1["foo"] == "foo"
+    assert template_context1["bar"] == "bar"
+    assert "bar" not in template_context2
+
+    # updates are component local
+    template_context1.update({"foo": "baz"})
+
+    assert template_context1["foo"] == "baz"
+    assert template_context2["foo"] == "foo"
+    assert mutable_app["settings"]["extra_template_context"]["foo"] == "foo"
+
+    # rendering
+    template = mutable_app["jinja2_environment"].from_string(
+        "{{ foo }} {{ bar }} {{ len(range(3)) }} {{ request.method }}",
+    )
+
+    assert render_template(
+        template=template,
+        template_context=template_context1,
+    ) == "baz bar 3 GET"
+
+
+def test_shared_immutable_proxies():
+    from falk.request_handling import get_response, get_request
+    from falk.rendering import render_component
+    from falk.apps import run_configure_app
+
+    proxies = []
+
+    def Child(app, settings, request):
+        proxies.append((app, settings, request))
+
+        return "<div>child</div>"
+
+    def Parent(app, settings, request, Child=Child):
+        proxies.append((app, settings, request))
+
+        return "<div><Child /></div>"
+
+    mutable_app = run_configure_app(lambda: None)
+
+    render_component(
+        component=Parent,
+        mutable_app=mutable_app,
+        request=get_request(),
+        response=get_response(),
+    )
+
+    # The immutable proxies are created once per request.
+    assert len(proxies) == 2
+    assert all(a is b for a, b in zip(proxies[0], proxies[1]))
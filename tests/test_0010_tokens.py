@@ -75,28 +75,39 @@ def test_tampered_with_tokens():
         "baz": [1, 2, 3],
     }
 
+    # The token prefix and the header byte are kept together with the
+    # signature, so the helpers can treat everything but the body as
+    # signature.
     def unpack(token):
+        version, key_id, token = token.split(".")
         decoded = base64.urlsafe_b64decode(token.encode())
         signature = decoded[:32]
-        component_data = decoded[32:]
+        header = decoded[32:33]
+        component_data = decoded[33:]
 
         component_id, component_state = json.loads(
             component_data.decode(),
         )
 
-        return component_id, component_state, signature
+        return (
+            component_id,
+            component_state,
+            (f"{version}.{key_id}.", signature, header),
+        )
 
     def pack(component_id, component_state, signature):
+        prefix, signature, header = signature
+
         component_data = json.dumps(
             [component_id, component_state],
             separators=(",", ":"),
             sort_keys=True,
         ).encode()
 
-        payload = signature + component_data
+        payload = signature + header + component_data
         token = base64.urlsafe_b64encode(payload).decode()
 
-        return token
+        return prefix + token
 
     token = encode_token(
         component_id=component_id,
@@ -155,3 +166,243 @@ def test_invalid_settings_errors():
                 "settings": {},
             },
         )
+
+
+def test_token_codecs():
+    from falk.tokens import decode_token, encode_token
+    from falk.errors import InvalidSettingsError
+    from falk.apps import get_default_app
+
+    app = get_default_app()
+    component_id = "foo.bar.baz"
+
+    small_state = {
+        "foo": "bar",
+    }
+
+    large_state = {
+        "items": [{"id": i, "name": f"item {i}"} for i in range(100)],
+    }
+
+    def encode(data):
+        return encode_token(
+            component_id=component_id,
+            data=data,
+            mutable_app=app,
+        )
+
+    def decode(token):
+        return decode_token(
+            token=token,
+            mutable_app=app,
+        )
+
+    # small tokens don't get compressed
+    uncompressed_token = encode(small_state)
+
+    assert decode(uncompressed_token) == (component_id, small_state)
+
+    # large tokens get compressed
+    app["settings"]["token_compression"] = ""
+    uncompressed_token = encode(large_state)
+
+    app["settings"]["token_compression"] = "zlib"
+    compressed_token = encode(large_state)
+
+    assert len(compressed_token) < len(uncompressed_token)
+    assert decode(compressed_token) == (component_id, large_state)
+
+    # tokens stay decodable when the settings change
+    app["settings"]["token_compression"] = ""
+
+    assert decode(compressed_token) == (component_id, large_state)
+
+    # unknown codecs
+    app["settings"]["token_compression"] = "unknown"
+
+    with pytest.raises(InvalidSettingsError):
+        encode(large_state)
+
+    app["settings"]["token_compression"] = ""
+    app["settings"]["token_serializer"] = "unknown"
+
+    with pytest.raises(InvalidSettingsError):
+        encode(large_state)
+
+
+def test_token_serializers():
+    import datetime
+    import math
+
+    import pytest
+
+    from falk.tokens import encode_token, decode_token
+    from falk.apps import get_default_app
+
+    app = get_default_app()
+
+    def encode(data):
+        return encode_token(
+            component_id="component-id",
+            data=data,
+            mutable_app=app,
+        )
+
+    def decode(token):
+        return decode_token(
+            token=token,
+            mutable_app=app,
+        )
+
+    # tokens don't get compressed by default
+    assert app["settings"]["token_compression"] == ""
+
+    # The default serializer has the semantics of json, whether orjson is
+    # installed or not.
+    _, data = decode(encode({"value": math.nan}))
+
+    assert math.isnan(data["value"])
+
+    with pytest.raises(TypeError):
+        encode({"value": datetime.date(2026, 1, 1)})
+
+    # orjson
+    pytest.importorskip("orjson")
+
+    app["settings"]["token_serializer"] = "orjson"
+
+    assert decode(encode({"foo": "bar"})) == (
+        "component-id",
+        {"foo": "bar"},
+    )
+
+    # values orjson can't serialize fall back to json
+    assert decode(encode({"value": 2 ** 70 + 1})) == (
+        "component-id",
+        {"value": 2 ** 70 + 1},
+    )
+
+
+def test_legacy_tokens():
+    import hashlib
+    import base64
+    import hmac
+    import json
+
+    from falk.tokens import decode_token
+    from falk.apps import get_default_app
+
+    app = get_default_app()
+    component_id = "foo.bar.baz"
+    component_state = {"foo": "bar"}
+
+    component_data = json.dumps(
+        [component_id, component_state],
+        separators=(",", ":"),
+        sort_keys=True,
+    ).encode()
+
+    signature = hmac.new(
+        key=app["settings"]["token_secret"].encode(),
+        msg=component_data,
+        digestmod=hashlib.sha256,
+    )
+
+    token = base64.urlsafe_b64encode(
+        signature.digest() + component_data,
+    ).decode()
+
+    assert decode_token(token=token, mutable_app=app) == (
+        component_id,
+        component_state,
+    )
+
+
+def test_token_secret_rotation():
+    from falk.tokens import decode_token, encode_token
+    from falk.secrets import get_random_secret
+    from falk.errors import InvalidTokenError
+    from falk.apps import get_default_app
+
+    app = get_default_app()
+    settings = app["settings"]
+    component_id = "foo.bar.baz"
+    component_state = {"foo": "bar"}
+
+    old_secret = settings["token_secret"]
+
+    token = encode_token(
+        component_id=component_id,
+        data=component_state,
+        mutable_app=app,
+    )
+
+    # rotate secret
+    settings["token_secret"] = get_random_secret()
+    settings["token_fallback_secrets"] = [old_secret]
+
+    new_token = encode_token(
+        component_id=component_id,
+        data=component_state,
+        mutable_app=app,
+    )
+
+    assert new_token.split(".")[1] != token.split(".")[1]
+
+    # tokens signed with the old secret are still valid
+    assert decode_token(token=token, mutable_app=app) == (
+        component_id,
+        component_state,
+    )
+
+    assert decode_token(token=new_token, mutable_app=app) == (
+        component_id,
+        component_state,
+    )
+
+    # remove old secret
+    settings["token_fallback_secrets"] = []
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(token=token, mutable_app=app)
+
+    assert decode_token(token=new_token, mutable_app=app)
+
+    # unknown key ids
+    version, key_id, _token = new_token.split(".")
+
+    with pytest.raises(InvalidTokenError):
+        decode_token(token=f"{version}.unknown.{_token}", mutable_app=app)
+
+
+def test_signer():
+    from falk.signing import Signer, get_signer
+    from falk.apps import get_default_app
+
+    signer = Signer(secret="secret", fallback_secrets=["old-secret"])
+    old_signer = Signer(secret="old-secret")
+
+    signature = old_signer.sign(b"message")
+
+    assert signer.verify(message=b"message", signature=signature)
+    assert signer.verify(
+        message=b"message",
+        signature=signature,
+        key_id=old_signer.key_id,
+    )
+
+    assert not signer.verify(
+        message=b"message",
+        signature=signature,
+        key_id=signer.key_id,
+    )
+
+    # signers get cached per app and get rebuilt when the secrets change
+    app = get_default_app()
+    signer = get_signer(app)
+
+    assert get_signer(app) is signer
+
+    app["settings"]["token_secret"] = "new-secret"
+
+    assert get_signer(app) is not signer
@@ -21,3 +21,106 @@ def test_custom_dependencies(start_falk_app):
     )
 
     assert requests.get(base_url).text == "foobar"
+
+
+def test_request_scoped_dependencies(start_falk_app):
+    import requests
+
+    call_counts = {
+        "current_user": 0,
+        "caller_name": 0,
+    }
+
+    rendered_components = []
+
+    def current_user():
+        call_counts["current_user"] += 1
+
+        return "alice"
+
+    def caller_name(caller):
+        call_counts["caller_name"] += 1
+
+        return caller.__name__
+
+    def Child(current_user, caller_name):
+        rendered_components.append(f"{current_user} {caller_name}")
+
+        return """
+            <span>Child</span>
+        """
+
+    def Index(current_user, caller_name, Child=Child):
+        rendered_components.append(f"{current_user} {caller_name}")
+
+        return """
+            <div>
+                <Child />
+                <Child />
+            </div>
+        """
+
+    def pre_request_middleware(current_user):
+        pass
+
+    def configure_app(
+            add_dependency,
+            add_route,
+            add_pre_request_middleware,
+    ):
+
+        add_dependency(current_user, scope="request")
+        add_dependency(caller_name)
+
+        add_pre_request_middleware(pre_request_middleware)
+        add_route("/", Index)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    requests.get(base_url)
+
+    assert rendered_components == [
+        "alice Index",
+        "alice Child",
+        "alice Child",
+    ]
+
+    assert call_counts == {
+        "current_user": 1,
+        "caller_name": 3,
+    }
+
+    # the cache is scoped to a request
+    requests.get(base_url)
+
+    assert call_counts["current_user"] == 2
+
+
+def test_invalid_dependency_scopes():
+    import pytest
+
+    from falk.providers.dependencies import add_dependency_provider
+    from falk.apps import get_default_app
+
+    mutable_app = get_default_app()
+    mutable_settings = mutable_app["settings"]
+    add_dependency = add_dependency_provider(mutable_settings)
+
+    def current_user():
+        pass  # pragma: no cover
+
+    with pytest.raises(ValueError):
+        add_dependency(current_user, scope="session")
+
+    # scopes can be overridden
+    add_dependency(current_user, scope="request")
+
+    assert mutable_settings["request_scoped_dependencies"] == [
+        "current_user",
+    ]
+
+    add_dependency(current_user)
+
+    assert mutable_settings["request_scoped_dependencies"] == []
@@ -0,0 +1,106 @@
+def test_async_request_handling(start_falk_app):
+    import asyncio
+
+    import requests
+
+    from falk.errors import ForbiddenError
+
+    calls = []
+
+    async def pre_request_middleware(request):
+        calls.append("pre_request_middleware")
+
+    async def current_user():
+        await asyncio.sleep(0)
+
+        return "alice"
+
+    async def Index(current_user, set_response_header):
+        await asyncio.sleep(0)
+
+        set_response_header("X-User", current_user)
+
+        return """
+            <div>{{ 1 + 1 }}</div>
+        """
+
+    def SyncComponent():
+        return "<div>sync</div>"
+
+    async def ForbiddenComponent():
+        raise ForbiddenError()
+
+    def configure_app(
+            mutable_settings,
+            add_route,
+            add_dependency,
+            add_pre_request_middleware,
+    ):
+
+        mutable_settings["async_request_handling"] = True
+
+        add_dependency(current_user)
+        add_pre_request_middleware(pre_request_middleware)
+
+        add_route("/", Index)
+        add_route("/sync", SyncComponent)
+        add_route("/forbidden", ForbiddenComponent)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    # async component
+    response = requests.get(base_url)
+
+    assert response.status_code == 200
+    assert response.headers["X-User"] == "alice"
+    assert ">2</div>" in response.text
+    assert calls == ["pre_request_middleware"]
+
+    # sync component
+    response = requests.get(base_url + "/sync")
+
+    assert response.status_code == 200
+    assert ">sync</div>" in response.text
+
+    # errors
+    response = requests.get(base_url + "/forbidden")
+
+    assert response.status_code == 403
+
+
+def test_async_components_dont_block_workers(start_falk_app):
+    from concurrent.futures import ThreadPoolExecutor
+    import asyncio
+    import time
+
+    import requests
+
+    async def Index(set_response_body):
+        await asyncio.sleep(0.5)
+
+        set_response_body("done")
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["async_request_handling"] = True
+        mutable_settings["workers"] = 1
+
+        add_route("/", Index)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    # With only one worker thread, concurrent requests can only finish
+    # in parallel if the async component does not block the worker.
+    start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(
+            lambda _: requests.get(base_url).text,
+            range(4),
+        ))
+
+    assert responses == ["done"] * 4
+    assert time.monotonic() - start < 1.5
@@ -0,0 +1,178 @@
+import pytest
+
+
+def test_parse_accept_encoding():
+    from falk.compression import parse_accept_encoding
+
+    assert parse_accept_encoding("gzip, br;q=0.8, *;q=0") == {
+        "gzip": 1.0,
+        "br": 0.8,
+        "*": 0.0,
+    }
+
+    assert parse_accept_encoding("") == {}
+
+
+@pytest.mark.parametrize("async_request_handling", [False, True])
+def test_response_compression(async_request_handling, start_falk_app):
+    import requests
+
+    def Large(set_response_body):
+        set_response_body("falk " * 1000)
+
+    def Small(set_response_body):
+        set_response_body("falk")
+
+    def Binary(set_response_header, set_response_body):
+        set_response_header("Content-Type", "application/octet-stream")
+        set_response_body(b"falk " * 1000)
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["compress_responses"] = True
+        mutable_settings["compression_encodings"] = ["gzip"]
+        mutable_settings["async_request_handling"] = async_request_handling
+
+        add_route("/large", Large)
+        add_route("/small", Small)
+        add_route("/binary", Binary)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    # large responses get compressed
+    response = requests.get(
+        base_url + "/large",
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.text == "falk " * 1000
+
+    # clients that don't accept gzip
+    response = requests.get(
+        base_url + "/large",
+        headers={"Accept-Encoding": "identity"},
+    )
+
+    assert "Content-Encoding" not in response.headers
+    assert response.text == "falk " * 1000
+
+    # small responses are below the threshold
+    response = requests.get(
+        base_url + "/small",
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert "Content-Encoding" not in response.headers
+    assert response.text == "falk"
+
+    # only text-like content types get compressed
+    response = requests.get(
+        base_url + "/binary",
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert "Content-Encoding" not in response.headers
+    assert response.content == b"falk " * 1000
+
+
+def test_precompressed_static_files(tmp_path, start_falk_app):
+    import requests
+
+    from falk.compression import compress_static_files
+    from falk.static_files import get_static_file
+
+    static_dir = tmp_path / "static"
+    static_dir.mkdir()
+
+    (static_dir / "main.css").write_text("body { color: red; }\n" * 100)
+    (static_dir / "image.png").write_bytes(b"png")
+
+    def configure_app(mutable_settings):
+        mutable_settings["compress_responses"] = True
+        mutable_settings["compression_encodings"] = ["gzip"]
+        mutable_settings["static_dirs"] = [str(static_dir)]
+
+    mutable_app, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    # compress-static
+    assert compress_static_files(mutable_app) >= 1
+    assert (static_dir / "main.css.gz").exists()
+    assert not (static_dir / "image.png.gz").exists()
+
+    # up to date siblings don't get written again
+    assert compress_static_files(mutable_app) == 0
+
+    # siblings are part of the static manifest
+    file_stat = get_static_file(mutable_app, "main.css")
+
+    assert list(file_stat["compressed_files"]) == ["gzip"]
+
+    assert file_stat["compressed_files"]["gzip"]["abs_path"] == str(
+        static_dir / "main.css.gz",
+    )
+
+    # serve compressed sibling
+    response = requests.get(
+        base_url + "/static/main.css",
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Content-Type"] == "text/css"
+    assert response.text == "body { color: red; }\n" * 100
+
+    response = requests.get(
+        base_url + "/static/main.css",
+        headers={"Accept-Encoding": "identity"},
+    )
+
+    assert "Content-Encoding" not in response.headers
+    assert response.text == "body { color: red; }\n" * 100
+
+
+def test_compress_static_files_errors(tmp_path, monkeypatch, caplog):
+    import logging
+
+    from falk.compression import compress_static_files
+    from falk.apps import get_default_app
+
+    package_static_dir = tmp_path / "falk" / "static"
+    package_static_dir.mkdir(parents=True)
+
+    (package_static_dir / "falk.js").write_text("falk.start();\n" * 100)
+
+    static_dir = tmp_path / "static"
+    static_dir.mkdir()
+
+    (static_dir / "main.css").write_text("body { color: red; }\n" * 100)
+    (static_dir / "missing.css").symlink_to(tmp_path / "missing.css")
+
+    monkeypatch.setattr(
+        "falk.compression.FALK_PACKAGE_DIR",
+        str(tmp_path / "falk"),
+    )
+
+    mutable_app = get_default_app()
+    mutable_app["settings"]["compression_encodings"] = ["gzip"]
+
+    mutable_app["settings"]["static_dirs"] = [
+        str(package_static_dir),
+        str(static_dir),
+    ]
+
+    # Files that can't be compressed get reported, and don't stop the
+    # other files from being compressed.
+    with caplog.at_level(logging.ERROR, logger="falk"):
+        assert compress_static_files(mutable_app) == 1
+
+    assert (static_dir / "main.css.gz").exists()
+    assert "missing.css" in caplog.text
+
+    # falk's own static files are part of the installed package, and don't
+    # get compressed.
+    assert not (package_static_dir / "falk.js.gz").exists()
@@ -0,0 +1,82 @@
+def test_known_assets(start_falk_app):
+    import json
+    import re
+
+    import requests
+
+    from falk.components import HTML5Base
+
+    def Counter(state, initial_render, add_callback):
+        if initial_render:
+            state["count"] = 0
+
+        def increment():
+            state["count"] += 1
+
+        add_callback(increment)
+
+        return """
+            <style>.counter { color: red; }</style>
+            <script>console.log("counter");</script>
+
+            <div class="counter">{{ state.count }}</div>
+        """
+
+    def Index(HTML5Base=HTML5Base, Counter=Counter):
+        return """
+            <HTML5Base title="Known Assets">
+                <Counter />
+            </HTML5Base>
+        """
+
+    def configure_app(add_route):
+        add_route("/", Index)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    # initial render
+    html = requests.get(base_url).text
+    token_string = re.search(r"falk.tokens = JSON.parse\(`(.*)`\)", html)[1]
+    tokens = json.loads(token_string)
+    node_id = re.search(r'<div class="counter" fx-id="([^"]+)"', html)[1]
+
+    known_assets = [
+        *re.findall(r'<(?:style|script) fx-id="([^"]+)"', html),
+        *re.findall(r'<script src="([^"]+)"', html),
+    ]
+
+    def increment(known_assets=None):
+        response = requests.post(
+            base_url,
+            headers={
+                "X-Falk-Request-Type": "mutation",
+            },
+            json={
+                "nodeId": node_id,
+                "token": tokens[node_id],
+                "callbackName": "increment",
+                "callbackArgs": [],
+                "knownAssets": known_assets,
+            },
+        )
+
+        return response.json()["body"]
+
+    # without known assets, all styles and scripts get sent
+    body = increment()
+
+    assert ".counter { color: red; }" in body
+    assert 'console.log("counter");' in body
+    assert "falk/falk.js" in body
+    assert ">1</div>" in body
+
+    # known styles and scripts get skipped
+    body = increment(known_assets)
+
+    assert ".counter { color: red; }" not in body
+    assert 'console.log("counter");' not in body
+    assert "falk/falk.js" not in body
+    assert "falk.init()" not in body
+    assert ">1</div>" in body
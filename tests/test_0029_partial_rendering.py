@@ -0,0 +1,114 @@
+import pytest
+
+
+@pytest.mark.parametrize("partial_rendering", [True, False])
+def test_partial_rendering(partial_rendering, start_falk_app):
+    import json
+    import re
+
+    import requests
+
+    from falk.components import HTML5Base
+
+    rendered_rows = []
+    rendered_captions = []
+
+    def Caption(props):
+        rendered_captions.append(str(props["children"]))
+
+        return "<caption>{{ props.children }}</caption>"
+
+    def Row(props):
+        rendered_rows.append(props["text"])
+
+        return '<tr id="{{ props.id }}"><td>{{ props.text }}</td></tr>'
+
+    def Table(state, initial_render, add_callback, Caption=Caption, Row=Row):
+        if initial_render:
+            state["rows"] = ["a", "b", "c"]
+
+        def change():
+            state["rows"][1] = "x"
+
+        add_callback(change)
+
+        return """
+            <table>
+                <Caption>{{ len(state.rows) }} rows</Caption>
+                {% for row in state.rows %}
+                    <Row
+                      id="{{ 'row-' + str(loop.index) }}"
+                      text="{{ row }}" />
+                {% endfor %}
+            </table>
+        """
+
+    def Index(HTML5Base=HTML5Base, Table=Table):
+        return """
+            <HTML5Base title="Partial Rendering">
+                <Table />
+            </HTML5Base>
+        """
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["partial_rendering"] = partial_rendering
+
+        add_route("/", Index)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    # initial render
+    html = requests.get(base_url).text
+    token_string = re.search(r"falk.tokens = JSON.parse\(`(.*)`\)", html)[1]
+    tokens = json.loads(token_string)
+    table_node_id = re.search(r'<table fx-id="([^"]+)"', html)[1]
+    component_hashes = {}
+
+    for node_id, props_hash in re.findall(
+            r'<tr id="row-\d" fx-id="([^"]+)" fx-hash="([^"]+)">', html):
+
+        component_hashes.setdefault(props_hash, []).append(node_id)
+
+    assert rendered_rows == ["a", "b", "c"]
+
+    # Components with children get no hash, because their children get
+    # rendered by the caller.
+    assert "fx-hash" not in re.search(r"<caption[^>]*>", html)[0]
+
+    if not partial_rendering:
+        assert component_hashes == {}
+
+        return
+
+    assert len(component_hashes) == 3
+
+    # mutation request
+    # Only the changed row gets rendered again. Components with children
+    # always get rendered.
+    rendered_rows.clear()
+    rendered_captions.clear()
+
+    response = requests.post(
+        base_url,
+        headers={
+            "X-Falk-Request-Type": "mutation",
+        },
+        json={
+            "nodeId": table_node_id,
+            "token": tokens[table_node_id],
+            "callbackName": "change",
+            "callbackArgs": [],
+            "componentHashes": component_hashes,
+        },
+    )
+
+    body = response.json()["body"]
+
+    assert rendered_rows == ["x"]
+    assert rendered_captions == ["3 rows"]
+    assert "3 rows</caption>" in body
+    assert body.count("<template fx-keep=") == 2
+    assert "<td>x</td>" in body
+    assert "<td>a</td>" not in body
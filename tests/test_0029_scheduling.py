@@ -0,0 +1,152 @@
+def test_run_scheduled(loop):
+    import asyncio
+
+    import pytest
+
+    from falk.errors import ServiceUnavailableError
+    from falk.apps import run_configure_app
+
+    from falk.scheduling import (
+        get_scheduler_stats,
+        set_route_limits,
+        run_scheduled,
+    )
+
+    def Slow():
+        return "<div>slow</div>"
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["max_pending_requests"] = 3
+
+        add_route("/slow", Slow)
+
+    mutable_app = run_configure_app(configure_app)
+
+    set_route_limits(
+        mutable_app=mutable_app,
+        component=Slow,
+        max_concurrency=1,
+        max_pending=2,
+    )
+
+    async def run():
+        event = asyncio.Event()
+        running = []
+
+        async def callback():
+            running.append(True)
+
+            await event.wait()
+
+            return "done"
+
+        async def schedule(path):
+            return await run_scheduled(
+                mutable_app=mutable_app,
+                path=path,
+                callback=callback,
+            )
+
+        # route limits
+        tasks = [
+            asyncio.create_task(schedule("/slow")),
+            asyncio.create_task(schedule("/slow")),
+        ]
+
+        await asyncio.sleep(0)
+
+        with pytest.raises(ServiceUnavailableError):
+            await schedule("/slow")
+
+        stats = get_scheduler_stats(mutable_app)
+        route_stats = list(stats["routes"].values())[0]
+
+        assert len(running) == 1
+        assert route_stats["running"] == 1
+        assert route_stats["waiting"] == 1
+        assert route_stats["rejected"] == 1
+
+        # global limit
+        tasks.append(asyncio.create_task(schedule("/other")))
+
+        await asyncio.sleep(0)
+
+        with pytest.raises(ServiceUnavailableError):
+            await schedule("/other")
+
+        event.set()
+
+        assert await asyncio.gather(*tasks) == ["done"] * 3
+
+        return get_scheduler_stats(mutable_app)
+
+    stats = asyncio.run_coroutine_threadsafe(run(), loop).result()
+
+    assert stats["pending"] == 0
+    assert stats["completed"] == 3
+    assert stats["rejected"] == 2
+
+
+def test_route_concurrency_limits(start_falk_app):
+    from concurrent.futures import ThreadPoolExecutor
+    import threading
+    import time
+
+    import requests
+
+    slow_component_started = threading.Event()
+    release_slow_component = threading.Event()
+
+    def Slow(set_response_body):
+        slow_component_started.set()
+        release_slow_component.wait(timeout=5)
+
+        set_response_body("slow")
+
+    def Fast(set_response_body):
+        set_response_body("fast")
+
+    def Stats(get_scheduler_stats, set_response_json):
+        set_response_json(get_scheduler_stats())
+
+    def configure_app(add_route):
+        add_route("/slow", Slow, max_concurrency=1, max_pending=1)
+        add_route("/stats", Stats)
+        add_route("/", Fast)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        slow_response = executor.submit(
+            lambda: requests.get(base_url + "/slow"),
+        )
+
+        assert slow_component_started.wait(timeout=5)
+
+        # the slow route is saturated
+        start = time.monotonic()
+        response = requests.get(base_url + "/slow")
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert time.monotonic() - start < 1
+
+        # other routes are not affected
+        response = requests.get(base_url + "/")
+
+        assert response.status_code == 200
+        assert response.text == "fast"
+
+        # stats
+        stats = requests.get(base_url + "/stats").json()
+        route_stats = list(stats["routes"].values())[0]
+
+        assert route_stats["running"] == 1
+        assert route_stats["rejected"] == 1
+        assert stats["rejected"] == 1
+
+        release_slow_component.set()
+
+        assert slow_response.result().text == "slow"
@@ -0,0 +1,442 @@
+def test_static_manifest(tmp_path):
+    from falk.static_files import get_static_file
+    from falk.apps import run_configure_app
+
+    static_dir_1 = tmp_path / "static-1"
+    static_dir_2 = tmp_path / "static-2"
+
+    for static_dir in (static_dir_1, static_dir_2):
+        (static_dir / "css").mkdir(parents=True)
+        (static_dir / "css" / "main.css").write_text(static_dir.name)
+
+    (tmp_path / "secret.txt").write_text("secret")
+
+    def configure_app(mutable_settings):
+        mutable_settings["static_dirs"] = [
+            str(static_dir_1),
+            str(static_dir_2),
+        ]
+
+    mutable_app = run_configure_app(configure_app)
+
+    # the first static dir takes precedence
+    file_stat = get_static_file(mutable_app, "css/main.css")
+
+    assert file_stat["abs_path"] == str(static_dir_1 / "css" / "main.css")
+    assert file_stat["size"] == len("static-1")
+    assert file_stat["etag"] == f'"{file_stat["content_hash"]}"'
+
+    # unknown files
+    assert get_static_file(mutable_app, "css/other.css") is None
+    assert get_static_file(mutable_app, "../secret.txt") is None
+
+    # files, that were added after startup, are only found in debug mode
+    (static_dir_2 / "new.css").write_text("new")
+
+    assert get_static_file(mutable_app, "new.css") is None
+
+    mutable_app["settings"]["debug"] = True
+
+    assert get_static_file(mutable_app, "new.css")["size"] == 3
+    assert get_static_file(mutable_app, "../secret.txt") is None
+
+    # changed files get revalidated in debug mode
+    etag = get_static_file(mutable_app, "css/main.css")["etag"]
+
+    (static_dir_1 / "css" / "main.css").write_text("changed")
+
+    assert get_static_file(mutable_app, "css/main.css")["etag"] != etag
+
+
+def test_static_manifest_symlinks(tmp_path):
+    from falk.static_files import get_static_manifest
+    from falk.apps import run_configure_app
+
+    static_dir = tmp_path / "static"
+    vendor_dir = tmp_path / "vendor"
+
+    (static_dir / "css").mkdir(parents=True)
+    (static_dir / "css" / "main.css").write_text("main")
+    vendor_dir.mkdir()
+    (vendor_dir / "vendor.js").write_text("vendor")
+
+    # symlinked dirs get followed
+    (static_dir / "vendor").symlink_to(vendor_dir)
+
+    # symlink loop
+    (static_dir / "css" / "loop").symlink_to(static_dir)
+
+    def configure_app(mutable_settings):
+        mutable_settings["static_dirs"] = [str(static_dir)]
+
+    mutable_app = run_configure_app(configure_app)
+    static_manifest = get_static_manifest(mutable_app)
+
+    assert sorted(static_manifest["files"]) == [
+        "css/main.css",
+        "vendor/vendor.js",
+    ]
+
+
+def test_static_file_responses(tmp_path, start_falk_app):
+    import requests
+
+    static_dir = tmp_path / "static"
+    static_dir.mkdir()
+
+    content = bytes(range(256)) * 4
+
+    (static_dir / "data.bin").write_bytes(content)
+
+    def configure_app(mutable_settings):
+        mutable_settings["static_dirs"] = [str(static_dir)]
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    url = base_url + "/static/data.bin"
+
+    # full response
+    response = requests.get(url)
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert "Content-Disposition" not in response.headers
+
+    # conditional requests
+    response = requests.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = requests.get(url, headers={"If-None-Match": '"other"'})
+
+    assert response.status_code == 200
+
+    response = requests.get(url, headers={"If-Modified-Since": last_modified})
+
+    assert response.status_code == 304
+
+    # ranges
+    response = requests.get(url, headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+    assert response.headers["Content-Range"] == "bytes 10-19/1024"
+
+    response = requests.get(url, headers={"Range": "bytes=-24"})
+
+    assert response.status_code == 206
+    assert response.content == content[-24:]
+
+    response = requests.get(url, headers={"Range": "bytes=1000-"})
+
+    assert response.status_code == 206
+    assert response.content == content[1000:]
+
+    response = requests.get(url, headers={"Range": "bytes=2000-3000"})
+
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == "bytes */1024"
+
+    # If-Range
+    response = requests.get(
+        url,
+        headers={"Range": "bytes=0-9", "If-Range": etag},
+    )
+
+    assert response.status_code == 206
+
+    response = requests.get(
+        url,
+        headers={"Range": "bytes=0-9", "If-Range": '"other"'},
+    )
+
+    assert response.status_code == 200
+    assert response.content == content
+
+    # HEAD
+    response = requests.head(url)
+
+    assert response.status_code == 200
+    assert response.headers["Content-Length"] == "1024"
+    assert response.content == b""
+
+
+def test_fingerprinted_static_urls(tmp_path, start_falk_app):
+    import re
+
+    import requests
+
+    from falk.components import HTML5Base
+
+    static_dir = tmp_path / "static"
+    (static_dir / "css").mkdir(parents=True)
+    (static_dir / "css" / "main.css").write_text("body { color: red; }")
+
+    def Index(HTML5Base=HTML5Base):
+        return """
+            <link href="/static/css/main.css">
+
+            <HTML5Base>
+                <div>{{ falk.get_static_url("css/main.css") }}</div>
+            </HTML5Base>
+        """
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["fingerprint_static_urls"] = True
+        mutable_settings["static_dirs"] = [str(static_dir)]
+
+        add_route("/", Index)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    # URLs
+    html = requests.get(base_url).text
+    urls = re.findall(r"/static/css/main\.[0-9a-f]{12}\.css", html)
+
+    assert len(urls) == 2
+    assert urls[0] == urls[1]
+
+    # fingerprinted URLs get cached forever
+    response = requests.get(base_url + urls[0])
+
+    assert response.status_code == 200
+    assert response.text == "body { color: red; }"
+
+    assert response.headers["Cache-Control"] == (
+        "public, max-age=31536000, immutable"
+    )
+
+    # outdated fingerprints
+    response = requests.get(base_url + "/static/css/main.0123456789ab.css")
+
+    assert response.status_code == 200
+    assert "Cache-Control" not in response.headers
+
+    # unfingerprinted URLs
+    response = requests.get(base_url + "/static/css/main.css")
+
+    assert response.status_code == 200
+    assert "Cache-Control" not in response.headers
+
+
+def test_file_response_extensions(tmp_path, loop):
+    import asyncio
+    import os
+
+    from falk.request_handling import get_response, get_request
+    from falk.asgi.file_responses import handle_file_response
+    from falk.apps import run_configure_app
+    from falk.http import set_header
+
+    path = tmp_path / "data.bin"
+    content = bytes(range(256)) * 4
+
+    path.write_bytes(content)
+
+    def configure_app(mutable_settings):
+        mutable_settings["file_chunk_size"] = 100
+
+    mutable_app = run_configure_app(configure_app)
+
+    def send_file_response(range_header="", extensions=None):
+        request = get_request()
+        response = get_response()
+        messages = []
+
+        request["method"] = "GET"
+        response["file_path"] = str(path)
+
+        if range_header:
+            set_header(request["headers"], "Range", range_header)
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run_coroutine_threadsafe(
+            handle_file_response(
+                mutable_app=mutable_app,
+                request=request,
+                response=response,
+                send=send,
+                extensions=extensions,
+            ),
+            loop,
+        ).result()
+
+        return messages
+
+    # chunked
+    messages = send_file_response()
+    body_messages = messages[1:]
+
+    assert messages[0]["status"] == 200
+    assert len(body_messages) == 11
+    assert b"".join(message["body"] for message in body_messages) == content
+    assert not body_messages[-1]["more_body"]
+
+    # pathsend
+    messages = send_file_response(
+        extensions={"http.response.pathsend": {}},
+    )
+
+    assert messages[0]["status"] == 200
+    assert messages[1] == {
+        "type": "http.response.pathsend",
+        "path": str(path),
+    }
+
+    # ranges can't be sent using pathsend
+    messages = send_file_response(
+        range_header="bytes=10-19",
+        extensions={"http.response.pathsend": {}},
+    )
+
+    assert messages[0]["status"] == 206
+    assert messages[1]["body"] == content[10:20]
+
+    # zerocopysend
+    messages = send_file_response(
+        range_header="bytes=10-19",
+        extensions={"http.response.zerocopysend": {}},
+    )
+
+    assert messages[0]["status"] == 206
+    assert messages[1]["type"] == "http.response.zerocopysend"
+    assert messages[1]["offset"] == 10
+    assert messages[1]["count"] == 10
+    assert os.pread(messages[1]["file"], 10, 10) == content[10:20]
+
+    os.close(messages[1]["file"])
+
+
+def test_static_file_cache(tmp_path, loop):
+    import asyncio
+    import os
+
+    from falk.request_handling import get_response, get_request
+    from falk.asgi.file_responses import handle_file_response
+    from falk.static_files import get_file_stat
+    from falk.apps import run_configure_app
+
+    path = tmp_path / "main.css"
+
+    path.write_text("body { color: red; }")
+
+    def configure_app(mutable_settings):
+        mutable_settings["static_file_cache_size"] = 1024
+
+    mutable_app = run_configure_app(configure_app)
+    file_cache = mutable_app["static_file_cache"]
+
+    def send_file_response(
+            file_cache_max_file_size=1024,
+            file_stat=None,
+            file_encoding="",
+    ):
+
+        mutable_app["settings"]["static_file_cache_max_file_size"] = (
+            file_cache_max_file_size
+        )
+
+        request = get_request()
+        response = get_response()
+        messages = []
+
+        request["method"] = "GET"
+
+        response["file_path"] = str(path)
+        response["file_encoding"] = file_encoding
+
+        response["file_stat"] = (
+            file_stat or get_file_stat(str(path), hash_content=True)
+        )
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run_coroutine_threadsafe(
+            handle_file_response(
+                mutable_app=mutable_app,
+                request=request,
+                response=response,
+                send=send,
+            ),
+            loop,
+        ).result()
+
+        return b"".join(message.get("body", b"") for message in messages)
+
+    # cache miss
+    assert send_file_response() == b"body { color: red; }"
+    assert file_cache.get_stats()["size"] == 20
+
+    # cache hit
+    assert send_file_response() == b"body { color: red; }"
+    assert file_cache.get_stats()["hits"] == 1
+
+    # changed files get read again
+    path.write_text("body { color: blue; }")
+
+    assert send_file_response() == b"body { color: blue; }"
+    assert file_cache.get_stats()["size"] == 21
+
+    # files that are too big don't get cached
+    file_cache.clear()
+
+    assert send_file_response(file_cache_max_file_size=8) == (
+        b"body { color: blue; }"
+    )
+
+    assert len(file_cache) == 0
+
+    # Files that changed since they were stated get sent in chunks, with
+    # the size that was announced in the headers.
+    file_cache.clear()
+
+    file_stat = get_file_stat(str(path), hash_content=True)
+
+    path.write_text("body { color: yellow; }")
+
+    assert send_file_response(file_stat=file_stat) == (
+        b"body { color: yellow; }"[:file_stat["size"]]
+    )
+
+    assert len(file_cache) == 0
+
+    # Compressed siblings are checked against their own file stat.
+    compressed_path = tmp_path / "main.css.gz"
+
+    compressed_path.write_bytes(b"gzip-1")
+
+    def get_compressed_file_stat():
+        file_stat = get_file_stat(str(path), hash_content=True)
+
+        file_stat["compressed_files"]["gzip"] = get_file_stat(
+            str(compressed_path),
+        )
+
+        return file_stat
+
+    assert send_file_response(
+        file_stat=get_compressed_file_stat(),
+        file_encoding="gzip",
+    ) == b"gzip-1"
+
+    compressed_path.write_bytes(b"gzip-2")
+    os.utime(compressed_path, (0, 0))
+
+    assert send_file_response(
+        file_stat=get_compressed_file_stat(),
+        file_encoding="gzip",
+    ) == b"gzip-2"
+
+    # The cache is disabled by default.
+    assert run_configure_app(lambda: None)["static_file_cache"] is None
@@ -0,0 +1,161 @@
+import pytest
+
+
+@pytest.mark.parametrize("async_iterator", [False, True])
+def test_stream_responses(async_iterator, start_falk_app):
+    import threading
+    import asyncio
+
+    import requests
+
+    release_last_row = threading.Event()
+    stream_closed = threading.Event()
+
+    def get_rows():
+        try:
+            yield "id,name\n"
+            yield b"1,foo\n"
+
+            release_last_row.wait(timeout=5)
+
+            yield "2,bar\n"
+
+        finally:
+            stream_closed.set()
+
+    async def get_rows_async():
+        try:
+            yield "id,name\n"
+            yield b"1,foo\n"
+
+            while not release_last_row.is_set():
+                await asyncio.sleep(0.01)
+
+            yield "2,bar\n"
+
+        finally:
+            stream_closed.set()
+
+    def Export(set_response_header, set_response_stream):
+        set_response_header("Content-Type", "text/csv")
+
+        if async_iterator:
+            set_response_stream(get_rows_async())
+
+        else:
+            set_response_stream(get_rows())
+
+    def configure_app(add_route):
+        add_route("/export.csv", Export)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    response = requests.get(
+        base_url + "/export.csv",
+        stream=True,
+        timeout=5,
+    )
+
+    chunks = response.iter_content(chunk_size=None)
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "text/csv"
+
+    # The first rows get sent before the iterator finished.
+    body = b""
+
+    while body != b"id,name\n1,foo\n":
+        body += next(chunks)
+
+    release_last_row.set()
+
+    body += b"".join(chunks)
+
+    assert body == b"id,name\n1,foo\n2,bar\n"
+    assert stream_closed.wait(timeout=5)
+
+
+def test_stream_response_errors(start_falk_app):
+    import requests
+
+    def get_rows():
+        yield "id,name\n"
+
+        raise ValueError()
+
+    def Export(set_response_stream):
+        set_response_stream(get_rows())
+
+    def InvalidStream(set_response_stream):
+        set_response_stream("id,name\n")
+
+    def configure_app(add_route):
+        add_route("/export.csv", Export)
+        add_route("/invalid.csv", InvalidStream)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    # Exceptions, that were raised after the headers were sent, abort the
+    # response.
+    response = requests.get(base_url + "/export.csv", stream=True, timeout=5)
+
+    assert response.status_code == 200
+
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        b"".join(response.iter_content(chunk_size=None))
+
+    # strings are no streams
+    response = requests.get(base_url + "/invalid.csv", timeout=5)
+
+    assert response.status_code == 500
+
+
+@pytest.mark.parametrize("async_request_handling", [False, True])
+def test_stream_response_middleware_errors(
+        async_request_handling,
+        start_falk_app,
+):
+
+    import threading
+
+    import requests
+
+    stream_closed = threading.Event()
+
+    class Rows:
+        def __iter__(self):
+            yield "id,name\n"  # pragma: no cover
+
+        def close(self):
+            stream_closed.set()
+
+    def Export(set_response_stream):
+        set_response_stream(Rows())
+
+    def broken_middleware():
+        raise ValueError()
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["async_request_handling"] = async_request_handling
+
+        mutable_settings["post_component_middlewares"].append(
+            broken_middleware,
+        )
+
+        add_route("/export.csv", Export)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    # The error page replaces the response stream, which gets closed without
+    # being sent.
+    response = requests.get(base_url + "/export.csv", timeout=5)
+
+    assert response.status_code == 500
+    assert "id,name" not in response.text
+    assert stream_closed.is_set()
@@ -0,0 +1,366 @@
+import pytest
+
+
+@pytest.mark.parametrize("async_request_handling", [False, True])
+def test_streaming(async_request_handling, start_falk_app):
+    import threading
+
+    import requests
+
+    from falk.components import HTML5Base
+
+    release_slow_component = threading.Event()
+
+    def Slow():
+        release_slow_component.wait(timeout=5)
+
+        return """
+            <style>#slow { color: red; }</style>
+            <div id="slow">slow</div>
+        """
+
+    def Index(set_response_header, HTML5Base=HTML5Base, Slow=Slow):
+        set_response_header("X-Foo", "foo")
+
+        return """
+            <HTML5Base title="Streaming">
+                <Slow />
+            </HTML5Base>
+        """
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["stream_responses"] = True
+        mutable_settings["async_request_handling"] = async_request_handling
+
+        add_route("/", Index)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    response = requests.get(base_url, stream=True, timeout=5)
+    chunks = (
+        chunk.decode()
+        for chunk in response.iter_content(chunk_size=None)
+    )
+
+    # The head gets sent before the slow component is rendered.
+    assert response.status_code == 200
+    assert response.headers["X-Foo"] == "foo"
+
+    head = next(chunks)
+
+    assert "<title>Streaming</title>" in head
+    assert "</head>" in head
+    assert "slow" not in head
+
+    release_slow_component.set()
+
+    body = "".join(chunks)
+
+    # Styles of components, that were rendered after the head was sent,
+    # get sent along with the component.
+    assert body.index("#slow { color: red; }") < body.index(">slow</div>")
+    assert "falk.tokens" in body
+    assert body.strip().endswith("</html>")
+
+
+@pytest.mark.parametrize("async_request_handling", [False, True])
+def test_streamed_component_subtrees(async_request_handling, start_falk_app):
+    import threading
+
+    import requests
+
+    from falk.components import HTML5Base
+
+    release_slow_component = threading.Event()
+
+    def First():
+        return """
+            <style>#first { color: blue; }</style>
+            <div id="first">first</div>
+        """
+
+    def Slow():
+        release_slow_component.wait(timeout=5)
+
+        return """
+            <style>#slow { color: red; }</style>
+            <div id="slow">slow</div>
+        """
+
+    def Layout(HTML5Base=HTML5Base):
+        return """
+            <HTML5Base title="Streaming">
+                <main>{{ props.children }}</main>
+            </HTML5Base>
+        """
+
+    def Shout(HTML5Base=HTML5Base):
+        return """
+            <HTML5Base title="Streaming">
+                {{ props.children|upper }}
+            </HTML5Base>
+        """
+
+    def Index(Layout=Layout, First=First, Slow=Slow):
+        return """
+            <Layout>
+                <First />
+                <Slow />
+            </Layout>
+        """
+
+    def ShoutingIndex(Shout=Shout, First=First):
+        return """
+            <Shout>
+                <First />
+            </Shout>
+        """
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["stream_responses"] = True
+        mutable_settings["async_request_handling"] = async_request_handling
+
+        add_route("/", Index)
+        add_route("/shout/", ShoutingIndex)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    # Children, that get output directly, get flushed after every component
+    # subtree, so the first component gets sent before the slow one is
+    # rendered.
+    response = requests.get(base_url, stream=True, timeout=5)
+    chunks = (
+        chunk.decode()
+        for chunk in response.iter_content(chunk_size=None)
+    )
+
+    body = ""
+
+    while ">first</div>" not in body:
+        body += next(chunks)
+
+    assert "slow" not in body
+    assert body.index("#first { color: blue; }") < body.index(">first</div>")
+
+    release_slow_component.set()
+
+    body += "".join(chunks)
+
+    assert body.index("#slow { color: red; }") < body.index(">slow</div>")
+    assert body.index(">first</div>") < body.index(">slow</div>")
+    assert body.index(">slow</div>") < body.index("</main>")
+    assert body.strip().endswith("</html>")
+
+    # Children, that get used as string, get rendered in one piece.
+    response = requests.get(base_url + "/shout/", timeout=5)
+
+    assert response.status_code == 200
+    assert ">FIRST</DIV>" in response.text
+
+
+def test_streaming_fallback(start_falk_app):
+    import requests
+
+    # Components that don't wrap their content in another component render
+    # like before.
+    def Index():
+        return "<div>{{ 1 + 1 }}</div>"
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["stream_responses"] = True
+
+        add_route("/", Index)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    response = requests.get(base_url)
+
+    assert response.status_code == 200
+    assert ">2</div>" in response.text
+
+
+@pytest.mark.parametrize("async_request_handling", [False, True])
+def test_deferred_components(async_request_handling, start_falk_app):
+    import threading
+
+    import requests
+
+    from falk.components import HTML5Base
+
+    release_slow_component = threading.Event()
+
+    def Slow(props):
+        release_slow_component.wait(timeout=5)
+
+        return """
+            <style>#slow { color: red; }</style>
+            <div id="slow">{{ props.text }}</div>
+        """
+
+    def Index(HTML5Base=HTML5Base, Slow=Slow):
+        return """
+            <HTML5Base title="Deferred">
+                <Slow text="slow" fx-defer="loading" />
+                <div id="fast">fast</div>
+            </HTML5Base>
+        """
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["stream_responses"] = True
+        mutable_settings["async_request_handling"] = async_request_handling
+
+        add_route("/", Index)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    response = requests.get(base_url, stream=True, timeout=5)
+    chunks = (
+        chunk.decode()
+        for chunk in response.iter_content(chunk_size=None)
+    )
+
+    # The whole document gets sent before the deferred component renders.
+    document = ""
+
+    while "</html>" not in document:
+        document += next(chunks)
+
+    assert ">loading</div>" in document
+    assert ">fast</div>" in document
+    assert "#slow" not in document
+
+    release_slow_component.set()
+
+    body = "".join(chunks)
+
+    assert body.index("#slow { color: red; }") < body.index("<template")
+    assert '<template fx-deferred="' in body
+    assert ">slow</div>" in body
+    assert "falk.renderDeferred(" in body
+
+
+def test_deferred_components_fallback(start_falk_app):
+    import requests
+
+    # Without streaming, deferred components get rendered in place.
+    def Slow():
+        return '<div id="slow">slow</div>'
+
+    def Index(Slow=Slow):
+        return """
+            <div>
+                <Slow fx-defer />
+            </div>
+        """
+
+    def configure_app(add_route):
+        add_route("/", Index)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    response = requests.get(base_url)
+
+    assert response.status_code == 200
+    assert "slow</div>" in response.text
+    assert "fx-deferred" not in response.text
+
+
+@pytest.mark.parametrize("async_request_handling", [False, True])
+def test_streaming_errors(async_request_handling, start_falk_app):
+    import requests
+
+    from falk.components import HTML5Base
+
+    def Broken():
+        raise ValueError()
+
+    def Index(HTML5Base=HTML5Base, Broken=Broken):
+        return """
+            <HTML5Base title="Streaming">
+                <Broken />
+            </HTML5Base>
+        """
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["stream_responses"] = True
+        mutable_settings["async_request_handling"] = async_request_handling
+
+        add_route("/", Index)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    response = requests.get(base_url, stream=True, timeout=5)
+
+    # The head was sent before the exception was raised, so the status can't
+    # be changed anymore. The response gets aborted instead of ended.
+    assert response.status_code == 200
+
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        b"".join(response.iter_content(chunk_size=None))
+
+
+@pytest.mark.parametrize("async_request_handling", [False, True])
+def test_streaming_middleware_warnings(
+        async_request_handling,
+        start_falk_app,
+        caplog,
+):
+
+    import logging
+
+    import requests
+
+    from falk.components import HTML5Base
+
+    def Index(HTML5Base=HTML5Base):
+        return """
+            <HTML5Base title="Streaming">
+                <h1>Streaming</h1>
+            </HTML5Base>
+        """
+
+    def add_header(set_response_header):
+        set_response_header("X-Foo", "foo")
+
+    def log_request(request):
+        pass
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["stream_responses"] = True
+        mutable_settings["async_request_handling"] = async_request_handling
+        mutable_settings["post_component_middlewares"].append(add_header)
+        mutable_settings["post_request_middlewares"].append(log_request)
+
+        add_route("/", Index)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    # Headers that get set after the response was streamed don't get sent.
+    with caplog.at_level(logging.WARNING, logger="falk"):
+        response = requests.get(base_url, timeout=5)
+
+    assert response.status_code == 200
+    assert "X-Foo" not in response.headers
+
+    warnings = [
+        record.getMessage()
+        for record in caplog.records
+        if record.levelno == logging.WARNING
+    ]
+
+    assert len(warnings) == 1
+    assert "add_header changed the status" in warnings[0]
@@ -0,0 +1,73 @@
+import pytest
+
+
+@pytest.mark.parametrize("websocket_batch_window", [0, 100])
+def test_websocket_messages(websocket_batch_window, start_falk_app):
+    import json
+    import re
+
+    from websockets.sync.client import connect
+    import requests
+
+    from falk.components import HTML5Base
+
+    def Counter(state, initial_render, add_callback):
+        if initial_render:
+            state["count"] = 0
+
+        def increment():
+            state["count"] += 1
+
+        add_callback(increment)
+
+        return '<div class="counter">{{ state.count }}</div>'
+
+    def Index(HTML5Base=HTML5Base, Counter=Counter):
+        return """
+            <HTML5Base title="Websocket Messages">
+                <Counter />
+            </HTML5Base>
+        """
+
+    def configure_app(mutable_settings, add_route):
+        mutable_settings["websocket_batch_window"] = websocket_batch_window
+
+        add_route("/", Index)
+
+    _, base_url, _ = start_falk_app(
+        configure_app=configure_app,
+    )
+
+    html = requests.get(base_url).text
+    token_string = re.search(r"falk.tokens = JSON.parse\(`(.*)`\)", html)[1]
+    tokens = json.loads(token_string)
+    node_id = re.search(r'<div class="counter" fx-id="([^"]+)"', html)[1]
+
+    def get_message(message_id):
+        return json.dumps([message_id, {
+            "nodeId": node_id,
+            "token": tokens[node_id],
+            "callbackName": "increment",
+            "callbackArgs": [],
+        }])
+
+    with connect(base_url.replace("http://", "ws://") + "/") as websocket:
+        websocket.send(get_message(1))
+        websocket.send(get_message(2))
+
+        messages = json.loads(websocket.recv(timeout=5))
+
+        # Messages that are ready within the batch window get sent in one
+        # frame.
+        if websocket_batch_window:
+            assert len(messages) == 2
+
+        else:
+            messages = [messages, json.loads(websocket.recv(timeout=5))]
+
+    assert sorted(message_id for message_id, _ in messages) == [1, 2]
+
+    # only the data the client needs gets sent
+    for _, data in messages:
+        assert sorted(data.keys()) == ["body", "callbacks", "flags", "tokens"]
+        assert ">1</div>" in data["body"]